@@ -0,0 +1,72 @@
+"""Bulk import historical movements from a CSV or NDJSON file.
+
+Usage: python -m app.import_movements FILE [--format csv|ndjson] [--job JOB_ID]
+       [--chunk-size N]
+
+Pass ``--job`` with the id printed by an interrupted run to continue it.
+"""
+import argparse
+import asyncio
+import sys
+from pathlib import Path
+
+from dotenv import load_dotenv
+
+# Load environment variables before the storage settings are read
+load_dotenv()
+
+from app.routers.movements import commit_import_chunk, get_utc_now  # noqa: E402
+from app.services.file_storage import import_jobs_storage, recover_pending_commit  # noqa: E402
+from app.services.movement_import import (  # noqa: E402
+    IMPORT_CHUNK_SIZE,
+    detect_format,
+    new_job,
+    run_import,
+)
+
+
+async def main(path: Path, fmt: str | None, job_id: str | None, chunk_size: int) -> int:
+    fmt = detect_format(path.name, fmt)
+    recover_pending_commit()
+
+    if job_id:
+        job = await import_jobs_storage.get_by_id(job_id)
+        if not job:
+            print(f"Import job {job_id} not found", file=sys.stderr)
+            return 1
+        if job["status"] == "completed":
+            print(f"Import job {job_id} already completed", file=sys.stderr)
+            return 1
+        job = {**job, "status": "running", "updatedAt": get_utc_now()}
+    else:
+        job = new_job(path.name, fmt, get_utc_now())
+    await import_jobs_storage.upsert(job)
+    print(f"Importing {path} as job {job['id']}")
+
+    with path.open("rb") as stream:
+        async for job in run_import(stream, fmt, job, commit_import_chunk, get_utc_now, chunk_size):
+            print(
+                f"{job['status']}: {job['rowsCommitted']} rows, "
+                f"{job['created']} created, {job['failed']} failed"
+            )
+
+    for row in job["errors"]:
+        messages = "; ".join(f"{e['field']}: {e['message']}" for e in row["errors"])
+        print(f"  row {row['row']}: {messages}")
+    if job["status"] == "failed":
+        print(f"Import failed: {job.get('error')}. Resume with --job {job['id']}", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Bulk import movements from CSV or NDJSON")
+    parser.add_argument("file", type=Path)
+    parser.add_argument("--format", choices=["csv", "ndjson"])
+    parser.add_argument("--job", help="Resume this import job")
+    parser.add_argument("--chunk-size", type=int, default=IMPORT_CHUNK_SIZE)
+    args = parser.parse_args()
+    try:
+        sys.exit(asyncio.run(main(args.file, args.format, args.job, args.chunk_size)))
+    except ValueError as e:
+        parser.error(str(e))
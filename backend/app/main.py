@@ -1,16 +1,33 @@
-from fastapi import FastAPI
+from contextlib import asynccontextmanager
+
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
 from dotenv import load_dotenv
 
-from app.routers import tanks, movements, properties, users, audit_log, pdf
-
-# Load environment variables from .env file
+# Load environment variables from .env file (before the routers import the
+# storage and LLM settings)
 load_dotenv()
 
+from app.routers import tanks, movements, properties, users, audit_log, pdf, events  # noqa: E402
+from app.services.file_storage import recover_pending_commit  # noqa: E402
+from app.services.pdf_extraction import shutdown_parse_pools  # noqa: E402
+from app.services.unit_of_work import StaleStateError  # noqa: E402
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Finish any multi-file commit interrupted by a crash before serving
+    recover_pending_commit()
+    yield
+    shutdown_parse_pools()
+
+
 app = FastAPI(
     title="Tank Management API",
     description="FastAPI backend for Carbon Black Oil tank management",
     version="1.0.0",
+    lifespan=lifespan,
 )
 
 # CORS configuration for Next.js frontend
@@ -25,6 +42,13 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+
+@app.exception_handler(StaleStateError)
+async def stale_state_handler(request: Request, exc: StaleStateError):
+    """A change kept conflicting with concurrent ones; the client may retry."""
+    return JSONResponse(status_code=409, content={"detail": str(exc)})
+
+
 # Include routers
 app.include_router(tanks.router)
 app.include_router(movements.router)
@@ -32,6 +56,7 @@ app.include_router(properties.router)
 app.include_router(users.router)
 app.include_router(audit_log.router)
 app.include_router(pdf.router)
+app.include_router(events.router)
 
 
 @app.get("/health")
@@ -1,6 +1,15 @@
 from .common import PropertyValue, MovementType, MovementStatus, AuditAction, AuditEntityType, DEFAULT_PRODUCT
-from .tank import Tank, TankCreate, TankUpdate, TankReset
-from .movement import Movement, MovementCreate, MovementUpdate
+from .tank import Tank, TankCreate, TankUpdate, TankReset, TankProjection, FleetProjection, TankLevelPoint, TankLevels
+from .movement import (
+    Movement,
+    MovementCreate,
+    MovementUpdate,
+    MovementBatchCreate,
+    MovementBatchItem,
+    MovementBatchResult,
+    MovementImportRowError,
+    MovementImportJob,
+)
 from .property import PropertyDefinition, PropertyDefinitionCreate, PropertyDefinitionUpdate
 from .user import User
 from .audit import AuditLogEntry, AuditLogResponse
@@ -16,9 +25,18 @@ __all__ = [
     "TankCreate",
     "TankUpdate",
     "TankReset",
+    "TankProjection",
+    "FleetProjection",
+    "TankLevelPoint",
+    "TankLevels",
     "Movement",
     "MovementCreate",
     "MovementUpdate",
+    "MovementBatchCreate",
+    "MovementBatchItem",
+    "MovementBatchResult",
+    "MovementImportRowError",
+    "MovementImportJob",
     "PropertyDefinition",
     "PropertyDefinitionCreate",
     "PropertyDefinitionUpdate",
@@ -24,6 +24,7 @@ class PaginationInfo(BaseModel):
     totalPages: int
     hasNextPage: bool
     hasPrevPage: bool
+    nextCursor: Optional[str] = None
 
 
 class AuditLogResponse(BaseModel):
@@ -9,6 +9,11 @@ class MovementType(str, Enum):
     ship = "ship"
 
 
+class MovementStatus(str, Enum):
+    scheduled = "scheduled"
+    completed = "completed"
+
+
 class AuditAction(str, Enum):
     create = "create"
     update = "update"
@@ -1,4 +1,4 @@
-from typing import List, Optional
+from typing import Dict, List, Optional
 from pydantic import BaseModel, field_validator
 
 from .common import MovementType, PropertyValue
@@ -83,6 +83,41 @@ class Movement(BaseModel):
     model_config = {"from_attributes": True}
 
 
+class MovementBatchCreate(BaseModel):
+    movements: List[MovementCreate]
+    atomic: bool = False  # If set, nothing is saved unless every movement is valid
+
+
+class MovementBatchItem(BaseModel):
+    index: int
+    movement: Optional[Movement] = None
+    errors: List[Dict[str, str]] = []
+
+
+class MovementBatchResult(BaseModel):
+    created: int
+    results: List[MovementBatchItem]
+
+
+class MovementImportRowError(BaseModel):
+    row: int
+    errors: List[Dict[str, str]]
+
+
+class MovementImportJob(BaseModel):
+    id: str
+    filename: str
+    format: str
+    status: str  # running, completed or failed
+    rowsCommitted: int
+    created: int
+    failed: int
+    errors: List[MovementImportRowError]  # First rows that failed
+    error: Optional[str] = None
+    createdAt: str
+    updatedAt: str
+
+
 def get_effective_volume(movement: Movement) -> float:
     """Get actual volume if available, otherwise expected volume."""
     return movement.actualVolume if movement.actualVolume is not None else movement.expectedVolume
@@ -1,16 +1,18 @@
-from typing import Optional
+from typing import List, Optional
 from pydantic import BaseModel
 
 
 class PropertyDefinitionCreate(BaseModel):
     name: str
     unit: str = ""
+    aliases: List[str] = []  # Other names lab reports use for the property
     userId: Optional[str] = None
 
 
 class PropertyDefinitionUpdate(BaseModel):
     name: Optional[str] = None
     unit: Optional[str] = None
+    aliases: Optional[List[str]] = None
     userId: Optional[str] = None
 
 
@@ -18,6 +20,7 @@ class PropertyDefinition(BaseModel):
     id: str
     name: str
     unit: str
+    aliases: List[str] = []
     createdAt: str
 
     model_config = {"from_attributes": True}
@@ -39,3 +39,27 @@ class Tank(TankBase):
     updatedAt: str
 
     model_config = {"from_attributes": True}
+
+
+class TankProjection(BaseModel):
+    tankId: str
+    volume: float
+    properties: List[PropertyValue]
+    dailyVolumes: List[float]
+
+
+class FleetProjection(BaseModel):
+    dates: List[str]
+    tanks: List[TankProjection]
+
+
+class TankLevelPoint(BaseModel):
+    timestamp: str
+    volume: float
+    projected: bool
+
+
+class TankLevels(BaseModel):
+    tankId: str
+    total: int
+    points: List[TankLevelPoint]
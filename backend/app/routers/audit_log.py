@@ -1,7 +1,18 @@
-from typing import Optional
+import base64
+import binascii
+import json
+from typing import Optional, Tuple
 
-from fastapi import APIRouter, Query
+from fastapi import APIRouter, HTTPException, Query
+from fastapi.responses import StreamingResponse
 
+from app.services.exports import (
+    AUDIT_COLUMNS,
+    MEDIA_TYPES,
+    audit_csv_row,
+    encode_export,
+    iter_pages,
+)
 from app.services.file_storage import audit_storage
 
 router = APIRouter(prefix="/audit-log", tags=["audit"])
@@ -10,39 +21,90 @@ DEFAULT_PAGE_SIZE = 50
 MAX_PAGE_SIZE = 100
 
 
+def encode_cursor(position: Tuple[str, str]) -> str:
+    """Encode a (timestamp, id) keyset position as an opaque cursor."""
+    return base64.urlsafe_b64encode(json.dumps(list(position)).encode()).decode()
+
+
+def decode_cursor(cursor: str) -> Tuple[str, str]:
+    """Decode a cursor produced by encode_cursor."""
+    try:
+        timestamp, entry_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return str(timestamp), str(entry_id)
+    except (binascii.Error, ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
 @router.get("")
 async def get_audit_log(
     entityType: Optional[str] = Query(None),
     entityId: Optional[str] = Query(None),
+    userId: Optional[str] = Query(None),
+    from_: Optional[str] = Query(None, alias="from", description="Earliest timestamp (inclusive)"),
+    to: Optional[str] = Query(None, description="Latest timestamp (exclusive)"),
+    cursor: Optional[str] = Query(None, description="nextCursor from the previous page"),
     page: int = Query(1, ge=1),
     limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
 ):
-    """Get paginated audit log entries."""
-    audit_log = await audit_storage.read()
+    """Get audit log entries, newest first.
 
-    # Filter
-    if entityType:
-        audit_log = [e for e in audit_log if e.get("entityType") == entityType]
-    if entityId:
-        audit_log = [e for e in audit_log if e.get("entityId") == entityId]
+    Pages are addressed either by ``page`` or, for cheap deep paging, by
+    passing the ``nextCursor`` of the previous response as ``cursor``.
+    """
+    before = decode_cursor(cursor) if cursor else None
+    offset = 0 if before else (page - 1) * limit
 
-    # Sort by timestamp descending
-    audit_log.sort(key=lambda e: e.get("timestamp", ""), reverse=True)
+    entries, total, next_position = await audit_storage.query(
+        entity_type=entityType,
+        entity_id=entityId,
+        user_id=userId,
+        start=from_,
+        end=to,
+        before=before,
+        offset=offset,
+        limit=limit,
+    )
 
-    # Paginate
-    total = len(audit_log)
     total_pages = (total + limit - 1) // limit if total > 0 else 1
-    offset = (page - 1) * limit
-    paginated = audit_log[offset : offset + limit]
 
     return {
-        "data": paginated,
+        "data": entries,
         "pagination": {
             "page": page,
             "limit": limit,
             "total": total,
             "totalPages": total_pages,
-            "hasNextPage": page < total_pages,
-            "hasPrevPage": page > 1,
+            "hasNextPage": next_position is not None,
+            "hasPrevPage": before is not None or page > 1,
+            "nextCursor": encode_cursor(next_position) if next_position else None,
         },
     }
+
+
+@router.get("/export")
+async def export_audit_log(
+    format: str = Query("ndjson", pattern="^(ndjson|csv)$"),
+    entityType: Optional[str] = Query(None),
+    entityId: Optional[str] = Query(None),
+    userId: Optional[str] = Query(None),
+    from_: Optional[str] = Query(None, alias="from", description="Earliest timestamp (inclusive)"),
+    to: Optional[str] = Query(None, description="Latest timestamp (exclusive)"),
+):
+    """Stream audit log entries, oldest first, as NDJSON or CSV."""
+
+    async def fetch_page(after, size):
+        return await audit_storage.scan(
+            entity_type=entityType,
+            entity_id=entityId,
+            user_id=userId,
+            start=from_,
+            end=to,
+            after=after,
+            limit=size,
+        )
+
+    return StreamingResponse(
+        encode_export(iter_pages(fetch_page, "timestamp"), format, AUDIT_COLUMNS, audit_csv_row),
+        media_type=MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="audit-log.{format}"'},
+    )
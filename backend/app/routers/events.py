@@ -0,0 +1,45 @@
+import json
+from typing import Optional
+
+from fastapi import APIRouter, Header, Request
+from fastapi.responses import StreamingResponse
+
+from app.services.change_feed import change_feed
+
+router = APIRouter(tags=["events"])
+
+KEEPALIVE_SECONDS = 15
+RETRY_MS = 3000
+
+
+@router.get("/events")
+async def stream_events(
+    request: Request,
+    last_event_id: Optional[str] = Header(None, alias="Last-Event-ID"),
+):
+    """Stream changes to tanks, movements and properties as Server-Sent Events.
+
+    Each ``change`` event carries the entity type and id, the action, its
+    version and the new record (null when deleted). Reconnecting with
+    ``Last-Event-ID`` replays the changes missed since that event. Changes
+    committed by any worker are streamed.
+    """
+    async def events():
+        yield f"retry: {RETRY_MS}\n\n"
+        async for change in change_feed.subscribe(last_event_id or None, KEEPALIVE_SECONDS):
+            if await request.is_disconnected():
+                break
+            if change is None:
+                yield ": keepalive\n\n"
+                continue
+            yield (
+                f"id: {change['version']}\n"
+                f"event: change\n"
+                f"data: {json.dumps(change)}\n\n"
+            )
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
@@ -1,17 +1,73 @@
+import json
 import uuid
+from itertools import islice
 from datetime import datetime, timezone
-from typing import List, Optional, Dict, Any
-
-from fastapi import APIRouter, HTTPException, Query
-
-from app.models.movement import Movement, MovementCreate, MovementUpdate
-from app.models.common import MovementType, AuditAction, AuditEntityType, PropertyValue
-from app.services.file_storage import movements_storage, tanks_storage
-from app.services.tank_calculations import calculate_blended_properties, get_effective_volume
-from app.services.audit_service import log_audit
+from typing import List, Optional, Dict, Any, Callable, Mapping, Tuple
+
+from fastapi import APIRouter, File, HTTPException, Query, Request, UploadFile
+from fastapi.responses import StreamingResponse
+
+from app.models.movement import (
+    Movement,
+    MovementCreate,
+    MovementUpdate,
+    MovementBatchCreate,
+    MovementBatchResult,
+    MovementImportJob,
+)
+from app.models.common import (
+    MovementType,
+    MovementStatus,
+    AuditAction,
+    AuditEntityType,
+)
+from app.services.fieldsets import fieldset_model, project, select_fields
+from app.services.file_storage import import_jobs_storage, movements_storage, tanks_storage
+from app.services.exports import (
+    MEDIA_TYPES,
+    MOVEMENT_COLUMNS,
+    encode_export,
+    iter_pages,
+    movement_csv_row,
+)
+from app.services.movement_import import (
+    IMPORT_CHUNK_SIZE,
+    detect_format,
+    new_job,
+    record_chunk,
+    run_import,
+)
+from app.services.tank_calculations import (
+    PropertyColumns,
+    blend_property_vectors,
+    get_effective_volume,
+)
+from app.services.projections import projection_cache
+from app.services.response_cache import response_cache
+from app.services.tank_ledger import (
+    ensure_ledger,
+    is_at_ledger_end,
+    movement_position,
+    movement_tank_ids,
+    reconcile_movements,
+)
+from app.services.unit_of_work import UnitOfWork, Updater, run_transaction
 
 router = APIRouter(prefix="/movements", tags=["movements"])
 
+# Fields returned by view=summary: what a movement is, without notes,
+# carrier details or properties
+MOVEMENT_SUMMARY_FIELDS = (
+    "id",
+    "type",
+    "date",
+    "scheduledDate",
+    "expectedVolume",
+    "actualVolume",
+    "sourceTankId",
+    "destinationTankId",
+)
+
 
 def get_utc_now() -> str:
     """Get current UTC time in ISO format."""
@@ -23,8 +79,15 @@ def is_completed(movement: Dict[str, Any]) -> bool:
     return movement.get("date") is not None
 
 
+def insufficient_volume_error(tank: Dict[str, Any], volume: float) -> Dict[str, str]:
+    return {
+        "field": "expectedVolume",
+        "message": f"Insufficient volume. Tank has {tank['currentVolume']:.1f} KB, requested {volume:.1f} KB",
+    }
+
+
 def validate_movement(
-    body: MovementCreate, tanks: List[Dict[str, Any]]
+    body: MovementCreate, tanks: Mapping[str, Dict[str, Any]]
 ) -> List[Dict[str, str]]:
     """Validate movement creation - returns list of validation errors."""
     errors: List[Dict[str, str]] = []
@@ -36,16 +99,9 @@ def validate_movement(
     def check_source_capacity() -> None:
         # Only check capacity if movement is completed (date is set)
         if body.date and body.sourceTankId:
-            source_tank = next(
-                (t for t in tanks if t["id"] == body.sourceTankId), None
-            )
+            source_tank = tanks.get(body.sourceTankId)
             if source_tank and effective_volume > source_tank["currentVolume"]:
-                errors.append(
-                    {
-                        "field": "expectedVolume",
-                        "message": f"Insufficient volume. Tank has {source_tank['currentVolume']:.1f} KB, requested {effective_volume:.1f} KB",
-                    }
-                )
+                errors.append(insufficient_volume_error(source_tank, effective_volume))
 
     # Type-specific validation
     if body.type == MovementType.receive:
@@ -94,119 +150,160 @@ def validate_movement(
     return errors
 
 
-async def apply_movement_to_tanks(movement_data: Dict[str, Any]) -> None:
-    """Apply completed movement effects to tank volumes/properties."""
-    tanks = await tanks_storage.read()
+def build_movement(body: MovementCreate, now: str) -> Dict[str, Any]:
+    """New movement record from a create request."""
+    return {
+        "id": f"mov-{uuid.uuid4()}",
+        "type": body.type.value,
+        "date": body.date,  # If set, movement is completed
+        "scheduledDate": body.scheduledDate or now,
+        "expectedVolume": body.expectedVolume,
+        "actualVolume": body.actualVolume,
+        "sourceTankId": body.sourceTankId,
+        "destinationTankId": body.destinationTankId,
+        "properties": [p.model_dump() for p in body.properties],
+        "carrier": body.carrier,
+        "ticketNumber": body.ticketNumber,
+        "notes": body.notes,
+        "pdfPath": body.pdfPath,
+        "createdAt": now,
+        "createdBy": body.createdBy or "system",
+    }
+
+
+async def apply_movement_to_tanks(
+    movement_data: Dict[str, Any], uow: UnitOfWork, check_capacity: bool = False
+) -> None:
+    """Stage completed movement effects on tank volumes/properties.
+
+    The effects are computed from each tank as it is at commit time, so
+    concurrent movements on the same tank all count. With
+    ``check_capacity``, a source tank holding less than the movement's
+    volume by then fails the commit with a validation error.
+    """
     volume = get_effective_volume(movement_data)
     movement_type = movement_data["type"]
     now = get_utc_now()
+    columns = PropertyColumns()
+
+    def draw_from(src_tank: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+        if src_tank is None:
+            return None
+        if check_capacity and volume > src_tank["currentVolume"]:
+            raise HTTPException(
+                status_code=400,
+                detail={
+                    "error": "Validation failed",
+                    "details": [insufficient_volume_error(src_tank, volume)],
+                },
+            )
+        src_tank["currentVolume"] = max(0, src_tank["currentVolume"] - volume)
+        src_tank["updatedAt"] = now
+        return src_tank
+
+    def blend_into(props: Callable[[], List[Dict[str, Any]]]) -> Updater:
+        def blend(dest_tank: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+            if dest_tank is None:
+                return None
+            blended = blend_property_vectors(
+                dest_tank["currentVolume"],
+                columns.vector(dest_tank["properties"]),
+                volume,
+                columns.vector(props()),
+            )
+            dest_tank["properties"] = columns.properties(blended)
+            dest_tank["currentVolume"] += volume
+            dest_tank["updatedAt"] = now
+            return dest_tank
 
-    def to_property_values(props: List[Dict[str, Any]]) -> List[PropertyValue]:
-        return [PropertyValue(**p) for p in props]
+        return blend
 
     if movement_type == "receive":
-        dest_idx = next(
-            (
-                i
-                for i, t in enumerate(tanks)
-                if t["id"] == movement_data["destinationTankId"]
-            ),
-            None,
+        uow.update(
+            tanks_storage,
+            movement_data["destinationTankId"],
+            blend_into(lambda: movement_data.get("properties", [])),
         )
-        if dest_idx is not None:
-            dest_tank = tanks[dest_idx]
-            blended = calculate_blended_properties(
-                dest_tank["currentVolume"],
-                to_property_values(dest_tank["properties"]),
-                volume,
-                to_property_values(movement_data.get("properties", [])),
-            )
-            tanks[dest_idx]["properties"] = [p.model_dump() for p in blended]
-            tanks[dest_idx]["currentVolume"] += volume
-            tanks[dest_idx]["updatedAt"] = now
 
     elif movement_type == "ship":
-        src_idx = next(
-            (
-                i
-                for i, t in enumerate(tanks)
-                if t["id"] == movement_data["sourceTankId"]
-            ),
-            None,
-        )
-        if src_idx is not None:
-            tanks[src_idx]["currentVolume"] = max(
-                0, tanks[src_idx]["currentVolume"] - volume
-            )
-            tanks[src_idx]["updatedAt"] = now
+        uow.update(tanks_storage, movement_data["sourceTankId"], draw_from)
 
     elif movement_type == "transfer":
-        src_idx = next(
-            (
-                i
-                for i, t in enumerate(tanks)
-                if t["id"] == movement_data["sourceTankId"]
-            ),
-            None,
-        )
-        dest_idx = next(
-            (
-                i
-                for i, t in enumerate(tanks)
-                if t["id"] == movement_data["destinationTankId"]
-            ),
-            None,
+        src_tank = await uow.get_by_id(tanks_storage, movement_data["sourceTankId"])
+        if src_tank is None:
+            return
+
+        if movement_data.get("properties"):
+            uow.update(tanks_storage, movement_data["sourceTankId"], draw_from)
+            uow.update(
+                tanks_storage,
+                movement_data["destinationTankId"],
+                blend_into(lambda: movement_data["properties"]),
+            )
+            return
+
+        # The destination gets the source's blend as it is when the transfer
+        # leaves it; resolved in staging order, so the source goes first
+        carried = {"properties": src_tank["properties"]}
+
+        def draw_carried(src_tank: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+            if src_tank is not None:
+                carried["properties"] = src_tank["properties"]
+            return draw_from(src_tank)
+
+        uow.update(tanks_storage, movement_data["sourceTankId"], draw_carried)
+        uow.update(
+            tanks_storage,
+            movement_data["destinationTankId"],
+            blend_into(lambda: carried["properties"]),
         )
 
-        if src_idx is not None:
-            src_tank = tanks[src_idx]
-            tanks[src_idx]["currentVolume"] = max(
-                0, src_tank["currentVolume"] - volume
+
+@router.get("", response_model=List[Movement])
+async def list_movements(
+    request: Request,
+    tankId: Optional[str] = Query(None),
+    from_: Optional[str] = Query(None, alias="from", description="Earliest scheduledDate (inclusive)"),
+    to: Optional[str] = Query(None, description="Latest scheduledDate (exclusive)"),
+    status: Optional[MovementStatus] = Query(None),
+    limit: Optional[int] = Query(None, ge=1),
+    fields: Optional[str] = Query(None, description="Comma-separated fields to return"),
+    view: Optional[str] = Query(None, pattern="^(full|summary)$"),
+):
+    """Get movements by scheduledDate descending, optionally filtered by tank, date range and status."""
+    try:
+        selected = select_fields(Movement, fields, view, MOVEMENT_SUMMARY_FIELDS)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    model = fieldset_model(Movement, selected) if selected else Movement
+
+    async def query() -> List[Dict[str, Any]]:
+        if tankId:
+            movements = await movements_storage.range_query(
+                "tank", tankId, start=from_, end=to, descending=True
+            )
+        else:
+            movements = await movements_storage.range_query(
+                "scheduledDate", start=from_, end=to, descending=True
             )
-            tanks[src_idx]["updatedAt"] = now
-
-            if dest_idx is not None:
-                dest_tank = tanks[dest_idx]
-                transfer_props = (
-                    movement_data["properties"]
-                    if movement_data.get("properties")
-                    else src_tank["properties"]
-                )
-                blended = calculate_blended_properties(
-                    dest_tank["currentVolume"],
-                    to_property_values(dest_tank["properties"]),
-                    volume,
-                    to_property_values(transfer_props),
-                )
-                tanks[dest_idx]["properties"] = [p.model_dump() for p in blended]
-                tanks[dest_idx]["currentVolume"] += volume
-                tanks[dest_idx]["updatedAt"] = now
-
-    await tanks_storage.write(tanks)
 
+        if status is not None:
+            completed = status == MovementStatus.completed
+            movements = (m for m in movements if is_completed(m) == completed)
 
-@router.get("", response_model=List[Movement])
-async def list_movements(tankId: Optional[str] = Query(None)):
-    """Get all movements, optionally filtered by tank ID."""
-    movements = await movements_storage.read()
-
-    if tankId:
-        movements = [
-            m
-            for m in movements
-            if m.get("sourceTankId") == tankId
-            or m.get("destinationTankId") == tankId
-        ]
+        return project(islice(movements, limit), selected)
 
-    # Sort by scheduledDate descending
-    movements.sort(key=lambda m: m["scheduledDate"], reverse=True)
-    return movements
+    return await response_cache.respond(request, [movements_storage], List[model], query)
 
 
 @router.post("", response_model=Movement, status_code=201)
 async def create_movement(body: MovementCreate):
     """Create a new movement."""
-    tanks = await tanks_storage.read()
+    tanks: Dict[str, Dict[str, Any]] = {}
+    if body.sourceTankId:
+        source_tank = await tanks_storage.get_by_id(body.sourceTankId)
+        if source_tank is not None:
+            tanks[body.sourceTankId] = source_tank
 
     validation_errors = validate_movement(body, tanks)
     if validation_errors:
@@ -215,51 +312,267 @@ async def create_movement(body: MovementCreate):
             detail={"error": "Validation failed", "details": validation_errors},
         )
 
-    movements = await movements_storage.read()
-    now = get_utc_now()
+    new_movement = build_movement(body, get_utc_now())
+    if is_completed(new_movement):
+        await ensure_ledger(movement_tank_ids(new_movement))
+
+    async def stage(uow: UnitOfWork) -> List[str]:
+        uow.upsert(movements_storage, new_movement)
+        uow.log_audit(
+            AuditAction.create,
+            AuditEntityType.movement,
+            new_movement["id"],
+            new_movement["createdBy"],
+            {},
+            new_movement,
+        )
+        if not is_completed(new_movement):
+            return []
 
-    new_movement = {
-        "id": f"mov-{uuid.uuid4()}",
-        "type": body.type.value,
-        "date": body.date,  # If set, movement is completed
-        "scheduledDate": body.scheduledDate or now,
-        "expectedVolume": body.expectedVolume,
-        "actualVolume": body.actualVolume,
-        "sourceTankId": body.sourceTankId,
-        "destinationTankId": body.destinationTankId,
-        "properties": [p.model_dump() for p in body.properties],
-        "carrier": body.carrier,
-        "ticketNumber": body.ticketNumber,
-        "notes": body.notes,
-        "pdfPath": body.pdfPath,
-        "createdAt": now,
-        "createdBy": body.createdBy or "system",
-    }
+        # A completed movement at the end of its tanks' ledgers is applied to
+        # them directly; a backdated one means replaying their history
+        if await is_at_ledger_end(new_movement):
+            await apply_movement_to_tanks(new_movement, uow, check_capacity=True)
+            return []
+        return await reconcile_movements([(None, new_movement)], uow)
 
-    movements.append(new_movement)
-    await movements_storage.write(movements)
+    rebuilt, _ = await run_transaction(stage)
 
-    # Apply to tanks if completed (date is set)
-    if is_completed(new_movement):
-        await apply_movement_to_tanks(new_movement)
-
-    await log_audit(
-        AuditAction.create,
-        AuditEntityType.movement,
-        new_movement["id"],
-        new_movement["createdBy"],
-        {},
-        new_movement,
-    )
+    projection_cache.mark_dirty(movement_tank_ids(new_movement) + rebuilt)
 
     return new_movement
 
 
+async def stage_movements(
+    uow: UnitOfWork, items: List[Tuple[int, MovementCreate]], now: str
+) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]], List[Dict[str, Any]]]:
+    """Validate and stage new movements in order, each against the tanks as
+    left by the ones before it.
+
+    ``items`` are (index, movement) pairs. The caller runs ``ensure_ledger``
+    for the tanks involved first and ``finish_movements`` after committing.
+    Backdated movements are reconciled in the same unit of work. Returns the
+    per-item results, the staged movements and the ids of rebuilt tanks.
+    """
+    results: List[Dict[str, Any]] = []
+    created: List[Dict[str, Any]] = []
+    out_of_order: List[Dict[str, Any]] = []
+    # Latest ledger position applied per tank in this unit of work
+    staged_end: Dict[str, Any] = {}
+
+    for index, item in items:
+        tanks: Dict[str, Dict[str, Any]] = {}
+        if item.sourceTankId:
+            source_tank = await uow.get_by_id(tanks_storage, item.sourceTankId)
+            if source_tank is not None:
+                tanks[item.sourceTankId] = source_tank
+
+        errors = validate_movement(item, tanks)
+        if errors:
+            results.append({"index": index, "errors": errors})
+            continue
+
+        movement = build_movement(item, now)
+        uow.upsert(movements_storage, movement)
+        if is_completed(movement):
+            position = movement_position(movement)
+            in_order = await is_at_ledger_end(movement) and all(
+                position >= staged_end.get(t, position) for t in movement_tank_ids(movement)
+            )
+            if in_order:
+                await apply_movement_to_tanks(movement, uow, check_capacity=True)
+                for tank_id in movement_tank_ids(movement):
+                    staged_end[tank_id] = position
+            else:
+                out_of_order.append(movement)
+        uow.log_audit(
+            AuditAction.create,
+            AuditEntityType.movement,
+            movement["id"],
+            movement["createdBy"],
+            {},
+            movement,
+        )
+        created.append(movement)
+        results.append({"index": index, "movement": movement})
+
+    rebuilt: List[str] = []
+    if out_of_order:
+        rebuilt = await reconcile_movements(
+            [(None, m) for m in out_of_order],
+            uow,
+            [m for m in created if is_completed(m)],
+        )
+    return results, created, rebuilt
+
+
+def completed_tank_ids(items: List[MovementCreate]) -> List[str]:
+    """Tanks whose ledger the completed movements among ``items`` touch."""
+    return [
+        tank_id
+        for item in items
+        if item.date
+        for tank_id in (item.sourceTankId, item.destinationTankId)
+        if tank_id
+    ]
+
+
+async def finish_movements(created: List[Dict[str, Any]], rebuilt: List[str]) -> None:
+    """Post-commit work for staged movements: drop the affected projections."""
+    touched = list(rebuilt)
+    for movement in created:
+        touched += movement_tank_ids(movement)
+    projection_cache.mark_dirty(touched)
+
+
+@router.post("/batch", response_model=MovementBatchResult)
+async def create_movements_batch(body: MovementBatchCreate):
+    """Create many movements in one commit.
+
+    Each movement is validated against the tanks as left by the movements
+    before it in the batch, so source capacity accounts for earlier
+    shipments and transfers. Invalid movements are skipped and reported,
+    unless ``atomic`` is set, in which case nothing is saved.
+    """
+    await ensure_ledger(completed_tank_ids(body.movements))
+    now = get_utc_now()
+
+    async def stage(uow: UnitOfWork):
+        staged = await stage_movements(uow, list(enumerate(body.movements)), now)
+        results, created, _ = staged
+        if body.atomic and len(created) < len(body.movements):
+            raise HTTPException(
+                status_code=400,
+                detail={
+                    "error": "Validation failed",
+                    "details": [r for r in results if r.get("errors")],
+                },
+            )
+        return staged
+
+    (results, created, rebuilt), _ = await run_transaction(stage)
+
+    await finish_movements(created, rebuilt)
+
+    return {"created": len(created), "results": results}
+
+
+async def commit_import_chunk(
+    job: Dict[str, Any],
+    items: List[Tuple[int, MovementCreate]],
+    rejected: List[Dict[str, Any]],
+    last_row: int,
+) -> Dict[str, Any]:
+    """Save one chunk of an import together with the job's progress.
+
+    Movements are staged in date order (scheduledDate for scheduled ones),
+    so completed movements reach the tanks in the order they happened.
+    """
+    items = sorted(items, key=lambda item: item[1].date or item[1].scheduledDate or "")
+    await ensure_ledger(completed_tank_ids([movement for _, movement in items]))
+    now = get_utc_now()
+
+    async def stage(uow: UnitOfWork):
+        results, created, rebuilt = await stage_movements(uow, items, now)
+        errors = rejected + [
+            {"row": r["index"], "errors": r["errors"]} for r in results if r.get("errors")
+        ]
+        updated_job = record_chunk(
+            job, last_row, len(created), sorted(errors, key=lambda e: e["row"]), now
+        )
+        uow.upsert(import_jobs_storage, updated_job)
+        return updated_job, created, rebuilt
+
+    (job, created, rebuilt), _ = await run_transaction(stage)
+
+    await finish_movements(created, rebuilt)
+    return job
+
+
+@router.post("/import")
+async def import_movements(
+    file: UploadFile = File(...),
+    format: Optional[str] = Query(None, description="csv or ndjson; taken from the file name if omitted"),
+    jobId: Optional[str] = Query(None, description="Resume this import job"),
+    chunkSize: int = Query(IMPORT_CHUNK_SIZE, ge=1, le=10000),
+):
+    """Bulk import historical movements from a CSV or NDJSON file.
+
+    Rows are committed in chunks and the response streams the job as NDJSON
+    after each one. If the import stops part way, upload the same file with
+    the job's ``jobId`` to continue after the last committed chunk.
+    """
+    try:
+        fmt = detect_format(file.filename, format)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    if jobId:
+        job = await import_jobs_storage.get_by_id(jobId)
+        if not job:
+            raise HTTPException(status_code=404, detail="Import job not found")
+        if job["status"] == "completed":
+            raise HTTPException(status_code=400, detail="Import job already completed")
+        job = {**job, "status": "running", "updatedAt": get_utc_now()}
+    else:
+        job = new_job(file.filename, fmt, get_utc_now())
+    await import_jobs_storage.upsert(job)
+
+    async def progress():
+        async for update in run_import(
+            file.file, fmt, job, commit_import_chunk, get_utc_now, chunkSize
+        ):
+            yield json.dumps(update) + "\n"
+
+    return StreamingResponse(progress(), media_type="application/x-ndjson")
+
+
+@router.get("/import/{job_id}", response_model=MovementImportJob)
+async def get_import_job(job_id: str):
+    """Get the progress of an import job."""
+    job = await import_jobs_storage.get_by_id(job_id)
+
+    if not job:
+        raise HTTPException(status_code=404, detail="Import job not found")
+
+    return job
+
+
+@router.get("/export")
+async def export_movements(
+    format: str = Query("ndjson", pattern="^(ndjson|csv)$"),
+    tankId: Optional[str] = Query(None),
+    from_: Optional[str] = Query(None, alias="from", description="Earliest scheduledDate (inclusive)"),
+    to: Optional[str] = Query(None, description="Latest scheduledDate (exclusive)"),
+    status: Optional[MovementStatus] = Query(None),
+):
+    """Stream movements by scheduledDate ascending as NDJSON or CSV.
+
+    Takes the same filters as the list endpoint. CSV properties are written
+    as ``id=value;id=value``, so the file can be imported again.
+    """
+    index, key = ("tank", tankId) if tankId else ("scheduledDate", None)
+
+    async def fetch_page(after, size):
+        movements = await movements_storage.range_query(index, key, start=from_, end=to, after=after)
+        return list(islice(movements, size))
+
+    def keep(movement: Dict[str, Any]) -> bool:
+        return status is None or is_completed(movement) == (status == MovementStatus.completed)
+
+    return StreamingResponse(
+        encode_export(
+            iter_pages(fetch_page, "scheduledDate"), format, MOVEMENT_COLUMNS, movement_csv_row, keep
+        ),
+        media_type=MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="movements.{format}"'},
+    )
+
+
 @router.get("/{movement_id}", response_model=Movement)
 async def get_movement(movement_id: str):
     """Get a movement by ID."""
-    movements = await movements_storage.read()
-    movement = next((m for m in movements if m["id"] == movement_id), None)
+    movement = await movements_storage.get_by_id(movement_id)
 
     if not movement:
         raise HTTPException(status_code=404, detail="Movement not found")
@@ -270,66 +583,108 @@ async def get_movement(movement_id: str):
 @router.patch("/{movement_id}", response_model=Movement)
 async def update_movement(movement_id: str, body: MovementUpdate):
     """Update a movement."""
-    movements = await movements_storage.read()
-    index = next(
-        (i for i, m in enumerate(movements) if m["id"] == movement_id), None
-    )
+    movement = await movements_storage.get_by_id(movement_id)
 
-    if index is None:
+    if movement is None:
         raise HTTPException(status_code=404, detail="Movement not found")
 
-    current = movements[index]
-    was_completed = is_completed(current)
-    old_movement = dict(current)
-
-    # Apply updates
+    was_completed = is_completed(movement)
+    old_movement = dict(movement)
     updates = body.model_dump(exclude_unset=True, exclude={"userId"})
-    for key, value in updates.items():
-        if key not in ("id", "createdAt", "createdBy"):
-            if key == "properties" and value is not None:
-                movements[index][key] = [p.model_dump() if hasattr(p, "model_dump") else p for p in value]
-            else:
-                movements[index][key] = value
 
-    await movements_storage.write(movements)
+    def apply_updates(movement: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+        if movement is None:
+            raise HTTPException(status_code=404, detail="Movement not found")
+
+        for key, value in updates.items():
+            if key not in ("id", "createdAt", "createdBy"):
+                if key == "properties" and value is not None:
+                    movement[key] = [p.model_dump() if hasattr(p, "model_dump") else p for p in value]
+                else:
+                    movement[key] = value
+        return movement
+
+    # The ledger work below is planned from the movement as read here
+    movement = apply_updates(movement)
+
+    # Corrections to a completed movement rewrite its tanks' history
+    completed_now = not was_completed and is_completed(movement)
+    if was_completed or completed_now:
+        await ensure_ledger(
+            movement_tank_ids(old_movement) + movement_tank_ids(movement)
+        )
+
+    # Applied to the movement as it is at commit time, so concurrent PATCHes
+    # of different fields don't overwrite each other
+    async def stage(uow: UnitOfWork) -> List[str]:
+        uow.update(
+            movements_storage,
+            movement_id,
+            apply_updates,
+            lambda old, new: uow.log_audit(
+                AuditAction.update,
+                AuditEntityType.movement,
+                movement_id,
+                body.userId or "system",
+                old,
+                new,
+            ),
+        )
+
+        # Apply to tanks if movement is now completed (date was just set)
+        if completed_now and await is_at_ledger_end(movement):
+            await apply_movement_to_tanks(movement, uow)
+            return []
+        if was_completed or completed_now:
+            return await reconcile_movements(
+                [
+                    (
+                        old_movement if was_completed else None,
+                        movement if is_completed(movement) else None,
+                    )
+                ],
+                uow,
+            )
+        return []
 
-    # Apply to tanks if movement is now completed (date was just set)
-    if not was_completed and is_completed(movements[index]):
-        await apply_movement_to_tanks(movements[index])
+    rebuilt, uow = await run_transaction(stage)
 
-    await log_audit(
-        AuditAction.update,
-        AuditEntityType.movement,
-        movement_id,
-        body.userId or "system",
-        old_movement,
-        movements[index],
+    projection_cache.mark_dirty(
+        movement_tank_ids(old_movement) + movement_tank_ids(movement) + rebuilt
     )
 
-    return movements[index]
+    return uow.result(movements_storage, movement_id)
 
 
 @router.delete("/{movement_id}")
 async def delete_movement(movement_id: str):
     """Delete a movement."""
-    movements = await movements_storage.read()
-    index = next(
-        (i for i, m in enumerate(movements) if m["id"] == movement_id), None
-    )
+    deleted = await movements_storage.get_by_id(movement_id)
 
-    if index is None:
+    if deleted is None:
         raise HTTPException(status_code=404, detail="Movement not found")
 
-    deleted = movements.pop(index)
-    await movements_storage.write(movements)
+    if is_completed(deleted):
+        await ensure_ledger(movement_tank_ids(deleted))
+
+    async def stage(uow: UnitOfWork) -> List[str]:
+        uow.delete(movements_storage, movement_id)
+        uow.log_audit(
+            AuditAction.delete,
+            AuditEntityType.movement,
+            movement_id,
+            "system",
+            deleted,
+            {},
+        )
+
+        # Take the movement out of its tanks' history
+        if is_completed(deleted):
+            return await reconcile_movements([(deleted, None)], uow)
+        return []
 
-    await log_audit(
-        AuditAction.delete,
-        AuditEntityType.movement,
-        movement_id,
-        "system",
-        deleted,
-        {},
-    )
+    rebuilt, _ = await run_transaction(stage)
+
+    projection_cache.mark_dirty(movement_tank_ids(deleted) + rebuilt)
 
     return {"success": True}
@@ -1,10 +1,22 @@
-import uuid
+import asyncio
+import hashlib
+import json
+import os
+import tempfile
 from pathlib import Path
+from typing import Any, BinaryIO, Dict, List
 
-from fastapi import APIRouter, HTTPException, UploadFile, File
+from fastapi import APIRouter, HTTPException, Request, UploadFile, File
+from fastapi.responses import StreamingResponse
 
+from app.services.extraction_cache import extraction_cache
 from app.services.file_storage import properties_storage
-from app.services.pdf_extraction import extract_data_from_pdf
+from app.services.multipart_upload import MultipartFileReader
+from app.services.pdf_extraction import (
+    extract_data_from_pdf,
+    extraction_stats,
+    parse_process_pool,
+)
 
 router = APIRouter(tags=["pdf"])
 
@@ -12,6 +24,13 @@ router = APIRouter(tags=["pdf"])
 UPLOADS_DIR = Path(__file__).parent.parent.parent.parent / "uploads"
 ALLOWED_MIME_TYPES = ["application/pdf"]
 MAX_FILE_SIZE = 10 * 1024 * 1024  # 10MB
+# Room for the multipart boundaries and headers around an upload's file
+UPLOAD_FORM_OVERHEAD = 64 * 1024
+# Stored uploads are served as static files
+UPLOAD_FILE_MODE = 0o644
+MAX_BATCH_FILES = 50
+# Files of a batch being extracted at the same time
+BATCH_CONCURRENCY = 8
 
 
 @router.post("/extract-pdf")
@@ -31,38 +50,165 @@ async def extract_pdf(file: UploadFile = File(...)):
             status_code=400, detail="File too large. Maximum size is 10MB."
         )
 
-    properties = await properties_storage.read()
-    result = await extract_data_from_pdf(content, properties)
+    properties = await properties_storage.snapshot()
+    result = await extraction_cache.get_or_extract(content, properties, extract_data_from_pdf)
 
     return result
 
 
-@router.post("/upload-pdf")
-async def upload_pdf(file: UploadFile = File(...)):
-    """Upload a PDF file."""
-    # Validate MIME type
-    if file.content_type not in ALLOWED_MIME_TYPES:
-        raise HTTPException(
-            status_code=400, detail="Invalid file type. Only PDF files are allowed."
-        )
+@router.get("/extract-pdf/stats")
+def get_extraction_stats():
+    """How many extractions in this worker the rules answered without the LLM,
+    and how many LLM calls the others made and lost."""
+    return extraction_stats.snapshot()
 
-    content = await file.read()
 
-    # Validate size
-    if len(content) > MAX_FILE_SIZE:
+@router.post("/extract-pdf/batch")
+async def extract_pdf_batch(files: List[UploadFile] = File(...)):
+    """Extract data from many PDFs at once, streaming each result as it finishes.
+
+    PDFs are parsed in parallel in a process pool and their LLM calls run
+    concurrently, within the extraction concurrency limit. The response is
+    NDJSON, one line per file in completion order, each with the file's
+    ``index`` and ``filename`` and either its ``result`` or an ``error``.
+    """
+    if len(files) > MAX_BATCH_FILES:
         raise HTTPException(
-            status_code=400, detail="File too large. Maximum size is 10MB."
+            status_code=400, detail=f"Too many files. Maximum is {MAX_BATCH_FILES} per batch."
         )
 
-    # Ensure uploads directory exists
+    properties = await properties_storage.snapshot()
+    parse_executor = parse_process_pool()
+    # Bounds how many files are read into memory at once
+    slots = asyncio.Semaphore(BATCH_CONCURRENCY)
+
+    async def extract_one(index: int, file: UploadFile) -> Dict[str, Any]:
+        line: Dict[str, Any] = {"index": index, "filename": file.filename}
+        if file.content_type not in ALLOWED_MIME_TYPES:
+            return {**line, "error": "Invalid file type. Only PDF files are allowed."}
+        async with slots:
+            content = await file.read(MAX_FILE_SIZE + 1)
+            if len(content) > MAX_FILE_SIZE:
+                return {**line, "error": "File too large. Maximum size is 10MB."}
+            try:
+                result = await extraction_cache.get_or_extract(
+                    content,
+                    properties,
+                    lambda pdf, props: extract_data_from_pdf(pdf, props, parse_executor),
+                )
+            except Exception as e:
+                print(f"PDF extraction failed for {file.filename}: {e!r}")
+                return {**line, "error": "Could not read PDF"}
+        return {**line, "result": result}
+
+    async def results():
+        tasks = [asyncio.ensure_future(extract_one(i, f)) for i, f in enumerate(files)]
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                yield json.dumps(await next_done) + "\n"
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    return StreamingResponse(results(), media_type="application/x-ndjson")
+
+
+def _open_upload_file() -> BinaryIO:
+    # Next to the uploads so the finished file can be renamed into place
     UPLOADS_DIR.mkdir(parents=True, exist_ok=True)
+    return tempfile.NamedTemporaryFile(
+        dir=UPLOADS_DIR, prefix=".upload-", suffix=".tmp", delete=False
+    )
+
+
+def _write_chunk(tmp: BinaryIO, digest: Any, chunk: bytes) -> None:
+    tmp.write(chunk)
+    digest.update(chunk)
+
+
+def _store_upload(tmp_path: Path, filepath: Path) -> None:
+    """Move a finished upload to its content address, unless a copy is
+    already stored there."""
+    if filepath.exists():
+        tmp_path.unlink()
+    else:
+        # NamedTemporaryFile creates files readable by their owner only
+        os.chmod(tmp_path, UPLOAD_FILE_MODE)
+        os.replace(tmp_path, filepath)
+
+
+def _check_upload_type(reader: MultipartFileReader) -> None:
+    # Validate MIME type
+    if reader.content_type not in ALLOWED_MIME_TYPES:
+        raise HTTPException(
+            status_code=400, detail="Invalid file type. Only PDF files are allowed."
+        )
 
-    # Generate unique filename
-    ext = Path(file.filename).suffix if file.filename else ".pdf"
-    filename = f"{uuid.uuid4()}{ext}"
-    filepath = UPLOADS_DIR / filename
 
-    # Write file
-    filepath.write_bytes(content)
+@router.post(
+    "/upload-pdf",
+    openapi_extra={
+        "requestBody": {
+            "required": True,
+            "content": {
+                "multipart/form-data": {
+                    "schema": {
+                        "type": "object",
+                        "required": ["file"],
+                        "properties": {"file": {"type": "string", "format": "binary"}},
+                    }
+                }
+            },
+        }
+    },
+)
+async def upload_pdf(request: Request):
+    """Upload a PDF file, sent as the ``file`` field of a multipart form.
+
+    The request body is parsed as it arrives, so an oversized upload is
+    turned away as soon as it passes the limit. The file is written to a
+    temporary file, hashed on the way, and stored as ``<sha256>.pdf``, so
+    the same certificate uploaded twice is stored once. File access runs
+    in worker threads.
+    """
+    try:
+        reader = MultipartFileReader(request.headers.get("content-type", ""), "file")
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    digest = hashlib.sha256()
+    received = 0
+    size = 0
+    tmp = await asyncio.to_thread(_open_upload_file)
+    tmp_path = Path(tmp.name)
+    try:
+        try:
+            async for chunk in request.stream():
+                received += len(chunk)
+                try:
+                    data = reader.feed(chunk)
+                except ValueError as e:
+                    raise HTTPException(status_code=400, detail=str(e))
+                if reader.found:
+                    _check_upload_type(reader)
+                size += sum(len(d) for d in data)
+                # Validate size
+                if size > MAX_FILE_SIZE or received > MAX_FILE_SIZE + UPLOAD_FORM_OVERHEAD:
+                    raise HTTPException(
+                        status_code=400, detail="File too large. Maximum size is 10MB."
+                    )
+                if data:
+                    await asyncio.to_thread(_write_chunk, tmp, digest, b"".join(data))
+        finally:
+            await asyncio.to_thread(tmp.close)
+
+        if not reader.complete:
+            raise HTTPException(status_code=400, detail="No PDF file in the upload.")
+
+        filename = f"{digest.hexdigest()}.pdf"
+        await asyncio.to_thread(_store_upload, tmp_path, UPLOADS_DIR / filename)
+    except BaseException:
+        await asyncio.to_thread(tmp_path.unlink, missing_ok=True)
+        raise
 
     return {"path": f"/uploads/{filename}"}
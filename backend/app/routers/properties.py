@@ -1,13 +1,14 @@
 import uuid
 from datetime import datetime, timezone
-from typing import List
+from typing import Any, Dict, List, Optional
 
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Request
 
 from app.models.property import PropertyDefinition, PropertyDefinitionCreate, PropertyDefinitionUpdate
 from app.models.common import AuditAction, AuditEntityType
 from app.services.file_storage import properties_storage
-from app.services.audit_service import log_audit
+from app.services.response_cache import response_cache
+from app.services.unit_of_work import transaction
 
 router = APIRouter(prefix="/properties", tags=["properties"])
 
@@ -17,10 +18,22 @@ def get_utc_now() -> str:
     return datetime.now(timezone.utc).isoformat().replace("+00:00", "Z")
 
 
+def clean_aliases(aliases: List[str]) -> List[str]:
+    """Trimmed, non-empty aliases without duplicates (case-insensitive)."""
+    cleaned: Dict[str, str] = {}
+    for alias in aliases:
+        alias = alias.strip()
+        if alias:
+            cleaned.setdefault(alias.lower(), alias)
+    return list(cleaned.values())
+
+
 @router.get("", response_model=List[PropertyDefinition])
-async def list_properties():
+async def list_properties(request: Request):
     """Get all property definitions."""
-    return await properties_storage.read()
+    return await response_cache.respond(
+        request, [properties_storage], List[PropertyDefinition], properties_storage.snapshot
+    )
 
 
 @router.post("", response_model=PropertyDefinition, status_code=201)
@@ -29,7 +42,7 @@ async def create_property(body: PropertyDefinitionCreate):
     if not body.name or not body.name.strip():
         raise HTTPException(status_code=400, detail="Property name is required")
 
-    properties = await properties_storage.read()
+    properties = await properties_storage.snapshot()
 
     # Check duplicate names (case-insensitive)
     if any(p["name"].lower() == body.name.strip().lower() for p in properties):
@@ -41,20 +54,20 @@ async def create_property(body: PropertyDefinitionCreate):
         "id": f"prop-{uuid.uuid4()}",
         "name": body.name.strip(),
         "unit": body.unit.strip() if body.unit else "",
+        "aliases": clean_aliases(body.aliases),
         "createdAt": get_utc_now(),
     }
 
-    properties.append(new_property)
-    await properties_storage.write(properties)
-
-    await log_audit(
-        AuditAction.create,
-        AuditEntityType.property,
-        new_property["id"],
-        body.userId or "system",
-        {},
-        new_property,
-    )
+    async with transaction() as uow:
+        uow.upsert(properties_storage, new_property)
+        uow.log_audit(
+            AuditAction.create,
+            AuditEntityType.property,
+            new_property["id"],
+            body.userId or "system",
+            {},
+            new_property,
+        )
 
     return new_property
 
@@ -62,16 +75,14 @@ async def create_property(body: PropertyDefinitionCreate):
 @router.patch("/{property_id}", response_model=PropertyDefinition)
 async def update_property(property_id: str, body: PropertyDefinitionUpdate):
     """Update a property definition."""
-    properties = await properties_storage.read()
-    index = next(
-        (i for i, p in enumerate(properties) if p["id"] == property_id), None
-    )
+    prop = await properties_storage.get_by_id(property_id)
 
-    if index is None:
+    if prop is None:
         raise HTTPException(status_code=404, detail="Property not found")
 
     # Check duplicate name if changing
     if body.name:
+        properties = await properties_storage.snapshot()
         duplicate = next(
             (
                 p
@@ -86,47 +97,55 @@ async def update_property(property_id: str, body: PropertyDefinitionUpdate):
                 status_code=400, detail="A property with this name already exists"
             )
 
-    old_property = dict(properties[index])
-
-    if body.name:
-        properties[index]["name"] = body.name.strip()
-    if body.unit is not None:
-        properties[index]["unit"] = body.unit.strip()
-
-    await properties_storage.write(properties)
-    await log_audit(
-        AuditAction.update,
-        AuditEntityType.property,
-        property_id,
-        body.userId or "system",
-        old_property,
-        properties[index],
-    )
+    def apply_updates(prop: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+        if prop is None:
+            raise HTTPException(status_code=404, detail="Property not found")
+
+        if body.name:
+            prop["name"] = body.name.strip()
+        if body.unit is not None:
+            prop["unit"] = body.unit.strip()
+        if body.aliases is not None:
+            prop["aliases"] = clean_aliases(body.aliases)
+        return prop
+
+    # Applied to the property as it is at commit time, so concurrent PATCHes
+    # of different fields don't overwrite each other
+    async with transaction() as uow:
+        uow.update(
+            properties_storage,
+            property_id,
+            apply_updates,
+            lambda old, new: uow.log_audit(
+                AuditAction.update,
+                AuditEntityType.property,
+                property_id,
+                body.userId or "system",
+                old,
+                new,
+            ),
+        )
 
-    return properties[index]
+    return uow.result(properties_storage, property_id)
 
 
 @router.delete("/{property_id}")
 async def delete_property(property_id: str):
     """Delete a property definition."""
-    properties = await properties_storage.read()
-    index = next(
-        (i for i, p in enumerate(properties) if p["id"] == property_id), None
-    )
+    deleted = await properties_storage.get_by_id(property_id)
 
-    if index is None:
+    if deleted is None:
         raise HTTPException(status_code=404, detail="Property not found")
 
-    deleted = properties.pop(index)
-    await properties_storage.write(properties)
-
-    await log_audit(
-        AuditAction.delete,
-        AuditEntityType.property,
-        property_id,
-        "system",
-        deleted,
-        {},
-    )
+    async with transaction() as uow:
+        uow.delete(properties_storage, property_id)
+        uow.log_audit(
+            AuditAction.delete,
+            AuditEntityType.property,
+            property_id,
+            "system",
+            deleted,
+            {},
+        )
 
     return {"success": True}
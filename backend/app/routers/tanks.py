@@ -1,16 +1,36 @@
 import uuid
 from datetime import datetime, timezone
-from typing import List
-
-from fastapi import APIRouter, HTTPException
-
-from app.models.tank import Tank, TankCreate, TankUpdate, TankReset
+from typing import Any, Dict, List, Optional
+
+from fastapi import APIRouter, HTTPException, Query, Request
+
+from app.models.tank import (
+    Tank,
+    TankCreate,
+    TankUpdate,
+    TankReset,
+    FleetProjection,
+    TankLevels,
+)
 from app.models.common import DEFAULT_PRODUCT, AuditAction, AuditEntityType
-from app.services.file_storage import tanks_storage
-from app.services.audit_service import log_audit
+from app.services.fieldsets import fieldset_model, project, select_fields
+from app.services.file_storage import tanks_storage, tank_events_storage
+from app.services.projections import projection_cache
+from app.services.response_cache import response_cache
+from app.services.tank_levels import get_tank_levels
+from app.services.tank_ledger import (
+    build_set_event,
+    ensure_ledger,
+    set_event_timestamp,
+    tank_state_as_of,
+)
+from app.services.unit_of_work import transaction
 
 router = APIRouter(prefix="/tanks", tags=["tanks"])
 
+# Fields returned by view=summary, enough for pickers and lists
+TANK_SUMMARY_FIELDS = ("id", "name", "product", "currentVolume")
+
 
 def get_utc_now() -> str:
     """Get current UTC time in ISO format."""
@@ -18,9 +38,22 @@ def get_utc_now() -> str:
 
 
 @router.get("", response_model=List[Tank])
-async def list_tanks():
-    """Get all tanks."""
-    return await tanks_storage.read()
+async def list_tanks(
+    request: Request,
+    fields: Optional[str] = Query(None, description="Comma-separated fields to return"),
+    view: Optional[str] = Query(None, pattern="^(full|summary)$"),
+):
+    """Get all tanks, optionally only some of their fields."""
+    try:
+        selected = select_fields(Tank, fields, view, TANK_SUMMARY_FIELDS)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    model = fieldset_model(Tank, selected) if selected else Tank
+
+    async def query() -> List[Dict[str, Any]]:
+        return project(await tanks_storage.snapshot(), selected)
+
+    return await response_cache.respond(request, [tanks_storage], List[model], query)
 
 
 @router.post("", response_model=Tank, status_code=201)
@@ -29,7 +62,7 @@ async def create_tank(body: TankCreate):
     if not body.name or not body.name.strip():
         raise HTTPException(status_code=400, detail="Tank name is required")
 
-    tanks = await tanks_storage.read()
+    tanks = await tanks_storage.snapshot()
 
     # Check duplicate names (case-insensitive)
     if any(t["name"].lower() == body.name.strip().lower() for t in tanks):
@@ -49,66 +82,129 @@ async def create_tank(body: TankCreate):
         "updatedAt": now,
     }
 
-    tanks.append(new_tank)
-    await tanks_storage.write(tanks)
-
-    await log_audit(
-        AuditAction.create,
-        AuditEntityType.tank,
-        new_tank["id"],
-        body.userId or "system",
-        {},
-        new_tank,
-    )
+    async with transaction() as uow:
+        uow.upsert(tanks_storage, new_tank)
+        uow.upsert(
+            tank_events_storage,
+            build_set_event(
+                new_tank["id"], "create", now, new_tank["currentVolume"], new_tank["properties"]
+            ),
+        )
+        uow.log_audit(
+            AuditAction.create,
+            AuditEntityType.tank,
+            new_tank["id"],
+            body.userId or "system",
+            {},
+            new_tank,
+        )
 
+    projection_cache.mark_dirty([new_tank["id"]])
     return new_tank
 
 
+@router.get("/projections", response_model=FleetProjection)
+async def get_projections(
+    horizon: int = Query(30, ge=1, le=366, description="Days to project ahead"),
+):
+    """Project every tank over its scheduled movements, with end-of-day volumes."""
+    today = datetime.now(timezone.utc).date()
+    return await projection_cache.get(today, horizon)
+
+
 @router.get("/{tank_id}", response_model=Tank)
-async def get_tank(tank_id: str):
-    """Get a tank by ID."""
-    tanks = await tanks_storage.read()
-    tank = next((t for t in tanks if t["id"] == tank_id), None)
+async def get_tank(
+    tank_id: str,
+    asOf: Optional[str] = Query(None, description="Return the tank's state at this time"),
+):
+    """Get a tank by ID, optionally as it was at a point in time."""
+    tank = await tanks_storage.get_by_id(tank_id)
 
     if not tank:
         raise HTTPException(status_code=404, detail="Tank not found")
 
+    if asOf:
+        state = await tank_state_as_of(tank_id, asOf)
+        if state is None:
+            raise HTTPException(status_code=404, detail="No recorded state for this tank at asOf")
+        tank["currentVolume"] = state["volume"]
+        tank["properties"] = state["properties"]
+        tank["updatedAt"] = state["position"][0]
+
     return tank
 
 
-@router.patch("/{tank_id}", response_model=Tank)
-async def update_tank(tank_id: str, body: TankUpdate):
-    """Update a tank."""
-    tanks = await tanks_storage.read()
-    index = next((i for i, t in enumerate(tanks) if t["id"] == tank_id), None)
+@router.get("/{tank_id}/levels", response_model=TankLevels)
+async def get_levels(
+    tank_id: str,
+    from_: Optional[str] = Query(None, alias="from", description="Earliest time (inclusive)"),
+    to: Optional[str] = Query(None, description="Latest time (exclusive)"),
+    points: int = Query(500, ge=3, le=5000, description="Maximum points to return"),
+):
+    """Get the tank's volume over time, downsampled for charting."""
+    tank = await tanks_storage.get_by_id(tank_id)
 
-    if index is None:
+    if not tank:
         raise HTTPException(status_code=404, detail="Tank not found")
 
-    old_tank = dict(tanks[index])
+    try:
+        return await get_tank_levels(tank, from_, to, points)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid from/to timestamp")
 
-    # Apply updates (excluding id, createdAt)
-    updates = body.model_dump(exclude_unset=True, exclude={"userId"})
-    for key, value in updates.items():
-        if key not in ("id", "createdAt"):
-            if key == "properties" and value is not None:
-                tanks[index][key] = [p.model_dump() if hasattr(p, "model_dump") else p for p in value]
-            else:
-                tanks[index][key] = value
 
-    tanks[index]["updatedAt"] = get_utc_now()
-
-    await tanks_storage.write(tanks)
-    await log_audit(
-        AuditAction.update,
-        AuditEntityType.tank,
-        tank_id,
-        body.userId or "system",
-        old_tank,
-        tanks[index],
-    )
-
-    return tanks[index]
+@router.patch("/{tank_id}", response_model=Tank)
+async def update_tank(tank_id: str, body: TankUpdate):
+    """Update a tank."""
+    user_id = body.userId or "system"
+    updates = body.model_dump(exclude_unset=True, exclude={"userId"})
+    sets_state = "currentVolume" in updates or "properties" in updates
+    # The ledger opens from the state before this edit, ahead of its event
+    if sets_state:
+        await ensure_ledger([tank_id])
+    now = get_utc_now()
+    updated: Dict[str, Any] = {}
+
+    def apply_updates(tank: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+        if tank is None:
+            raise HTTPException(status_code=404, detail="Tank not found")
+
+        # Apply updates (excluding id, createdAt)
+        for key, value in updates.items():
+            if key not in ("id", "createdAt"):
+                if key == "properties" and value is not None:
+                    tank[key] = [p.model_dump() if hasattr(p, "model_dump") else p for p in value]
+                else:
+                    tank[key] = value
+
+        tank["updatedAt"] = now
+        return tank
+
+    def on_applied(old: Dict[str, Any], new: Dict[str, Any]) -> None:
+        updated.update(new)
+        uow.log_audit(AuditAction.update, AuditEntityType.tank, tank_id, user_id, old, new)
+
+    # Applied to the tank as it is at commit time, so concurrent PATCHes
+    # of different fields don't overwrite each other
+    async with transaction() as uow:
+        uow.update(tanks_storage, tank_id, apply_updates, on_applied)
+
+        # Editing volume or properties sets them in the tank's ledger
+        if sets_state:
+            timestamp = await set_event_timestamp(tank_id, now)
+            event = build_set_event(tank_id, "update", timestamp, 0, [])
+            uow.update(
+                tank_events_storage,
+                event["id"],
+                lambda _: {
+                    **event,
+                    "volume": updated["currentVolume"],
+                    "properties": updated["properties"],
+                },
+            )
+
+    projection_cache.mark_dirty([tank_id])
+    return uow.result(tanks_storage, tank_id)
 
 
 @router.post("/{tank_id}/reset", response_model=Tank)
@@ -117,27 +213,46 @@ async def reset_tank(tank_id: str, body: TankReset):
     if body.volume < 0:
         raise HTTPException(status_code=400, detail="Valid volume is required")
 
-    tanks = await tanks_storage.read()
-    index = next((i for i, t in enumerate(tanks) if t["id"] == tank_id), None)
-
-    if index is None:
-        raise HTTPException(status_code=404, detail="Tank not found")
-
-    old_tank = dict(tanks[index])
-
-    tanks[index]["currentVolume"] = body.volume
-    tanks[index]["properties"] = [p.model_dump() for p in body.properties]
-    tanks[index]["updatedAt"] = get_utc_now()
-
-    await tanks_storage.write(tanks)
-    await log_audit(
-        AuditAction.reset,
-        AuditEntityType.tank,
-        tank_id,
-        body.userId or "system",
-        old_tank,
-        tanks[index],
-        "Tank values reset from PDF measurement",
-    )
+    user_id = body.userId or "system"
+    # The ledger opens from the state before the reset, ahead of its event
+    await ensure_ledger([tank_id])
+    now = get_utc_now()
+    properties = [p.model_dump() for p in body.properties]
+
+    def apply_reset(tank: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+        if tank is None:
+            raise HTTPException(status_code=404, detail="Tank not found")
+
+        tank["currentVolume"] = body.volume
+        tank["properties"] = properties
+        tank["updatedAt"] = now
+        return tank
+
+    async with transaction() as uow:
+        uow.update(
+            tanks_storage,
+            tank_id,
+            apply_reset,
+            lambda old, new: uow.log_audit(
+                AuditAction.reset,
+                AuditEntityType.tank,
+                tank_id,
+                user_id,
+                old,
+                new,
+                "Tank values reset from PDF measurement",
+            ),
+        )
+        uow.upsert(
+            tank_events_storage,
+            build_set_event(
+                tank_id,
+                "reset",
+                await set_event_timestamp(tank_id, now),
+                body.volume,
+                properties,
+            ),
+        )
 
-    return tanks[index]
+    projection_cache.mark_dirty([tank_id])
+    return uow.result(tanks_storage, tank_id)
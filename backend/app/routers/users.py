@@ -11,4 +11,4 @@ router = APIRouter(prefix="/users", tags=["users"])
 @router.get("", response_model=List[User])
 async def list_users():
     """Get all users."""
-    return await users_storage.read()
+    return await users_storage.snapshot()
@@ -0,0 +1,140 @@
+import asyncio
+from typing import Any, AsyncIterator, Dict, List, Set, Tuple
+
+from app.services.file_storage import audit_storage
+
+SUBSCRIBER_QUEUE_SIZE = 256
+CATCH_UP_PAGE_SIZE = 500
+# How often the audit log is checked for commits made by other workers
+POLL_SECONDS = 0.5
+
+Change = Dict[str, Any]
+
+
+def build_change(position: str, entry: Dict[str, Any]) -> Change:
+    """A compact change notification from a committed audit entry.
+
+    ``position`` is the entry's position in the audit log, which doubles as
+    its SSE event id.
+    """
+    return {
+        "id": entry["id"],
+        "version": position,
+        "action": entry["action"],
+        "entityType": entry["entityType"],
+        "entityId": entry["entityId"],
+        "timestamp": entry["timestamp"],
+        "record": (entry.get("changes") or {}).get("new") or None,
+    }
+
+
+class _Subscriber:
+    def __init__(self):
+        self.queue: asyncio.Queue[Change] = asyncio.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+        self.dropped = False
+
+
+class ChangeFeed:
+    """Fans out committed changes to the subscribers in this worker.
+
+    Changes are read by tailing the audit log, so subscribers see commits
+    from every worker: a commit in this worker wakes the tail at once, and
+    others are picked up within POLL_SECONDS. The tail runs while anyone is
+    subscribed here. Each subscriber has a bounded queue; one that falls a
+    full queue behind is dropped rather than holding changes in memory for
+    it, and reconnects with its last event id, the position of that change
+    in the log, to catch up from there before live changes resume.
+    """
+
+    def __init__(self):
+        self._subscribers: Set[_Subscriber] = set()
+        # Log position the tail has read up to
+        self._position = ""
+        self._wake: asyncio.Event | None = None
+        self._tailer: asyncio.Task | None = None
+
+    def notify(self) -> None:
+        """Wake the tail after a commit in this worker."""
+        if self._wake is not None:
+            self._wake.set()
+
+    def _publish(self, entries: List[Tuple[str, Dict[str, Any]]]) -> None:
+        changes = [build_change(position, entry) for position, entry in entries]
+        for subscriber in list(self._subscribers):
+            try:
+                for change in changes:
+                    subscriber.queue.put_nowait(change)
+            except asyncio.QueueFull:
+                subscriber.dropped = True
+                self._subscribers.discard(subscriber)
+
+    async def _tail(self, wake: asyncio.Event) -> None:
+        try:
+            while True:
+                wake.clear()
+                entries, self._position = await audit_storage.tail(
+                    self._position, CATCH_UP_PAGE_SIZE
+                )
+                self._publish(entries)
+                if len(entries) == CATCH_UP_PAGE_SIZE:
+                    continue
+                try:
+                    await asyncio.wait_for(wake.wait(), POLL_SECONDS)
+                except asyncio.TimeoutError:
+                    pass
+        except Exception as e:
+            # Subscribers reconnect and catch up from their last event
+            print(f"Change feed stopped: {e}")
+            for subscriber in self._subscribers:
+                subscriber.dropped = True
+            self._subscribers.clear()
+
+    async def subscribe(
+        self, last_position: str | None, keepalive: float
+    ) -> AsyncIterator[Change | None]:
+        """Changes after ``last_position`` (if given), then live ones.
+
+        Yields None after ``keepalive`` seconds without changes, so the
+        caller can keep the connection alive. Ends if the subscriber is
+        dropped for falling behind.
+        """
+        if self._tailer is None or self._tailer.done():
+            position = await audit_storage.end_position()
+            if self._tailer is None or self._tailer.done():
+                self._position = position
+                self._wake = asyncio.Event()
+                self._tailer = asyncio.create_task(self._tail(self._wake))
+        subscriber = _Subscriber()
+        # Everything after this position is queued for the subscriber
+        live_from = self._position
+        self._subscribers.add(subscriber)
+        try:
+            sent = last_position
+            while sent is not None and sent < live_from:
+                try:
+                    entries, sent = await audit_storage.tail(sent, CATCH_UP_PAGE_SIZE)
+                except ValueError:
+                    break
+                for position, entry in entries:
+                    if position > live_from:
+                        break
+                    yield build_change(position, entry)
+                if not entries:
+                    break
+
+            while not subscriber.dropped:
+                try:
+                    change = await asyncio.wait_for(subscriber.queue.get(), keepalive)
+                except asyncio.TimeoutError:
+                    yield None
+                    continue
+                yield change
+        finally:
+            self._subscribers.discard(subscriber)
+            if not self._subscribers and self._tailer is not None:
+                self._tailer.cancel()
+                self._tailer = None
+                self._wake = None
+
+
+change_feed = ChangeFeed()
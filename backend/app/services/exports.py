@@ -0,0 +1,108 @@
+import csv
+import io
+import json
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Sequence, Tuple
+
+EXPORT_PAGE_SIZE = 500
+EXPORT_FORMATS = ("ndjson", "csv")
+MEDIA_TYPES = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
+
+MOVEMENT_COLUMNS = [
+    "id",
+    "type",
+    "date",
+    "scheduledDate",
+    "expectedVolume",
+    "actualVolume",
+    "sourceTankId",
+    "destinationTankId",
+    "properties",
+    "carrier",
+    "ticketNumber",
+    "notes",
+    "pdfPath",
+    "createdAt",
+    "createdBy",
+]
+AUDIT_COLUMNS = [
+    "id",
+    "timestamp",
+    "action",
+    "entityType",
+    "entityId",
+    "userId",
+    "description",
+    "changes",
+]
+
+Record = Dict[str, Any]
+# Fetches the page after a (sort value, id) position, or the first page for None
+FetchPage = Callable[[Tuple[str, str] | None, int], Awaitable[List[Record]]]
+
+
+def format_properties(properties: List[Dict[str, Any]]) -> str:
+    """Properties as ``id=value;id=value``, the form the movement import reads."""
+    return ";".join(
+        f"{p['propertyId']}={'' if p.get('value') is None else p['value']}" for p in properties
+    )
+
+
+def movement_csv_row(movement: Record) -> List[Any]:
+    return [
+        format_properties(movement.get("properties") or [])
+        if column == "properties"
+        else movement.get(column)
+        for column in MOVEMENT_COLUMNS
+    ]
+
+
+def audit_csv_row(entry: Record) -> List[Any]:
+    return [
+        json.dumps(entry.get("changes") or {}) if column == "changes" else entry.get(column)
+        for column in AUDIT_COLUMNS
+    ]
+
+
+async def iter_pages(
+    fetch_page: FetchPage, sort_field: str, page_size: int = EXPORT_PAGE_SIZE
+) -> AsyncIterator[List[Record]]:
+    """Walk a storage page by page, resuming each page after the last record
+    of the previous one, so writes in between never shift or repeat rows."""
+    after = None
+    while True:
+        page = await fetch_page(after, page_size)
+        if not page:
+            return
+        yield page
+        after = (page[-1].get(sort_field) or "", page[-1]["id"])
+
+
+async def encode_export(
+    pages: AsyncIterator[List[Record]],
+    fmt: str,
+    columns: Sequence[str],
+    csv_row: Callable[[Record], List[Any]],
+    keep: Callable[[Record], bool] = lambda _: True,
+) -> AsyncIterator[str]:
+    """Encode pages of records as NDJSON or CSV, one chunk per page.
+
+    Only the current page is held in memory. CSV output starts with the
+    header so the response begins before the first page is read.
+    """
+    if fmt == "csv":
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(columns)
+        yield buffer.getvalue()
+
+    async for page in pages:
+        records = [record for record in page if keep(record)]
+        if not records:
+            continue
+        if fmt == "csv":
+            buffer.seek(0)
+            buffer.truncate()
+            writer.writerows(csv_row(record) for record in records)
+            yield buffer.getvalue()
+        else:
+            yield "".join(json.dumps(record) + "\n" for record in records)
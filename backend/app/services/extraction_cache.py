@@ -0,0 +1,130 @@
+import asyncio
+import hashlib
+import json
+import os
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, List
+
+from app.services.file_storage import DATA_DIR, copy_json
+from app.services.rule_extraction import property_definitions_hash
+
+EXTRACTION_CACHE_DIR = DATA_DIR / "extraction-cache"
+EXTRACTION_CACHE_MAX_BYTES = int(os.getenv("EXTRACTION_CACHE_MAX_BYTES", str(50 * 1024 * 1024)))
+EXTRACTION_CACHE_MAX_ENTRIES = int(os.getenv("EXTRACTION_CACHE_MAX_ENTRIES", "2000"))
+
+Extract = Callable[[bytes, List[Dict[str, Any]]], Awaitable[Dict[str, Any]]]
+
+
+def extraction_key(pdf_bytes: bytes, property_definitions: List[Dict[str, Any]]) -> str:
+    """Cache key: SHA-256 of the PDF plus a hash of the properties asked for."""
+    properties_hash = property_definitions_hash(property_definitions)
+    return f"{hashlib.sha256(pdf_bytes).hexdigest()}-{properties_hash}"
+
+
+def _is_cacheable(result: Dict[str, Any]) -> bool:
+    # Raw text alongside an empty result means the LLM call failed; retry next time
+    return not result.get("rawText")
+
+
+class ExtractionCache:
+    """Extraction results on disk, one JSON file per (PDF, property definitions).
+
+    A hit refreshes the file's mtime, and once the cache grows past its
+    byte or entry limit the least recently used files are removed. Requests
+    for a key already being extracted wait for that extraction instead of
+    starting their own. File access runs in worker threads.
+    """
+
+    def __init__(self, directory: Path, max_bytes: int, max_entries: int):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self._in_flight: Dict[str, asyncio.Future] = {}
+
+    def _path(self, key: str) -> Path:
+        return self.directory / f"{key}.json"
+
+    def _read(self, key: str) -> Dict[str, Any] | None:
+        path = self._path(key)
+        try:
+            result = json.loads(path.read_text(encoding="utf-8"))
+            os.utime(path)
+            return result
+        except FileNotFoundError:
+            return None
+        except (json.JSONDecodeError, OSError) as e:
+            print(f"Ignoring unreadable extraction cache entry {path.name}: {e}")
+            return None
+
+    def _write(self, key: str, result: Dict[str, Any]) -> None:
+        self.directory.mkdir(parents=True, exist_ok=True)
+        path = self._path(key)
+        tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+        tmp.write_text(json.dumps(result), encoding="utf-8")
+        os.replace(tmp, path)
+        self._evict()
+
+    def _evict(self) -> None:
+        """Remove least recently used entries until within the limits."""
+        entries = []
+        for path in self.directory.glob("*.json"):
+            try:
+                st = path.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((st.st_mtime_ns, st.st_size, path))
+        entries.sort()
+        total = sum(size for _, size, _ in entries)
+        count = len(entries)
+        for _, size, path in entries:
+            if total <= self.max_bytes and count <= self.max_entries:
+                break
+            path.unlink(missing_ok=True)
+            total -= size
+            count -= 1
+
+    async def get_or_extract(
+        self,
+        pdf_bytes: bytes,
+        property_definitions: List[Dict[str, Any]],
+        extract: Extract,
+    ) -> Dict[str, Any]:
+        """The cached result for this PDF and properties, or ``extract(...)``'s."""
+        key = await asyncio.to_thread(extraction_key, pdf_bytes, property_definitions)
+
+        while (in_flight := self._in_flight.get(key)) is not None:
+            try:
+                return copy_json(await asyncio.shield(in_flight))
+            except asyncio.CancelledError:
+                # The extraction we waited on was cancelled, not us: take over
+                if not in_flight.cancelled():
+                    raise
+
+        future = asyncio.get_running_loop().create_future()
+        self._in_flight[key] = future
+        try:
+            result = await asyncio.to_thread(self._read, key)
+            if result is None:
+                result = await extract(pdf_bytes, property_definitions)
+                if _is_cacheable(result):
+                    try:
+                        await asyncio.to_thread(self._write, key, result)
+                    except OSError as e:
+                        print(f"Failed to cache extraction result: {e}")
+            future.set_result(result)
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            # Waiters get the error; don't also report it as never retrieved
+            future.exception()
+            raise
+        finally:
+            del self._in_flight[key]
+        return copy_json(result)
+
+
+extraction_cache = ExtractionCache(
+    EXTRACTION_CACHE_DIR, EXTRACTION_CACHE_MAX_BYTES, EXTRACTION_CACHE_MAX_ENTRIES
+)
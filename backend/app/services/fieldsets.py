@@ -0,0 +1,43 @@
+from functools import lru_cache
+from typing import Any, Dict, Iterable, List, Sequence, Tuple, Type
+
+from pydantic import BaseModel, create_model
+
+
+def select_fields(
+    model: Type[BaseModel], fields: str | None, view: str | None, summary: Sequence[str]
+) -> Tuple[str, ...] | None:
+    """The fields a list request asks for, or None for whole records.
+
+    ``fields`` is a comma-separated list of the model's fields; otherwise
+    ``view=summary`` selects ``summary``. ``id`` is always included. Raises
+    ValueError for an unknown field.
+    """
+    if fields:
+        requested = {f.strip() for f in fields.split(",") if f.strip()}
+        unknown = sorted(requested - set(model.model_fields))
+        if unknown:
+            raise ValueError(f"Unknown fields: {', '.join(unknown)}")
+    elif view == "summary":
+        requested = set(summary)
+    else:
+        return None
+    requested.add("id")
+    # Keep the model's field order so the same selection is cached once
+    return tuple(f for f in model.model_fields if f in requested)
+
+
+@lru_cache(maxsize=64)
+def fieldset_model(model: Type[BaseModel], fields: Tuple[str, ...]) -> Type[BaseModel]:
+    """A model with only ``fields`` of ``model``, for validating projected records."""
+    return create_model(
+        f"{model.__name__}Fields",
+        **{name: (model.model_fields[name].annotation, model.model_fields[name]) for name in fields},
+    )
+
+
+def project(records: Iterable[Dict[str, Any]], fields: Tuple[str, ...] | None) -> List[Dict[str, Any]]:
+    """Records cut down to ``fields`` (whole records for None)."""
+    if fields is None:
+        return list(records)
+    return [{f: record[f] for f in fields if f in record} for record in records]
@@ -1,49 +1,970 @@
+import os
 import json
+import bisect
 import asyncio
+from collections import deque
+from contextlib import AsyncExitStack, ExitStack
 from pathlib import Path
-from typing import TypeVar, List, Any
+from typing import TypeVar, List, Any, Callable, Dict, Iterator, Optional, Tuple
 
 from filelock import FileLock
 
 T = TypeVar("T")
 
 # Data directory - relative to project root (one level up from backend)
-DATA_DIR = Path(__file__).parent.parent.parent.parent / "data"
+DATA_DIR = Path(os.getenv("DATA_DIR", Path(__file__).parent.parent.parent.parent / "data"))
+
+STORAGE_BACKEND = os.getenv("STORAGE_BACKEND", "json")
+
+# Audit segments roll over once they reach this size
+AUDIT_SEGMENT_MAX_BYTES = 4 * 1024 * 1024
+
+# Audit index row: (timestamp, id, segment number - 0 for the legacy file,
+# byte offset or legacy list index, entityType, entityId, userId)
+AuditRow = Tuple[str, str, int, int, Any, Any, Any]
+
+# Multi-file commits record their pending renames/appends here until done
+COMMIT_JOURNAL = DATA_DIR / "commit-journal.json"
+
+
+def copy_json(value: Any) -> Any:
+    """Deep copy JSON-shaped data (dicts, lists and scalars)."""
+    if isinstance(value, dict):
+        return {k: copy_json(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [copy_json(v) for v in value]
+    return value
+
+
+def _write_temp(path: Path, content: str) -> Path:
+    """Write content to a sibling temp file and fsync it."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(path.name + ".tmp")
+    with tmp.open("w", encoding="utf-8") as f:
+        f.write(content)
+        f.flush()
+        os.fsync(f.fileno())
+    return tmp
+
+
+def _fsync_dir(path: Path) -> None:
+    """Persist renames in a directory (no-op where directories can't be opened)."""
+    if os.name != "posix":
+        return
+    fd = os.open(str(path), os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+class SortedIndex:
+    """Secondary index: records grouped by key fields, ordered by a sort field.
+
+    A record is listed under every non-empty value of ``key_fields`` (or under
+    a single ``None`` group when there are no key fields), as a
+    ``(sort value, id)`` pair kept in sorted order. A ``sparse`` index leaves
+    out records whose sort field is empty.
+    """
+
+    def __init__(self, key_fields: Tuple[str, ...], sort_field: str, sparse: bool = False):
+        self.key_fields = key_fields
+        self.sort_field = sort_field
+        self.sparse = sparse
+        self._groups: Dict[Any, List[Tuple[str, str]]] = {}
+
+    def _keys(self, record: Dict[str, Any]) -> set:
+        if self.sparse and not record.get(self.sort_field):
+            return set()
+        if not self.key_fields:
+            return {None}
+        return {record.get(f) for f in self.key_fields if record.get(f)}
+
+    def _entry(self, record: Dict[str, Any]) -> Tuple[str, str]:
+        return (record.get(self.sort_field) or "", record["id"])
+
+    def rebuild(self, records: List[Dict[str, Any]]) -> None:
+        groups: Dict[Any, List[Tuple[str, str]]] = {}
+        for record in records:
+            entry = self._entry(record)
+            for key in self._keys(record):
+                groups.setdefault(key, []).append(entry)
+        for entries in groups.values():
+            entries.sort()
+        self._groups = groups
+
+    def update(self, old: Dict[str, Any] | None, new: Dict[str, Any] | None) -> None:
+        if old is not None:
+            entry = self._entry(old)
+            for key in self._keys(old):
+                entries = self._groups.get(key, [])
+                i = bisect.bisect_left(entries, entry)
+                if i < len(entries) and entries[i] == entry:
+                    del entries[i]
+        if new is not None:
+            entry = self._entry(new)
+            for key in self._keys(new):
+                bisect.insort(self._groups.setdefault(key, []), entry)
+
+    def range(
+        self,
+        key: Any = None,
+        start: str | None = None,
+        end: str | None = None,
+        descending: bool = False,
+        after: Tuple[str, str] | None = None,
+    ) -> Iterator[str]:
+        """Ids in ``key``'s group with start <= sort value < end, in order.
+
+        ``after`` is a (sort value, id) position to resume an ascending scan from.
+        """
+        entries = self._groups.get(key, [])
+        lo = bisect.bisect_left(entries, (start,)) if start is not None else 0
+        if after is not None:
+            lo = max(lo, bisect.bisect_right(entries, after))
+        hi = bisect.bisect_left(entries, (end,)) if end is not None else len(entries)
+        positions = range(hi - 1, lo - 1, -1) if descending else range(lo, hi)
+        for i in positions:
+            yield entries[i][1]
+
+
+class LocalVersions:
+    """Versions of a storage produced by writes made in this process.
+
+    Every change to a storage raises its version by one, so a version
+    missing from here was produced by someone else, e.g. another worker.
+    Only the most recent ``max_kept`` are remembered.
+    """
+
+    def __init__(self, max_kept: int = 1024):
+        self.max_kept = max_kept
+        self._versions: set[int] = set()
+        self._order: deque[int] = deque()
+
+    def add(self, version: int) -> None:
+        self._versions.add(version)
+        self._order.append(version)
+        while len(self._order) > self.max_kept:
+            self._versions.discard(self._order.popleft())
+
+    def produced(self, after: int, upto: int) -> bool:
+        """Whether every version after ``after`` up to ``upto`` was ours."""
+        if upto - after > self.max_kept:
+            return False
+        return all(v in self._versions for v in range(after + 1, upto + 1))
 
 
 class JsonStorage:
-    """Generic JSON file storage with file locking."""
+    """Generic JSON file storage with file locking.
 
-    def __init__(self, filename: str):
+    The parsed document is kept in memory and only re-parsed when the file's
+    mtime/size signature changes, so edits made by another worker or by hand
+    are still picked up. ``version`` increases every time the cached document
+    changes, and ``local_versions`` holds those caused by writes made here. An
+    id -> record index over the cached document makes point lookups
+    constant-time; it is updated in place for point changes and
+    rebuilt when the whole document is replaced.
+    """
+
+    def __init__(self, filename: str, indexes: Dict[str, SortedIndex] | None = None):
         self.filepath = DATA_DIR / filename
+        self.indexes = indexes or {}
         self._lock = asyncio.Lock()
         self._file_lock = FileLock(str(self.filepath) + ".lock", timeout=10)
+        self._cache: List[Any] | None = None
+        self._by_id: Dict[str, Dict[str, Any]] = {}
+        self._signature: Tuple[int, int] | None = None
+        # Set while a commit rewrites the file; the cache stays authoritative
+        self._flushing = False
+        self.version = 0
+        self.local_versions = LocalVersions()
+
+    def _stat_signature(self) -> Tuple[int, int] | None:
+        try:
+            st = self.filepath.stat()
+        except FileNotFoundError:
+            return None
+        return (st.st_mtime_ns, st.st_size)
+
+    def _set_cache(
+        self,
+        data: List[Any],
+        signature: Tuple[int, int] | None,
+        changed: List[Tuple[Dict[str, Any] | None, Dict[str, Any] | None]] | None = None,
+        local: bool = True,
+    ) -> None:
+        """Replace the cached document.
+
+        ``changed`` lists the (old, new) record pairs that turn the current
+        cache into ``data``; without it the indexes are rebuilt from scratch.
+        ``local`` is False when the document was re-read from disk.
+        """
+        if changed is None or self._cache is None:
+            self._by_id = {r["id"]: r for r in data}
+            for index in self.indexes.values():
+                index.rebuild(data)
+        else:
+            for old, new in changed:
+                if old is not None:
+                    self._by_id.pop(old["id"], None)
+                if new is not None:
+                    self._by_id[new["id"]] = new
+                for index in self.indexes.values():
+                    index.update(old, new)
+        self._cache = data
+        self._signature = signature
+        self.version += 1
+        if local:
+            self.local_versions.add(self.version)
+
+    def _load(self) -> List[Any] | None:
+        """Return the cached document, re-parsing the file if it changed."""
+        if self._cache is not None and (
+            self._flushing or self._stat_signature() == self._signature
+        ):
+            return self._cache
+
+        with self._file_lock:
+            signature = self._stat_signature()
+            if self._cache is not None and signature == self._signature:
+                return self._cache
+            content = self.filepath.read_text(encoding="utf-8")
+            self._set_cache(json.loads(content), signature, local=False)
+            return self._cache
+
+    async def snapshot(self, default: List[Any] | None = None) -> List[Any]:
+        """Read the cached document without copying - callers must not mutate it."""
+        try:
+            return self._load()
+        except (FileNotFoundError, json.JSONDecodeError) as e:
+            print(f"Could not read {self.filepath}: {e}")
+            return default if default is not None else []
 
     async def read(self, default: List[Any] | None = None) -> List[Any]:
-        """Read data from JSON file."""
+        """Read data from JSON file as a private copy that is safe to mutate."""
         async with self._lock:
             try:
-                with self._file_lock:
-                    content = self.filepath.read_text(encoding="utf-8")
-                    return json.loads(content)
+                return copy_json(self._load())
             except (FileNotFoundError, json.JSONDecodeError) as e:
                 print(f"Could not read {self.filepath}: {e}")
                 return default if default is not None else []
 
+    def _serialize(self, data: List[Any]) -> str:
+        return json.dumps(data, indent=2, default=str)
+
+    def _flush(
+        self,
+        data: List[Any],
+        changed: List[Tuple[Dict[str, Any] | None, Dict[str, Any] | None]] | None = None,
+    ) -> None:
+        """Atomically replace the file and refresh the cache - caller holds both locks."""
+        tmp = _write_temp(self.filepath, self._serialize(data))
+        os.replace(tmp, self.filepath)
+        self._set_cache(data, self._stat_signature(), changed)
+
+    def _apply_changes(
+        self, changes: Dict[str, Optional[Dict[str, Any]]]
+    ) -> Tuple[List[Any], List[Tuple[Dict[str, Any] | None, Dict[str, Any] | None]]]:
+        """Return a new document with point changes applied (None deletes).
+
+        Records keep their position when replaced; new records are appended.
+        Also returns the (old, new) pairs for ``_set_cache``.
+        """
+        try:
+            records = list(self._load())
+        except FileNotFoundError:
+            records = []
+        changed = []
+        positions: Dict[str, int] | None = None
+        deleted = set()
+        for record_id, record in changes.items():
+            old = self._by_id.get(record_id)
+            if old is None and record is None:
+                continue
+            changed.append((old, record))
+            if old is None:
+                records.append(record)
+                continue
+            if positions is None:
+                positions = {r["id"]: i for i, r in enumerate(records)}
+            if record is None:
+                deleted.add(positions[record_id])
+            else:
+                records[positions[record_id]] = record
+        if deleted:
+            records = [r for i, r in enumerate(records) if i not in deleted]
+        return records, changed
+
     async def write(self, data: List[Any]) -> None:
         """Write data to JSON file with locking."""
         async with self._lock:
             with self._file_lock:
-                # Ensure directory exists
-                self.filepath.parent.mkdir(parents=True, exist_ok=True)
-                self.filepath.write_text(
-                    json.dumps(data, indent=2, default=str), encoding="utf-8"
-                )
-
-
-# Storage instances
-tanks_storage = JsonStorage("tanks.json")
-movements_storage = JsonStorage("movements.json")
-properties_storage = JsonStorage("properties.json")
-users_storage = JsonStorage("users.json")
-audit_storage = JsonStorage("audit-log.json")
+                self._flush(copy_json(data))
+
+    def _find(self, record_id: str) -> Dict[str, Any] | None:
+        """Cached record with the given id (not a copy), or None."""
+        try:
+            self._load()
+        except FileNotFoundError:
+            return None
+        return self._by_id.get(record_id)
+
+    async def get_by_id(self, record_id: str) -> Dict[str, Any] | None:
+        """Get a copy of the record with the given id, or None."""
+        record = self._find(record_id)
+        return copy_json(record) if record is not None else None
+
+    async def current_version(self) -> int:
+        """``version`` after picking up any change made to the file on disk."""
+        try:
+            self._load()
+        except (FileNotFoundError, json.JSONDecodeError):
+            pass
+        return self.version
+
+    async def range_query(
+        self,
+        index: str,
+        key: Any = None,
+        start: str | None = None,
+        end: str | None = None,
+        descending: bool = False,
+        after: Tuple[str, str] | None = None,
+    ) -> Iterator[Dict[str, Any]]:
+        """Lazily iterate records of a secondary index group - callers must not mutate them.
+
+        Only the records actually consumed are visited, so stopping after
+        ``k`` items costs O(log n + k). ``after`` resumes an ascending scan
+        after a (sort value, id) position, for paging without offsets.
+        """
+        try:
+            self._load()
+        except FileNotFoundError:
+            return iter(())
+        by_id = self._by_id
+        return (
+            by_id[record_id]
+            for record_id in self.indexes[index].range(key, start, end, descending, after)
+        )
+
+    async def upsert(self, record: Dict[str, Any]) -> None:
+        """Insert the record, or replace the existing one with the same id."""
+        async with self._lock:
+            with self._file_lock:
+                self._flush(*self._apply_changes({record["id"]: copy_json(record)}))
+
+    async def update_by_id(
+        self, record_id: str, updater: Callable[[Dict[str, Any]], Dict[str, Any]]
+    ) -> Dict[str, Any] | None:
+        """Replace a record with ``updater(copy)``, returning the new record (or None if missing)."""
+        async with self._lock:
+            with self._file_lock:
+                current = self._find(record_id)
+                if current is None:
+                    return None
+                updated = updater(copy_json(current))
+                self._flush(*self._apply_changes({record_id: copy_json(updated)}))
+                return updated
+
+    async def delete_by_id(self, record_id: str) -> Dict[str, Any] | None:
+        """Delete the record with the given id, returning it (or None if missing)."""
+        async with self._lock:
+            with self._file_lock:
+                deleted = await self.get_by_id(record_id)
+                if deleted is None:
+                    return None
+                self._flush(*self._apply_changes({record_id: None}))
+                return deleted
+
+
+class AuditLogStorage:
+    """Append-only audit log stored as rolling JSON-lines segments.
+
+    Each entry is one line in ``<dirname>/<n>.jsonl``; a new segment is started
+    once the current one reaches ``segment_max_bytes``. Entries from the legacy
+    single-document file are still returned by ``read()`` ahead of the segments.
+
+    ``query()`` is served from an in-memory index of (timestamp, id, location)
+    rows ordered by time, with per entityType/entityId/userId lists. It is
+    built on first use and then kept current by reading only the bytes
+    appended to the segments since, so a page of results loads just the
+    entries on that page.
+    """
+
+    def __init__(
+        self,
+        dirname: str,
+        legacy_filename: str | None = None,
+        segment_max_bytes: int = AUDIT_SEGMENT_MAX_BYTES,
+    ):
+        self.dirpath = DATA_DIR / dirname
+        self.legacy_path = DATA_DIR / legacy_filename if legacy_filename else None
+        self.segment_max_bytes = segment_max_bytes
+        self._lock = asyncio.Lock()
+        self._file_lock = FileLock(str(self.dirpath) + ".lock", timeout=10)
+        self._legacy: List[Dict[str, Any]] | None = None
+        self._rows: List[AuditRow] = []
+        self._by_entity_type: Dict[str, List[AuditRow]] = {}
+        self._by_entity_id: Dict[str, List[AuditRow]] = {}
+        self._by_user: Dict[str, List[AuditRow]] = {}
+        self._indexed_bytes: Dict[int, int] = {}
+
+    def _segments(self) -> List[Path]:
+        """Segment files in append order."""
+        if not self.dirpath.exists():
+            return []
+        return sorted(self.dirpath.glob("*.jsonl"), key=lambda p: int(p.stem))
+
+    def _segment_for_append(self, incoming: int) -> Path:
+        """Current segment, or a fresh one if appending would overflow it."""
+        segments = self._segments()
+        if not segments:
+            return self.dirpath / f"{1:06d}.jsonl"
+
+        current = segments[-1]
+        size = current.stat().st_size
+        if size > 0 and size + incoming > self.segment_max_bytes:
+            return self.dirpath / f"{int(current.stem) + 1:06d}.jsonl"
+        return current
+
+    @staticmethod
+    def _read_segment(path: Path) -> List[Dict[str, Any]]:
+        entries: List[Dict[str, Any]] = []
+        with path.open("r", encoding="utf-8") as f:
+            for line_no, line in enumerate(f, start=1):
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    entries.append(json.loads(line))
+                except json.JSONDecodeError as e:
+                    # A torn trailing line from a crashed append - skip it
+                    print(f"Skipping malformed audit line {path}:{line_no}: {e}")
+        return entries
+
+    def _prepare_append(self, entries: List[Dict[str, Any]]) -> Tuple[Path, int, str]:
+        """Pick the segment for appending entries - caller holds both locks.
+
+        Returns the segment, its current size and the text to append there.
+        """
+        data = "".join(
+            json.dumps(entry, default=str, separators=(",", ":")) + "\n"
+            for entry in entries
+        )
+        self.dirpath.mkdir(parents=True, exist_ok=True)
+        segment = self._segment_for_append(len(data.encode("utf-8")))
+        offset = segment.stat().st_size if segment.exists() else 0
+        if offset > 0:
+            # Start on a fresh line if a previous append was torn
+            with segment.open("rb") as f:
+                f.seek(-1, 2)
+                if f.read(1) != b"\n":
+                    data = "\n" + data
+        return segment, offset, data
+
+    @staticmethod
+    def _write_at(segment: Path, offset: int, data: str, sync: bool = False) -> None:
+        """Write data at offset, dropping anything after it (makes replays idempotent)."""
+        with segment.open("ab+") as f:
+            f.truncate(offset)
+            f.write(data.encode("utf-8"))
+            if sync:
+                f.flush()
+                os.fsync(f.fileno())
+
+    def iter_entries(self) -> Iterator[Dict[str, Any]]:
+        """Yield all entries, legacy file first, then segments in order.
+
+        Segments are only ever appended to, so this needs no lock; a torn
+        trailing line from an in-flight append is skipped.
+        """
+        if self.legacy_path is not None:
+            try:
+                yield from json.loads(self.legacy_path.read_text(encoding="utf-8"))
+            except FileNotFoundError:
+                pass
+            except json.JSONDecodeError as e:
+                print(f"Could not read {self.legacy_path}: {e}")
+
+        for segment in self._segments():
+            yield from self._read_segment(segment)
+
+    async def read(self, default: List[Any] | None = None) -> List[Any]:
+        """Read all entries, legacy file first, then segments in order."""
+        entries = list(self.iter_entries())
+        if not entries and default is not None:
+            return default
+        return entries
+
+    def _index_entry(self, entry: Dict[str, Any], segment_no: int, offset: int) -> None:
+        row: AuditRow = (
+            entry.get("timestamp") or "",
+            entry.get("id") or "",
+            segment_no,
+            offset,
+            entry.get("entityType"),
+            entry.get("entityId"),
+            entry.get("userId"),
+        )
+        bisect.insort(self._rows, row)
+        for rows, key in (
+            (self._by_entity_type, row[4]),
+            (self._by_entity_id, row[5]),
+            (self._by_user, row[6]),
+        ):
+            if key is not None:
+                bisect.insort(rows.setdefault(key, []), row)
+
+    def _refresh_index(self) -> None:
+        """Index the legacy file once, then whatever was appended since the last call."""
+        if self._legacy is None:
+            self._legacy = []
+            if self.legacy_path is not None:
+                try:
+                    self._legacy = json.loads(self.legacy_path.read_text(encoding="utf-8"))
+                except FileNotFoundError:
+                    pass
+                except json.JSONDecodeError as e:
+                    print(f"Could not read {self.legacy_path}: {e}")
+            for i, entry in enumerate(self._legacy):
+                self._index_entry(entry, 0, i)
+
+        for segment in self._segments():
+            segment_no = int(segment.stem)
+            indexed = self._indexed_bytes.get(segment_no, 0)
+            if segment.stat().st_size <= indexed:
+                continue
+            with segment.open("rb") as f:
+                f.seek(indexed)
+                chunk = f.read()
+            # Leave a trailing partial line for the next refresh
+            complete = chunk[: chunk.rfind(b"\n") + 1]
+            offset = indexed
+            for line in complete.splitlines(keepends=True):
+                if line.strip():
+                    try:
+                        self._index_entry(json.loads(line), segment_no, offset)
+                    except json.JSONDecodeError:
+                        pass
+                offset += len(line)
+            self._indexed_bytes[segment_no] = indexed + len(complete)
+
+    def _select(
+        self, entity_type: str | None, entity_id: str | None, user_id: str | None
+    ) -> Tuple[List[AuditRow], Callable[[AuditRow], bool], bool]:
+        """The most selective row list for the filters, a check for the
+        remaining filters, and whether that check is needed at all."""
+        if entity_id:
+            rows = self._by_entity_id.get(entity_id, [])
+        elif entity_type:
+            rows = self._by_entity_type.get(entity_type, [])
+        elif user_id:
+            rows = self._by_user.get(user_id, [])
+        else:
+            rows = self._rows
+
+        def matches(row: AuditRow) -> bool:
+            return (not entity_type or row[4] == entity_type) and (
+                not user_id or row[6] == user_id
+            )
+
+        residual = bool(entity_id and entity_type) or bool(
+            user_id and (entity_id or entity_type)
+        )
+        return rows, matches, residual
+
+    def _load_entries(self, rows: List[AuditRow]) -> List[Dict[str, Any]]:
+        """Load the entries of index rows, opening each segment once."""
+        entries = []
+        files: Dict[int, Any] = {}
+        try:
+            for _, _, segment_no, offset, *_ in rows:
+                if segment_no == 0:
+                    entries.append(self._legacy[offset])
+                    continue
+                f = files.get(segment_no)
+                if f is None:
+                    f = files[segment_no] = (self.dirpath / f"{segment_no:06d}.jsonl").open("rb")
+                f.seek(offset)
+                entries.append(json.loads(f.readline()))
+        finally:
+            for f in files.values():
+                f.close()
+        return entries
+
+    async def query(
+        self,
+        entity_type: str | None = None,
+        entity_id: str | None = None,
+        user_id: str | None = None,
+        start: str | None = None,
+        end: str | None = None,
+        before: Tuple[str, str] | None = None,
+        offset: int = 0,
+        limit: int = 50,
+    ) -> Tuple[List[Dict[str, Any]], int, Tuple[str, str] | None]:
+        """Newest-first entries matching the filters.
+
+        ``start``/``end`` bound the timestamp (inclusive/exclusive) and
+        ``before`` is a (timestamp, id) keyset cursor. Returns the page, the
+        total number of matches (ignoring the cursor) and the cursor for the
+        next page, if there is one.
+        """
+        self._refresh_index()
+        rows, matches, residual = self._select(entity_type, entity_id, user_id)
+        lo = bisect.bisect_left(rows, (start,)) if start else 0
+        hi = bisect.bisect_left(rows, (end,)) if end else len(rows)
+        top = min(hi, bisect.bisect_left(rows, before)) if before else hi
+
+        if residual:
+            total = sum(1 for i in range(lo, hi) if matches(rows[i]))
+            page: List[AuditRow] = []
+            skipped = 0
+            i = top - 1
+            while i >= lo and len(page) <= limit:
+                if matches(rows[i]):
+                    if skipped < offset:
+                        skipped += 1
+                    else:
+                        page.append(rows[i])
+                i -= 1
+            has_more = len(page) > limit
+            page = page[:limit]
+        else:
+            total = hi - lo
+            first = top - 1 - offset
+            last = max(lo, first - limit + 1)
+            page = [rows[i] for i in range(first, last - 1, -1)] if first >= lo else []
+            has_more = last > lo
+
+        next_cursor = (page[-1][0], page[-1][1]) if page and has_more else None
+        return self._load_entries(page), total, next_cursor
+
+    async def scan(
+        self,
+        entity_type: str | None = None,
+        entity_id: str | None = None,
+        user_id: str | None = None,
+        start: str | None = None,
+        end: str | None = None,
+        after: Tuple[str, str] | None = None,
+        limit: int = 500,
+    ) -> List[Dict[str, Any]]:
+        """Oldest-first entries matching the filters, after a (timestamp, id) position.
+
+        For walking the whole log page by page, e.g. to export it; unlike
+        ``query`` it doesn't count the matches.
+        """
+        self._refresh_index()
+        rows, matches, residual = self._select(entity_type, entity_id, user_id)
+        lo = bisect.bisect_left(rows, (start,)) if start else 0
+        if after:
+            lo = max(lo, bisect.bisect_left(rows, after))
+            if lo < len(rows) and rows[lo][:2] == after:
+                lo += 1
+        hi = bisect.bisect_left(rows, (end,)) if end else len(rows)
+
+        page: List[AuditRow] = []
+        for i in range(lo, hi):
+            if not residual or matches(rows[i]):
+                page.append(rows[i])
+                if len(page) == limit:
+                    break
+        return self._load_entries(page)
+
+    @staticmethod
+    def _parse_position(position: str) -> Tuple[int, int]:
+        segment_no, sep, offset = position.partition("-")
+        if not sep:
+            raise ValueError(f"Invalid audit log position: {position!r}")
+        return int(segment_no), int(offset)
+
+    async def end_position(self) -> str:
+        """Position of the end of the log, for ``tail`` to start from."""
+        async with self._lock:
+            with self._file_lock:
+                segments = self._segments()
+                if not segments:
+                    return f"{0:06d}-{0:012d}"
+                return f"{int(segments[-1].stem):06d}-{segments[-1].stat().st_size:012d}"
+
+    async def tail(
+        self, after: str, limit: int = 500
+    ) -> Tuple[List[Tuple[str, Dict[str, Any]]], str]:
+        """Entries appended after a position, in append order.
+
+        An entry's position is where it ends in the segments, fixed when it
+        is appended, so it follows commit order across workers and sorts as
+        a string. Returns (position, entry) pairs and the position reached.
+        Raises ValueError for a position this log didn't produce.
+        """
+        start_no, start_offset = self._parse_position(after)
+        found: List[Tuple[str, Dict[str, Any]]] = []
+        for segment in self._segments():
+            segment_no = int(segment.stem)
+            if segment_no < start_no:
+                continue
+            offset = start_offset if segment_no == start_no else 0
+            with segment.open("rb") as f:
+                f.seek(offset)
+                chunk = f.read()
+            # A trailing partial line is still being appended
+            for line in chunk[: chunk.rfind(b"\n") + 1].splitlines(keepends=True):
+                offset += len(line)
+                after = f"{segment_no:06d}-{offset:012d}"
+                if not line.strip():
+                    continue
+                try:
+                    found.append((after, json.loads(line)))
+                except json.JSONDecodeError:
+                    continue
+                if len(found) == limit:
+                    return found, after
+        return found, after
+
+
+def _apply_journal(journal: Dict[str, Any]) -> None:
+    """Perform the renames and audit append recorded in a commit journal."""
+    for tmp, target in journal["replace"]:
+        if Path(tmp).exists():
+            os.replace(tmp, target)
+    audit = journal.get("audit")
+    if audit:
+        AuditLogStorage._write_at(
+            Path(audit["segment"]), audit["offset"], audit["data"], sync=True
+        )
+        _fsync_dir(Path(audit["segment"]).parent)
+    _fsync_dir(DATA_DIR)
+
+
+def recover_pending_commit() -> None:
+    """Roll forward a multi-file commit interrupted by a crash, if any."""
+    with FileLock(str(COMMIT_JOURNAL) + ".lock", timeout=10):
+        _recover_journal()
+
+
+def _recover_journal() -> None:
+    # Caller holds the commit journal lock
+    try:
+        journal = json.loads(COMMIT_JOURNAL.read_text(encoding="utf-8"))
+    except FileNotFoundError:
+        return
+    except json.JSONDecodeError:
+        # Torn journal: the commit never reached its point of no return
+        COMMIT_JOURNAL.unlink()
+        return
+    print(f"Recovering interrupted commit from {COMMIT_JOURNAL}")
+    _apply_journal(journal)
+    COMMIT_JOURNAL.unlink()
+
+
+def _flush_changes(
+    staged: List[Tuple[JsonStorage, List[Any]]],
+    audit_log: AuditLogStorage,
+    audit_entries: List[Dict[str, Any]],
+) -> None:
+    """Durably write new documents for several JSON files plus audit entries.
+
+    Every new file is written to a temp file and fsynced, and a journal
+    listing the renames is made durable before any of them happen. A crash
+    after that point is rolled forward by ``recover_pending_commit``; a crash
+    before it leaves the old files intact. Only touches files, so it can run
+    in a worker thread while the caller holds all involved locks.
+    """
+    replace = []
+    for storage, records in staged:
+        tmp = _write_temp(storage.filepath, storage._serialize(records))
+        replace.append([str(tmp), str(storage.filepath)])
+
+    journal: Dict[str, Any] = {"replace": replace}
+    if audit_entries:
+        segment, offset, data = audit_log._prepare_append(audit_entries)
+        journal["audit"] = {"segment": str(segment), "offset": offset, "data": data}
+
+    tmp = _write_temp(COMMIT_JOURNAL, json.dumps(journal))
+    os.replace(tmp, COMMIT_JOURNAL)
+    _fsync_dir(DATA_DIR)
+
+    _apply_journal(journal)
+    COMMIT_JOURNAL.unlink()
+
+
+async def _write_changes(
+    changes: Dict[JsonStorage, Dict[str, Optional[Dict[str, Any]]]],
+    audit_log: AuditLogStorage,
+    audit_entries: List[Dict[str, Any]],
+) -> None:
+    """Write point changes to several JSON files plus audit entries atomically.
+
+    The fsyncs and renames run in a worker thread, so other requests keep
+    being served meanwhile, from the caches of the files being replaced.
+    Caller holds all involved locks.
+    """
+    staged = []
+    for storage, storage_changes in changes.items():
+        if not storage_changes:
+            continue
+        records, changed = storage._apply_changes(storage_changes)
+        staged.append((storage, records, changed))
+
+    for storage, _, _ in staged:
+        storage._flushing = True
+    try:
+        await asyncio.to_thread(
+            _flush_changes,
+            [(storage, records) for storage, records, _ in staged],
+            audit_log,
+            audit_entries,
+        )
+        for storage, records, changed in staged:
+            storage._set_cache(records, storage._stat_signature(), changed)
+    finally:
+        for storage, _, _ in staged:
+            storage._flushing = False
+
+
+class GroupCommitter:
+    """Coalesces concurrent JSON commits into one write per file.
+
+    Units of work submitted within ``window`` seconds of each other (or while
+    a previous group is being written) are resolved one after another against
+    the same in-memory documents and flushed together. A unit of work that
+    fails to resolve only fails its own caller; a failed flush fails the
+    whole group.
+    """
+
+    def __init__(self, audit_log: AuditLogStorage, window: float):
+        self.audit_log = audit_log
+        self.window = window
+        self._queue: List[Tuple[Any, asyncio.Future]] = []
+        self._flusher: asyncio.Task | None = None
+
+    async def submit(self, uow: Any) -> None:
+        """Queue a unit of work and wait until its group has been written."""
+        future = asyncio.get_running_loop().create_future()
+        self._queue.append((uow, future))
+        if self._flusher is None:
+            self._flusher = asyncio.create_task(self._run())
+        await future
+
+    async def _run(self) -> None:
+        try:
+            if self.window > 0:
+                await asyncio.sleep(self.window)
+            while self._queue:
+                group, self._queue = self._queue, []
+                await self._commit_group(group)
+        finally:
+            self._flusher = None
+
+    async def _commit_group(self, group: List[Tuple[Any, asyncio.Future]]) -> None:
+        storages = sorted(
+            {storage for uow, _ in group for storage in uow.storages},
+            key=lambda st: str(st.filepath),
+        )
+        accepted: List[asyncio.Future] = []
+        try:
+            async with AsyncExitStack() as locks:
+                for storage in storages:
+                    await locks.enter_async_context(storage._lock)
+                await locks.enter_async_context(self.audit_log._lock)
+
+                with ExitStack() as file_locks:
+                    for storage in storages:
+                        file_locks.enter_context(storage._file_lock)
+                    file_locks.enter_context(self.audit_log._file_lock)
+                    file_locks.enter_context(
+                        FileLock(str(COMMIT_JOURNAL) + ".lock", timeout=10)
+                    )
+                    await asyncio.to_thread(_recover_journal)
+
+                    working: Dict[Any, Dict[str, Optional[Dict[str, Any]]]] = {
+                        storage: {} for storage in storages
+                    }
+
+                    def current(storage: Any, record_id: str) -> Dict[str, Any] | None:
+                        if record_id in working[storage]:
+                            return working[storage][record_id]
+                        return storage._find(record_id)
+
+                    audit_entries: List[Dict[str, Any]] = []
+                    for uow, future in group:
+                        try:
+                            changes, entries = uow.resolve(current)
+                        except Exception as e:
+                            if not future.done():
+                                future.set_exception(e)
+                            continue
+                        for storage, records in changes.items():
+                            working[storage].update(records)
+                        audit_entries.extend(entries)
+                        accepted.append(future)
+
+                    if accepted:
+                        await _write_changes(working, self.audit_log, audit_entries)
+        except Exception as e:
+            for future in accepted:
+                if not future.done():
+                    future.set_exception(e)
+            # Anything not yet resolved failed before the group was applied
+            for _, future in group:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        for future in accepted:
+            if not future.done():
+                future.set_result(None)
+
+
+# Storage instances - STORAGE_BACKEND selects "json" (default) or "sqlite"
+if STORAGE_BACKEND == "sqlite":
+    from app.services.sqlite_storage import (
+        SqliteDatabase,
+        SqliteStorage,
+        SqliteAuditLogStorage,
+    )
+
+    database = SqliteDatabase(Path(os.getenv("SQLITE_PATH", DATA_DIR / "tank-management.db")))
+    tanks_storage = SqliteStorage(database, "tanks")
+    movements_storage = SqliteStorage(database, "movements")
+    properties_storage = SqliteStorage(database, "properties")
+    users_storage = SqliteStorage(database, "users")
+    tank_events_storage = SqliteStorage(database, "tank_events")
+    tank_snapshots_storage = SqliteStorage(database, "tank_snapshots")
+    import_jobs_storage = SqliteStorage(database, "import_jobs")
+    audit_storage = SqliteAuditLogStorage(database)
+else:
+    tanks_storage = JsonStorage("tanks.json")
+    movements_storage = JsonStorage(
+        "movements.json",
+        indexes={
+            "scheduledDate": SortedIndex((), "scheduledDate"),
+            "tank": SortedIndex(("sourceTankId", "destinationTankId"), "scheduledDate"),
+            # Completed movements only, in ledger order
+            "tankDate": SortedIndex(
+                ("sourceTankId", "destinationTankId"), "date", sparse=True
+            ),
+        },
+    )
+    properties_storage = JsonStorage("properties.json")
+    users_storage = JsonStorage("users.json")
+    tank_events_storage = JsonStorage(
+        "tank-events.json", indexes={"tank": SortedIndex(("tankId",), "timestamp")}
+    )
+    tank_snapshots_storage = JsonStorage(
+        "tank-snapshots.json", indexes={"tank": SortedIndex(("tankId",), "timestamp")}
+    )
+    import_jobs_storage = JsonStorage("import-jobs.json")
+    audit_storage = AuditLogStorage("audit-log", legacy_filename="audit-log.json")
+    group_committer = GroupCommitter(
+        audit_storage, float(os.getenv("GROUP_COMMIT_WINDOW_MS", "2")) / 1000
+    )
+
+
+async def commit_changes(uow: Any) -> None:
+    """Commit a unit of work with the active backend."""
+    if STORAGE_BACKEND == "sqlite":
+        database.commit_unit_of_work(uow)
+    else:
+        await group_committer.submit(uow)
@@ -0,0 +1,189 @@
+import asyncio
+import csv
+import io
+import json
+import uuid
+from itertools import islice
+from typing import Any, AsyncIterator, Awaitable, BinaryIO, Callable, Dict, Iterator, List, Tuple
+
+from pydantic import ValidationError
+
+from app.models.movement import MovementCreate
+from app.services.file_storage import import_jobs_storage
+
+IMPORT_CHUNK_SIZE = 500
+IMPORT_FORMATS = ("csv", "ndjson")
+# Row errors kept on the job record; the rest are only counted
+MAX_REPORTED_ERRORS = 100
+
+# (row number, record or None, parse error or None)
+Row = Tuple[int, Dict[str, Any] | None, str | None]
+# Stages one chunk and saves the job in the same commit, returning the job
+CommitChunk = Callable[
+    [Dict[str, Any], List[Tuple[int, MovementCreate]], List[Dict[str, Any]], int],
+    Awaitable[Dict[str, Any]],
+]
+
+
+def detect_format(filename: str | None, fmt: str | None) -> str:
+    """The import format, given explicitly or taken from the file extension."""
+    if fmt:
+        if fmt not in IMPORT_FORMATS:
+            raise ValueError(f"Unsupported format '{fmt}'. Use csv or ndjson.")
+        return fmt
+    name = (filename or "").lower()
+    if name.endswith(".csv"):
+        return "csv"
+    if name.endswith((".ndjson", ".jsonl")):
+        return "ndjson"
+    raise ValueError("Cannot tell the format from the file name. Use csv or ndjson.")
+
+
+def _parse_properties(text: str) -> List[Dict[str, Any]]:
+    """Properties from a CSV cell: a JSON array or ``id=value;id=value``."""
+    text = text.strip()
+    if text.startswith("["):
+        return json.loads(text)
+    properties = []
+    for pair in filter(None, (p.strip() for p in text.split(";"))):
+        property_id, _, value = pair.partition("=")
+        properties.append(
+            {"propertyId": property_id.strip(), "value": float(value) if value.strip() else None}
+        )
+    return properties
+
+
+def _csv_record(row: Dict[str, Any]) -> Dict[str, Any]:
+    """A CSV row as a movement record; empty cells are left out."""
+    if None in row:
+        raise ValueError("Row has more cells than the header")
+    record = {key: value for key, value in row.items() if value not in (None, "")}
+    if "properties" in record:
+        record["properties"] = _parse_properties(record["properties"])
+    return record
+
+
+def iter_rows(stream: BinaryIO, fmt: str) -> Iterator[Row]:
+    """Parse an import file lazily, one row at a time.
+
+    Rows are numbered from 1, not counting the CSV header or blank NDJSON
+    lines, so a row number identifies the same row on every pass.
+    """
+    text = io.TextIOWrapper(stream, encoding="utf-8-sig", newline="")
+    if fmt == "csv":
+        for row_no, row in enumerate(csv.DictReader(text), 1):
+            try:
+                yield row_no, _csv_record(row), None
+            except (ValueError, TypeError) as e:
+                yield row_no, None, f"Invalid CSV row: {e}"
+        return
+
+    row_no = 0
+    for line in text:
+        if not line.strip():
+            continue
+        row_no += 1
+        try:
+            record = json.loads(line)
+        except json.JSONDecodeError as e:
+            yield row_no, None, f"Invalid JSON: {e.msg}"
+            continue
+        if not isinstance(record, dict):
+            yield row_no, None, "Each line must be a JSON object"
+            continue
+        yield row_no, record, None
+
+
+def validate_row(record: Dict[str, Any]) -> Tuple[MovementCreate | None, List[Dict[str, str]]]:
+    """Parse a record as MovementCreate, returning field errors if it doesn't fit."""
+    try:
+        return MovementCreate.model_validate(record), []
+    except ValidationError as e:
+        return None, [
+            {"field": ".".join(str(part) for part in error["loc"]), "message": error["msg"]}
+            for error in e.errors()
+        ]
+
+
+def new_job(filename: str | None, fmt: str, now: str) -> Dict[str, Any]:
+    """A fresh import job record."""
+    return {
+        "id": f"import-{uuid.uuid4()}",
+        "filename": filename or "",
+        "format": fmt,
+        "status": "running",
+        "rowsCommitted": 0,
+        "created": 0,
+        "failed": 0,
+        "errors": [],
+        "createdAt": now,
+        "updatedAt": now,
+    }
+
+
+def record_chunk(
+    job: Dict[str, Any], last_row: int, created: int, errors: List[Dict[str, Any]], now: str
+) -> Dict[str, Any]:
+    """The job after committing a chunk ending at ``last_row``."""
+    return {
+        **job,
+        "rowsCommitted": last_row,
+        "created": job["created"] + created,
+        "failed": job["failed"] + len(errors),
+        "errors": (job["errors"] + errors)[:MAX_REPORTED_ERRORS],
+        "updatedAt": now,
+    }
+
+
+def _skip(rows: Iterator[Row], count: int) -> None:
+    for _ in islice(rows, count):
+        pass
+
+
+async def run_import(
+    stream: BinaryIO,
+    fmt: str,
+    job: Dict[str, Any],
+    commit_chunk: CommitChunk,
+    now: Callable[[], str],
+    chunk_size: int = IMPORT_CHUNK_SIZE,
+) -> AsyncIterator[Dict[str, Any]]:
+    """Import movements chunk by chunk, yielding the job after each commit.
+
+    Only one chunk of rows is held in memory; reading and parsing run in a
+    worker thread. Each chunk is committed together with the job record, so
+    ``rowsCommitted`` always matches what was saved and an interrupted
+    import can be resumed by running the same file again with the same job,
+    which skips the rows already committed. The last job yielded is
+    ``completed`` or, if something went wrong, ``failed``.
+    """
+    rows = iter_rows(stream, fmt)
+    try:
+        await asyncio.to_thread(_skip, rows, job["rowsCommitted"])
+        while True:
+            chunk: List[Row] = await asyncio.to_thread(lambda: list(islice(rows, chunk_size)))
+            if not chunk:
+                break
+
+            items: List[Tuple[int, MovementCreate]] = []
+            rejected: List[Dict[str, Any]] = []
+            for row_no, record, error in chunk:
+                if error is not None:
+                    rejected.append({"row": row_no, "errors": [{"field": "row", "message": error}]})
+                    continue
+                movement, errors = validate_row(record)
+                if errors:
+                    rejected.append({"row": row_no, "errors": errors})
+                else:
+                    items.append((row_no, movement))
+
+            job = await commit_chunk(job, items, rejected, chunk[-1][0])
+            yield job
+
+        job = {**job, "status": "completed", "updatedAt": now()}
+    except Exception as e:
+        print(f"Error importing movements for {job['id']}: {e}")
+        job = {**job, "status": "failed", "error": str(e), "updatedAt": now()}
+
+    await import_jobs_storage.upsert(job)
+    yield job
@@ -0,0 +1,88 @@
+from typing import Dict, List, Optional
+
+from python_multipart import MultipartParser
+from python_multipart.exceptions import MultipartParseError
+from python_multipart.multipart import parse_options_header
+
+
+class MultipartFileReader:
+    """Pulls one file field out of a multipart/form-data body as it arrives.
+
+    Feed it the request body chunk by chunk; ``feed`` returns the bytes of
+    the named field found in that chunk, and everything else in the body is
+    skipped without being buffered. Raises ValueError for a body that isn't
+    valid multipart.
+    """
+
+    def __init__(self, content_type: str, field_name: str):
+        media_type, params = parse_options_header(content_type)
+        if media_type != b"multipart/form-data" or b"boundary" not in params:
+            raise ValueError("Expected a multipart/form-data body")
+        self.field_name = field_name.encode()
+        # Set once the field's headers have been read
+        self.content_type: Optional[str] = None
+        self.filename: Optional[str] = None
+        self.complete = False
+
+        self._header_name = b""
+        self._header_value = b""
+        self._headers: Dict[bytes, bytes] = {}
+        self._in_field = False
+        self._data: List[bytes] = []
+        self._parser = MultipartParser(
+            params[b"boundary"],
+            {
+                "on_part_begin": self._on_part_begin,
+                "on_header_field": self._on_header_field,
+                "on_header_value": self._on_header_value,
+                "on_header_end": self._on_header_end,
+                "on_headers_finished": self._on_headers_finished,
+                "on_part_data": self._on_part_data,
+                "on_part_end": self._on_part_end,
+            },
+        )
+
+    @property
+    def found(self) -> bool:
+        return self.content_type is not None
+
+    def feed(self, chunk: bytes) -> List[bytes]:
+        """Parse the next chunk of the body, returning the field's data in it."""
+        self._data = []
+        try:
+            self._parser.write(chunk)
+        except MultipartParseError as e:
+            raise ValueError(f"Invalid multipart body: {e}") from e
+        return self._data
+
+    def _on_part_begin(self) -> None:
+        self._headers = {}
+
+    def _on_header_field(self, data: bytes, start: int, end: int) -> None:
+        self._header_name += data[start:end]
+
+    def _on_header_value(self, data: bytes, start: int, end: int) -> None:
+        self._header_value += data[start:end]
+
+    def _on_header_end(self) -> None:
+        self._headers[self._header_name.lower()] = self._header_value
+        self._header_name = b""
+        self._header_value = b""
+
+    def _on_headers_finished(self) -> None:
+        _, options = parse_options_header(self._headers.get(b"content-disposition", b""))
+        # Only the first part with the field's name is read
+        self._in_field = options.get(b"name") == self.field_name and not self.found
+        if self._in_field:
+            media_type, _ = parse_options_header(self._headers.get(b"content-type", b""))
+            self.content_type = media_type.decode("latin-1")
+            self.filename = options.get(b"filename", b"").decode("utf-8", "replace")
+
+    def _on_part_data(self, data: bytes, start: int, end: int) -> None:
+        if self._in_field:
+            self._data.append(data[start:end])
+
+    def _on_part_end(self) -> None:
+        if self._in_field:
+            self.complete = True
+            self._in_field = False
@@ -1,34 +1,110 @@
+import asyncio
 import os
 import json
 import io
-from typing import List, Dict, Any, Optional
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import List, Dict, Any, Optional, Tuple
 
 from pypdf import PdfReader
 
+from app.services.rule_extraction import extract_with_rules
+from app.services.section_selection import prompt_batches
+
 LLM_PROVIDER = os.getenv("LLM_PROVIDER", "anthropic")
+# At most this many LLM calls in flight per worker; further extractions wait
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "4"))
+LLM_TIMEOUT_SECONDS = float(os.getenv("LLM_TIMEOUT_SECONDS", "60"))
+PDF_PARSE_WORKERS = int(os.getenv("PDF_PARSE_WORKERS", "2"))
+# Processes parsing batch uploads in parallel (default: one per CPU)
+PDF_PARSE_PROCESSES = int(os.getenv("PDF_PARSE_PROCESSES", "0")) or None
+# Rule-based results at least this confident are returned without the LLM
+PDF_FAST_PATH_MIN_CONFIDENCE = float(os.getenv("PDF_FAST_PATH_MIN_CONFIDENCE", "0.8"))
+# Report text sent per LLM call, and how many calls to make on long reports
+# before giving up on finding the values
+PDF_PROMPT_TOKEN_BUDGET = int(os.getenv("PDF_PROMPT_TOKEN_BUDGET", "1500"))
+PDF_PROMPT_MAX_ATTEMPTS = int(os.getenv("PDF_PROMPT_MAX_ATTEMPTS", "3"))
+
+# PDF parsing is CPU-bound; keep it off the event loop
+_parse_executor = ThreadPoolExecutor(max_workers=PDF_PARSE_WORKERS, thread_name_prefix="pdf-parse")
+_process_pool: Optional[ProcessPoolExecutor] = None
+_llm_slots = asyncio.Semaphore(LLM_MAX_CONCURRENCY)
+_clients: Dict[str, Any] = {}
+
+
+class ExtractionStats:
+    """How often extractions in this worker were answered by the rules alone,
+    and how the LLM calls made for the others went.
+
+    A rules hit is an extraction the fast path answered without the LLM.
+    Every LLM request counts as a call, and those that raised also as
+    failures, even when the rules' partial result is returned instead.
+    """
+
+    def __init__(self):
+        self.extractions = 0
+        self.rules_hits = 0
+        self.llm_calls = 0
+        self.llm_failures = 0
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "extractions": self.extractions,
+            "rulesHits": self.rules_hits,
+            "llmCalls": self.llm_calls,
+            "llmFailures": self.llm_failures,
+            "hitRate": (
+                round(self.rules_hits / self.extractions, 3) if self.extractions else None
+            ),
+        }
+
+
+extraction_stats = ExtractionStats()
+
+
+def parse_process_pool() -> ProcessPoolExecutor:
+    """Process pool for parsing many PDFs at once, started on first use."""
+    global _process_pool
+    if _process_pool is None:
+        _process_pool = ProcessPoolExecutor(max_workers=PDF_PARSE_PROCESSES)
+    return _process_pool
+
+
+def shutdown_parse_pools() -> None:
+    """Stop the parsing workers (on application shutdown)."""
+    _parse_executor.shutdown(wait=False, cancel_futures=True)
+    if _process_pool is not None:
+        _process_pool.shutdown(wait=False, cancel_futures=True)
+
+
+def parse_pdf_pages(pdf_bytes: bytes) -> List[str]:
+    """Text of each page of a PDF, in order, skipping pages without any."""
+    reader = PdfReader(io.BytesIO(pdf_bytes))
+    return [text for page in reader.pages if (text := page.extract_text())]
 
 
-async def extract_data_from_pdf(
-    pdf_bytes: bytes, property_definitions: List[Dict[str, Any]]
-) -> Dict[str, Any]:
-    """Extract structured data from PDF using LLM."""
+def parse_pdf_text(pdf_bytes: bytes) -> str:
+    """Text of every page of a PDF, in order."""
+    return "\n".join(parse_pdf_pages(pdf_bytes))
 
-    # Parse PDF to text
-    reader = PdfReader(io.BytesIO(pdf_bytes))
-    pdf_text = ""
-    for page in reader.pages:
-        text = page.extract_text()
-        if text:
-            pdf_text += text
 
-    if not pdf_text.strip():
-        return {"volume": None, "properties": [], "rawText": ""}
+def parse_and_match(
+    pdf_bytes: bytes, property_definitions: List[Dict[str, Any]]
+) -> Tuple[str, List[str], Dict[str, Any], float, bool]:
+    """Parse a PDF, run the rule-based extractor over its text and cut it
+    into prompt-sized batches, in one executor call."""
+    pages = parse_pdf_pages(pdf_bytes)
+    pdf_text = "\n".join(pages)
+    batches = prompt_batches(pages, property_definitions, PDF_PROMPT_TOKEN_BUDGET)
+    return (pdf_text, batches, *extract_with_rules(pdf_text, property_definitions))
 
+
+def build_prompt(pdf_text: str, property_definitions: List[Dict[str, Any]]) -> str:
+    """The extraction prompt for a report's text."""
     property_names = ", ".join(
         f"{p['name']} ({p['unit']})" for p in property_definitions
     )
 
-    prompt = f"""You are an expert at extracting data from lab analysis reports for Carbon Black Oil.
+    return f"""You are an expert at extracting data from lab analysis reports for Carbon Black Oil.
 
 Extract the following information from this lab report text:
 1. Volume (if mentioned) - typically in kilo barrels (KB) or barrels
@@ -47,23 +123,88 @@ Return ONLY a JSON object in this exact format (no markdown, no explanation):
 Lab Report Text:
 {pdf_text}"""
 
+
+async def extract_data_from_pdf(
+    pdf_bytes: bytes,
+    property_definitions: List[Dict[str, Any]],
+    parse_executor: Optional[Executor] = None,
+) -> Dict[str, Any]:
+    """Extract structured data from PDF, with rules first and the LLM if needed.
+
+    The PDF is parsed and matched against the property names, aliases and
+    units in ``parse_executor``, by default a small thread pool. When that
+    finds every property and is confident enough, its result is returned
+    as is; otherwise the report goes to the LLM. The result's
+    ``extractor`` says which one answered.
+
+    Long reports are not sent whole: the LLM gets the sections that mention
+    the properties most, up to ``PDF_PROMPT_TOKEN_BUDGET`` tokens, and only
+    if it finds nothing there the next most relevant ones.
+    """
+
+    # Parse PDF to text
+    loop = asyncio.get_running_loop()
+    pdf_text, batches, rules_result, confidence, complete = await loop.run_in_executor(
+        parse_executor or _parse_executor, parse_and_match, pdf_bytes, property_definitions
+    )
+
+    if not pdf_text.strip():
+        return {"volume": None, "properties": [], "rawText": ""}
+
+    extraction_stats.extractions += 1
+    if complete and confidence >= PDF_FAST_PATH_MIN_CONFIDENCE:
+        extraction_stats.rules_hits += 1
+        return {**rules_result, "extractor": "rules", "confidence": confidence}
+
     try:
+        for batch in batches[:PDF_PROMPT_MAX_ATTEMPTS]:
+            extraction_stats.llm_calls += 1
+            result = await _extract_with_llm(build_prompt(batch, property_definitions))
+            if result["properties"] or result["volume"] is not None:
+                break
+    except Exception as e:
+        extraction_stats.llm_failures += 1
+        print(f"LLM extraction failed: {e!r}")
+        # Whatever the rules found is better than nothing
+        return {**rules_result, "extractor": "rules", "confidence": confidence, "rawText": pdf_text}
+
+    return {**result, "extractor": "llm"}
+
+
+async def _extract_with_llm(prompt: str) -> Dict[str, Any]:
+    """Run the prompt through the configured provider, within the concurrency
+    limit and timeout."""
+    async with _llm_slots:
         if LLM_PROVIDER == "openai":
-            return await _extract_with_openai(prompt)
+            call = _extract_with_openai(prompt)
         else:
-            return await _extract_with_anthropic(prompt)
-    except Exception as e:
-        print(f"LLM extraction failed: {e}")
-        return {"volume": None, "properties": [], "rawText": pdf_text}
+            call = _extract_with_anthropic(prompt)
+        return await asyncio.wait_for(call, LLM_TIMEOUT_SECONDS)
 
 
-async def _extract_with_anthropic(prompt: str) -> Dict[str, Any]:
-    """Extract data using Anthropic Claude."""
-    import anthropic
+def _client(provider: str) -> Any:
+    """The provider's async client, created once so connections are pooled."""
+    client = _clients.get(provider)
+    if client is None:
+        if provider == "openai":
+            import openai
+
+            client = openai.AsyncOpenAI(
+                api_key=os.getenv("OPENAI_API_KEY"), timeout=LLM_TIMEOUT_SECONDS
+            )
+        else:
+            import anthropic
+
+            client = anthropic.AsyncAnthropic(
+                api_key=os.getenv("ANTHROPIC_API_KEY"), timeout=LLM_TIMEOUT_SECONDS
+            )
+        _clients[provider] = client
+    return client
 
-    client = anthropic.Anthropic(api_key=os.getenv("ANTHROPIC_API_KEY"))
 
-    response = client.messages.create(
+async def _extract_with_anthropic(prompt: str) -> Dict[str, Any]:
+    """Extract data using Anthropic Claude."""
+    response = await _client("anthropic").messages.create(
         model="claude-3-haiku-20240307",
         max_tokens=1024,
         messages=[{"role": "user", "content": prompt}],
@@ -84,11 +225,7 @@ async def _extract_with_anthropic(prompt: str) -> Dict[str, Any]:
 
 async def _extract_with_openai(prompt: str) -> Dict[str, Any]:
     """Extract data using OpenAI."""
-    import openai
-
-    client = openai.OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
-
-    response = client.chat.completions.create(
+    response = await _client("openai").chat.completions.create(
         model="gpt-4o-mini",
         messages=[{"role": "user", "content": prompt}],
         response_format={"type": "json_object"},
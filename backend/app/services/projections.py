@@ -0,0 +1,268 @@
+from collections import OrderedDict
+from datetime import date, timedelta
+from typing import Any, Dict, Iterable, List, Tuple
+
+import numpy as np
+
+from app.services.file_storage import movements_storage, tanks_storage
+from app.services.tank_calculations import get_effective_volume
+
+
+# Volumes closer to zero than this are rounding residue of an emptied tank
+VOLUME_EPSILON = 1e-9
+
+
+def project_fleet(
+    tanks: List[Dict[str, Any]],
+    movements: List[Dict[str, Any]],
+    start: date,
+    horizon: int,
+) -> Dict[str, Any]:
+    """Project every tank over scheduled movements in one pass.
+
+    Follows the rules of ``calculate_projected_state``, evaluated with NumPy
+    for the whole fleet at once instead of movement by movement: volume is
+    the running sum of inflows and outflows floored at zero, and each
+    property is the volume-weighted blend of the starting value and the
+    inflows since the tank was last empty (missing values weigh in as zero,
+    as in ``calculate_blended_properties``). Values are rounded once at the
+    end rather than after every blend. Running sums are taken over each
+    tank's own movements, so a tank projects the same whichever other
+    tanks are projected with it.
+
+    ``movements`` must be sorted by scheduledDate. Movements scheduled
+    before ``start`` count towards the first day. Returns the end state of
+    each tank plus its volume at the end of each of the ``horizon`` days.
+    """
+    n = len(tanks)
+    tank_index = {t["id"]: i for i, t in enumerate(tanks)}
+    columns: Dict[str, int] = {}
+    for tank in tanks:
+        for prop in tank["properties"]:
+            columns.setdefault(prop["propertyId"], len(columns))
+
+    # One leg per tank a movement adds to or takes from, plus a flat
+    # (leg, column, value) list of the properties each inflow brings
+    leg_tanks: List[int] = []
+    leg_deltas: List[float] = []
+    leg_days: List[int] = []
+    day_of: Dict[str, int] = {}
+    added_legs: List[int] = []
+    added_columns: List[int] = []
+    added_values_list: List[float] = []
+
+    for movement in movements:
+        source = tank_index.get(movement.get("sourceTankId"))
+        destination = tank_index.get(movement.get("destinationTankId"))
+        movement_type = movement["type"]
+        is_outflow = movement_type != "receive" and source is not None
+        is_inflow = destination is not None and (
+            movement_type == "receive" or (movement_type == "transfer" and destination != source)
+        )
+        if not (is_outflow or is_inflow):
+            continue
+
+        volume = get_effective_volume(movement)
+        scheduled_day = movement["scheduledDate"][:10]
+        day = day_of.get(scheduled_day)
+        if day is None:
+            day = day_of[scheduled_day] = (date.fromisoformat(scheduled_day) - start).days
+
+        if is_outflow:
+            leg_tanks.append(source)
+            leg_deltas.append(-volume)
+            leg_days.append(day)
+        if is_inflow:
+            for prop in movement.get("properties", []):
+                added_legs.append(len(leg_tanks))
+                added_columns.append(columns.setdefault(prop["propertyId"], len(columns)))
+                value = prop["value"]
+                added_values_list.append(value if value is not None else np.nan)
+            leg_tanks.append(destination)
+            leg_deltas.append(volume)
+            leg_days.append(day)
+
+    width = len(columns)
+    start_values = np.full((n, width), np.nan)
+    start_listed = np.zeros((n, width), dtype=bool)
+    for i, tank in enumerate(tanks):
+        for prop in tank["properties"]:
+            start_listed[i, columns[prop["propertyId"]]] = True
+            if prop["value"] is not None:
+                start_values[i, columns[prop["propertyId"]]] = prop["value"]
+
+    added_values = np.full((len(leg_tanks), width), np.nan)
+    added_listed = np.zeros((len(leg_tanks), width), dtype=bool)
+    added_values[added_legs, added_columns] = added_values_list
+    added_listed[added_legs, added_columns] = True
+
+    # Legs grouped by tank, in scheduled order within each tank
+    order = np.argsort(np.array(leg_tanks, dtype=np.intp), kind="stable")
+    tank_of = np.array(leg_tanks, dtype=np.intp)[order]
+    deltas = np.array(leg_deltas, dtype=float)[order]
+    days = np.clip(np.array(leg_days, dtype=np.int64)[order], 0, horizon)
+    added_values = added_values[order]
+    added_listed = added_listed[order]
+    current = np.array([t["currentVolume"] for t in tanks], dtype=float)
+    starts = np.searchsorted(tank_of, np.arange(n))
+    ends = np.searchsorted(tank_of, np.arange(n), side="right")
+
+    # Running volume per tank, floored at zero by subtracting the running
+    # minimum of its dips below zero. Each tank's legs are summed on their
+    # own, so a tank's result doesn't depend on the others in the fleet.
+    volumes = np.empty_like(deltas)
+    for i in np.flatnonzero(ends > starts):
+        running = current[i] + np.cumsum(deltas[starts[i] : ends[i]])
+        volumes[starts[i] : ends[i]] = running - np.minimum.accumulate(np.minimum(running, 0))
+    # An emptied tank is empty, not left with rounding residue
+    volumes[np.abs(volumes) < VOLUME_EPSILON] = 0.0
+
+    before = np.concatenate(([0.0], volumes[:-1]))
+    has_legs = ends > starts
+    before[starts[has_legs]] = current[has_legs]
+
+    # Blend weights: each inflow's share of the final contents is
+    # (1 - kept) times the product of ``kept`` over the inflows after it;
+    # an inflow into an empty tank (kept == 0) discards everything before.
+    inflows = deltas > 0
+    g = tank_of[inflows]
+    total = before[inflows] + deltas[inflows]
+    kept = np.divide(before[inflows], total, out=np.ones_like(total), where=total > 0)
+    empty = kept <= 0
+    log_kept = np.log(np.where(empty, 1.0, kept))
+    inflow_starts = np.searchsorted(g, np.arange(n))
+    inflow_ends = np.searchsorted(g, np.arange(n), side="right")
+    log_totals = np.zeros(n)
+    log_after = np.empty_like(log_kept)
+    for i in np.flatnonzero(inflow_ends > inflow_starts):
+        tank_logs = log_kept[inflow_starts[i] : inflow_ends[i]]
+        suffix = np.cumsum(tank_logs[::-1])[::-1]
+        log_totals[i] = suffix[0]
+        log_after[inflow_starts[i] : inflow_ends[i]] = suffix - tank_logs
+    position = np.arange(len(g))
+    last_empty = np.full(n, -1)
+    np.maximum.at(last_empty, g[empty], position[empty])
+    weights = np.where(position >= last_empty[g], (1 - kept) * np.exp(log_after), 0.0)
+    start_weights = np.where(last_empty >= 0, 0.0, np.exp(log_totals))
+
+    values = start_weights[:, None] * np.nan_to_num(start_values)
+    np.add.at(values, g, weights[:, None] * np.nan_to_num(added_values[inflows]))
+    valued = ~np.isnan(start_values) & (start_weights > 0)[:, None]
+    np.logical_or.at(valued, g, ~np.isnan(added_values[inflows]) & (weights > 0)[:, None])
+    listed = start_listed.copy()
+    np.logical_or.at(listed, g, added_listed[inflows])
+
+    # Volume at the end of each day: the last leg on or before that day.
+    # A sentinel leg (tank -1) answers lookups that find nothing.
+    padded_volumes = np.append(volumes, 0.0)
+    padded_tanks = np.append(tank_of, -1)
+    keys = tank_of * (horizon + 1) + days
+    day_range = np.arange(horizon)
+    lookups = (np.arange(n)[:, None] * (horizon + 1) + day_range[None, :]).ravel()
+    found = np.searchsorted(keys, lookups, side="right") - 1
+    tank_rows = np.repeat(np.arange(n), horizon)
+    daily = np.where(
+        padded_tanks[found] == tank_rows, padded_volumes[found], current[tank_rows]
+    ).reshape(n, horizon)
+    end_volumes = np.where(has_legs, padded_volumes[ends - 1], current)
+
+    property_ids = list(columns)
+    rows = zip(
+        tanks,
+        np.round(end_volumes, 3).tolist(),
+        np.round(values, 3).tolist(),
+        valued.tolist(),
+        listed.tolist(),
+        np.round(daily, 3).tolist(),
+    )
+    results = [
+        {
+            "tankId": tank["id"],
+            "volume": volume,
+            "properties": [
+                {"propertyId": property_id, "value": row_values[c] if row_valued[c] else None}
+                for c, property_id in enumerate(property_ids)
+                if row_listed[c]
+            ],
+            "dailyVolumes": daily_volumes,
+        }
+        for tank, volume, row_values, row_valued, row_listed, daily_volumes in rows
+    ]
+
+    return {
+        "dates": [(start + timedelta(days=d)).isoformat() for d in range(horizon)],
+        "tanks": results,
+    }
+
+
+class ProjectionCache:
+    """Per-tank projections, recomputed lazily for the tanks that changed.
+
+    Routers call ``mark_dirty`` with the tanks a write touched; the next read
+    re-projects only those (and any tank whose ``updatedAt`` moved). A change
+    to the stored data that wasn't written by this process, e.g. by another
+    worker, drops the whole cache. Entries are kept for the few most recent
+    (start, horizon) windows.
+    """
+
+    def __init__(self, max_windows: int = 4):
+        self.max_windows = max_windows
+        # (start, horizon) -> tank id -> (tank updatedAt, projection)
+        self._windows: OrderedDict[
+            Tuple[date, int], Dict[str, Tuple[str, Dict[str, Any]]]
+        ] = OrderedDict()
+        self._versions: Tuple[int, int] | None = None
+
+    def mark_dirty(self, tank_ids: Iterable[str]) -> None:
+        """Drop cached projections of tanks touched by a write."""
+        tank_ids = set(tank_ids)
+        for window in self._windows.values():
+            for tank_id in tank_ids:
+                window.pop(tank_id, None)
+
+    async def get(self, start: date, horizon: int) -> Dict[str, Any]:
+        """Fleet projection for a window, as returned by ``project_fleet``."""
+        storages = (tanks_storage, movements_storage)
+        versions = tuple([await storage.current_version() for storage in storages])
+        # Local writes are handled by mark_dirty; any other one may touch anything
+        if self._versions is None or not all(
+            storage.local_versions.produced(seen, current)
+            for storage, seen, current in zip(storages, self._versions, versions)
+        ):
+            self._windows.clear()
+        self._versions = versions
+
+        key = (start, horizon)
+        window = self._windows.setdefault(key, {})
+        self._windows.move_to_end(key)
+        while len(self._windows) > self.max_windows:
+            self._windows.popitem(last=False)
+
+        tanks = await tanks_storage.snapshot()
+        stale = [
+            t for t in tanks if window.get(t["id"], (None, None))[0] != t["updatedAt"]
+        ]
+        if stale:
+            end = (start + timedelta(days=horizon)).isoformat()
+            if len(stale) * 2 > len(tanks):
+                candidates = await movements_storage.range_query("scheduledDate", end=end)
+                movements = [m for m in candidates if m.get("date") is None]
+            else:
+                by_id: Dict[str, Dict[str, Any]] = {}
+                for tank in stale:
+                    for m in await movements_storage.range_query("tank", tank["id"], end=end):
+                        if m.get("date") is None:
+                            by_id[m["id"]] = m
+                movements = sorted(by_id.values(), key=lambda m: (m["scheduledDate"], m["id"]))
+
+            projected = project_fleet(stale, movements, start, horizon)
+            for tank, result in zip(stale, projected["tanks"]):
+                window[tank["id"]] = (tank["updatedAt"], result)
+
+        return {
+            "dates": [(start + timedelta(days=d)).isoformat() for d in range(horizon)],
+            "tanks": [window[t["id"]][1] for t in tanks],
+        }
+
+
+projection_cache = ProjectionCache()
@@ -0,0 +1,71 @@
+import hashlib
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Sequence, Tuple
+
+from fastapi import Request, Response
+from pydantic import TypeAdapter
+
+
+class ResponseCache:
+    """Encoded list responses, reused until a storage they read from changes.
+
+    Each entry holds the JSON bytes of one response, validated and encoded
+    through the response model once, with a strong ETag over those bytes.
+    Entries are keyed by path and query and tagged with the versions of the
+    storages the response was built from; while those versions hold, a
+    request is answered from the stored bytes, or with 304 Not Modified when
+    its If-None-Match has the ETag. The ETag is a hash of the content, so
+    every worker hands out the same tag for the same response.
+    """
+
+    def __init__(self, max_entries: int = 128):
+        self.max_entries = max_entries
+        # (path, query) -> (storage versions, body, etag)
+        self._entries: OrderedDict[
+            Tuple[str, Tuple[Tuple[str, str], ...]], Tuple[Tuple[int, ...], bytes, str]
+        ] = OrderedDict()
+        self._adapters: Dict[Any, TypeAdapter] = {}
+
+    def _encode(self, response_model: Any, data: Any) -> bytes:
+        adapter = self._adapters.get(response_model)
+        if adapter is None:
+            adapter = self._adapters[response_model] = TypeAdapter(response_model)
+        return adapter.dump_json(adapter.validate_python(data))
+
+    async def respond(
+        self,
+        request: Request,
+        storages: Sequence[Any],
+        response_model: Any,
+        build: Callable[[], Awaitable[Any]],
+    ) -> Response:
+        """The cached response for ``request``, building it with ``build()``
+        if any of ``storages`` changed since it was cached."""
+        versions = tuple([await storage.current_version() for storage in storages])
+        key = (request.url.path, tuple(sorted(request.query_params.multi_items())))
+
+        entry = self._entries.get(key)
+        if entry is None or entry[0] != versions:
+            body = self._encode(response_model, await build())
+            etag = f'"{hashlib.blake2b(body, digest_size=16).hexdigest()}"'
+            entry = self._entries[key] = (versions, body, etag)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+        _, body, etag = entry
+        headers = {"ETag": etag, "Cache-Control": "no-cache"}
+        if _matches(request.headers.get("if-none-match"), etag):
+            return Response(status_code=304, headers=headers)
+        return Response(body, media_type="application/json", headers=headers)
+
+
+def _matches(if_none_match: str | None, etag: str) -> bool:
+    """Whether an If-None-Match header lists ``etag`` (compared weakly, per RFC 9110)."""
+    if not if_none_match:
+        return False
+    tags = [tag.strip() for tag in if_none_match.split(",")]
+    return "*" in tags or any(tag.removeprefix("W/") == etag for tag in tags)
+
+
+response_cache = ResponseCache()
@@ -0,0 +1,217 @@
+import hashlib
+import json
+import re
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+# A standalone number: not part of a word, code or longer number
+NUMBER = r"(?<![\w.])[-+]?\d+(?:,\d{3})*(?:\.\d+)?(?![\w.]*\d)"
+# Test method references and temperatures hold numbers that are never values
+NOISE = re.compile(
+    r"\b(?:ASTM\s*)?D\s?-?\d{3,5}\b|\b(?:ISO|IP|EN)\s?\d+\b"
+    r"|(?:@|\bat)\s*[-+]?\d+(?:\.\d+)?\s*[^\w\s]{0,2}\s*(?:deg\.?\s*)?[CF]\b"
+    r"|[-+]?\d+(?:\.\d+)?\s*(?:[^\w\s]{1,2}|deg\.?)\s*[CF]\b",
+    re.IGNORECASE,
+)
+VOLUME = re.compile(
+    r"\b(?:volume|quantity|qty)\b[^\d\n]{0,40}?(" + NUMBER + r")\s*"
+    r"(k\s?bbls?|kb|mbbls?|bbls?|barrels?)?\b",
+    re.IGNORECASE,
+)
+VOLUME_LABEL = re.compile(r"\b(?:volume|quantity|qty)\b", re.IGNORECASE)
+
+# Confidence of a property value by what surrounds it
+UNIT_ADJACENT = 1.0
+UNIT_ON_LINE = 0.8
+NO_UNIT = 0.6
+CONFLICTING = 0.3
+# Values below this are left for the LLM
+MIN_FIELD_CONFIDENCE = 0.5
+# Extractors kept for the most recently used sets of property definitions
+RULE_EXTRACTOR_CACHE_SIZE = 8
+
+
+def _label_pattern(label: str) -> str:
+    words = [re.escape(word) for word in label.split()]
+    return r"(?<![A-Za-z])" + r"\s+".join(words) + r"(?![A-Za-z])"
+
+
+def _unit_pattern(unit: str) -> Optional[str]:
+    unit = unit.strip()
+    if not unit:
+        return None
+    if unit == "%":
+        return r"\s*(?:(?:wt|mass|vol|m/m|v/v)\.?\s*)?%"
+    pattern = r"\s*°?\s*" + re.escape(unit)
+    return pattern + r"(?![A-Za-z])" if unit[-1].isalpha() else pattern
+
+
+def _to_number(text: str) -> float:
+    return float(text.replace(",", ""))
+
+
+class RuleExtractor:
+    """Matches property names, aliases and units in a report's text.
+
+    Built once per set of property definitions; see ``rule_extractor``.
+    ``extract`` finds, for each
+    property, the number following its name (or one of its aliases) on the
+    same line, preferring one written next to the property's unit, plus a
+    volume written after "Volume" or "Quantity". Every value comes with a
+    confidence; see ``extract_with_rules``.
+    """
+
+    def __init__(self, property_definitions: List[Dict[str, Any]]):
+        self.definitions = property_definitions
+        labels: List[Tuple[str, int]] = []
+        for index, definition in enumerate(property_definitions):
+            for label in [definition["name"], *(definition.get("aliases") or [])]:
+                if label.strip():
+                    labels.append((label.strip(), index))
+        # Longest first, so "Sulfur Content" wins over "Sulfur"
+        labels.sort(key=lambda item: -len(item[0]))
+        self._labels = [
+            (re.compile(_label_pattern(label), re.IGNORECASE), index) for label, index in labels
+        ]
+        self._units = [
+            re.compile(pattern, re.IGNORECASE) if pattern else None
+            for pattern in (_unit_pattern(d.get("unit") or "") for d in property_definitions)
+        ]
+
+    def _find_labels(self, line: str) -> List[Tuple[int, int, int]]:
+        """(start, end, definition index) of each label on a line, without overlaps."""
+        found: List[Tuple[int, int, int]] = []
+        for pattern, index in self._labels:
+            for match in pattern.finditer(line):
+                start, end = match.span()
+                if all(end <= s or start >= e for s, e, _ in found):
+                    found.append((start, end, index))
+        found.sort()
+        return found
+
+    def _read_value(self, segment: str, index: int) -> Optional[Tuple[float, float]]:
+        """The value in the text after a label, and how confident we are in it."""
+        segment = NOISE.sub(" ", segment)
+        numbers = list(re.finditer(NUMBER, segment))
+        if not numbers:
+            return None
+        unit = self._units[index]
+        if unit is not None:
+            for number in numbers:
+                before = segment[: number.start()].rstrip()
+                if unit.match(segment, number.end()) or any(
+                    m.end() == len(before) for m in unit.finditer(before)
+                ):
+                    return _to_number(number.group()), UNIT_ADJACENT
+            if unit.search(segment):
+                return _to_number(numbers[0].group()), UNIT_ON_LINE
+        return _to_number(numbers[0].group()), NO_UNIT
+
+    def _find_volume(self, lines: List[str]) -> Tuple[Optional[float], Optional[float]]:
+        """The volume (in KB) and its confidence, or None for a report that
+        doesn't label one."""
+        text = "\n".join(lines)
+        match = VOLUME.search(text)
+        if match is None:
+            # A volume label without a readable number: the LLM may do better
+            return None, (0.0 if VOLUME_LABEL.search(text) else None)
+        value = _to_number(match.group(1))
+        unit = (match.group(2) or "").lower().replace(" ", "")
+        if not unit:
+            return value, NO_UNIT
+        if unit.startswith(("bbl", "barrel")):
+            value = value / 1000
+        return value, UNIT_ADJACENT
+
+    def extract(self, pdf_text: str) -> Tuple[Dict[str, Any], float, bool]:
+        """The values found in ``pdf_text``, an overall confidence, and
+        whether every property was found with enough confidence."""
+        values: Dict[int, Tuple[float, float]] = {}
+        # Lines naming no property; "% volume" in a property's row isn't a volume
+        other_lines: List[str] = []
+        for line in pdf_text.splitlines():
+            labels = self._find_labels(line)
+            if not labels:
+                other_lines.append(line)
+            for position, (_, end, index) in enumerate(labels):
+                # A label's value lies between it and the next label
+                stop = labels[position + 1][0] if position + 1 < len(labels) else len(line)
+                found = self._read_value(line[end:stop], index)
+                if found is None:
+                    continue
+                if index not in values:
+                    values[index] = found
+                elif values[index][0] != found[0]:
+                    values[index] = (values[index][0], min(values[index][1], CONFLICTING))
+                else:
+                    values[index] = (found[0], max(values[index][1], found[1]))
+
+        volume, volume_confidence = self._find_volume(other_lines)
+        scores = [values[i][1] if i in values else 0.0 for i in range(len(self.definitions))]
+        if volume_confidence is not None:
+            scores.append(volume_confidence)
+        confidence = sum(scores) / len(scores) if scores else 0.0
+        complete = all(
+            i in values and values[i][1] >= MIN_FIELD_CONFIDENCE
+            for i in range(len(self.definitions))
+        )
+
+        result = {
+            "volume": volume,
+            "properties": [
+                {
+                    "name": self.definitions[i]["name"],
+                    "value": values[i][0],
+                    "unit": self.definitions[i].get("unit") or "",
+                }
+                for i in sorted(values)
+                if values[i][1] >= MIN_FIELD_CONFIDENCE
+            ],
+        }
+        return result, round(confidence, 3), complete
+
+
+def property_definitions_hash(property_definitions: List[Dict[str, Any]]) -> str:
+    """Short hash of the ids, names, units and aliases of property definitions."""
+    definitions = sorted(
+        (p.get("id", ""), p.get("name", ""), p.get("unit", ""), p.get("aliases") or [])
+        for p in property_definitions
+    )
+    return hashlib.sha256(json.dumps(definitions).encode()).hexdigest()[:16]
+
+
+_extractors: OrderedDict[str, RuleExtractor] = OrderedDict()
+_extractors_lock = threading.Lock()
+
+
+def rule_extractor(property_definitions: List[Dict[str, Any]]) -> RuleExtractor:
+    """The extractor for these property definitions, reused until they change."""
+    key = property_definitions_hash(property_definitions)
+    with _extractors_lock:
+        extractor = _extractors.get(key)
+        if extractor is not None:
+            _extractors.move_to_end(key)
+            return extractor
+
+    extractor = RuleExtractor(property_definitions)
+    with _extractors_lock:
+        _extractors[key] = extractor
+        while len(_extractors) > RULE_EXTRACTOR_CACHE_SIZE:
+            _extractors.popitem(last=False)
+    return extractor
+
+
+def extract_with_rules(
+    pdf_text: str, property_definitions: List[Dict[str, Any]]
+) -> Tuple[Dict[str, Any], float, bool]:
+    """Extract volume and properties from a report without the LLM.
+
+    Returns the result (in the LLM's format), a confidence between 0 and 1,
+    and whether all properties were found. A property's value scores
+    highest when written next to its unit, lower when the unit is only
+    elsewhere on the line or missing, and lowest when the report gives two
+    different values for it. The confidence is the mean over all properties,
+    a missing one counting as 0, and the volume if the report labels one.
+    """
+    return rule_extractor(property_definitions).extract(pdf_text)
@@ -0,0 +1,106 @@
+import re
+from typing import Any, Dict, List, Tuple
+
+# Lines per section when a page has no blank lines to split on
+SECTION_MAX_LINES = 12
+# Rough size of a token in characters, for budgeting prompts
+CHARS_PER_TOKEN = 4
+VOLUME_KEYWORDS = ["volume", "quantity", "qty", "bbl", "bbls", "barrels", "kb"]
+
+# Weight of a keyword hit by what it names
+LABEL_WEIGHT = 3
+VOLUME_WEIGHT = 2
+UNIT_WEIGHT = 1
+
+
+def estimate_tokens(text: str) -> int:
+    return len(text) // CHARS_PER_TOKEN + 1
+
+
+def split_sections(pages: List[str]) -> List[str]:
+    """Blocks of each page: runs of lines between blank lines, at most
+    ``SECTION_MAX_LINES`` lines each."""
+    sections: List[str] = []
+    for page in pages:
+        for block in re.split(r"\n\s*\n", page):
+            lines = [line for line in block.splitlines() if line.strip()]
+            for start in range(0, len(lines), SECTION_MAX_LINES):
+                sections.append("\n".join(lines[start : start + SECTION_MAX_LINES]))
+    return sections
+
+
+def _keyword_pattern(property_definitions: List[Dict[str, Any]]) -> Tuple[re.Pattern, Dict[str, int]]:
+    """One pattern matching every keyword, and each keyword's weight."""
+    weights: Dict[str, int] = {}
+    for definition in property_definitions:
+        for label in [definition["name"], *(definition.get("aliases") or [])]:
+            if label.strip():
+                weights[label.strip().lower()] = LABEL_WEIGHT
+        unit = (definition.get("unit") or "").strip().lower()
+        if unit:
+            weights.setdefault(unit, UNIT_WEIGHT)
+    for keyword in VOLUME_KEYWORDS:
+        weights.setdefault(keyword, VOLUME_WEIGHT)
+    alternatives = sorted(weights, key=len, reverse=True)
+    pattern = re.compile(
+        r"(?<![A-Za-z])(" + "|".join(re.escape(k) for k in alternatives) + r")(?![A-Za-z])",
+        re.IGNORECASE,
+    )
+    return pattern, weights
+
+
+def score_sections(
+    sections: List[str], property_definitions: List[Dict[str, Any]]
+) -> List[float]:
+    """Keyword density of each section: weighted hits on property names,
+    aliases, units and volume words per word of text."""
+    pattern, weights = _keyword_pattern(property_definitions)
+    scores = []
+    for section in sections:
+        hits = sum(weights[match.group(1).lower()] for match in pattern.finditer(section))
+        scores.append(hits / max(len(section.split()), 1))
+    return scores
+
+
+def prompt_batches(
+    pages: List[str], property_definitions: List[Dict[str, Any]], token_budget: int
+) -> List[str]:
+    """The report's text cut into batches of at most ``token_budget`` tokens,
+    most relevant first.
+
+    A report that fits the budget is one batch, as is. Otherwise its
+    sections are ranked by keyword density and packed greedily, best first,
+    so the first batch holds the sections most likely to contain the values
+    and later ones the rest; sections keep their document order within a
+    batch. A section larger than the whole budget is cut down to it.
+    """
+    pdf_text = "\n".join(pages)
+    if estimate_tokens(pdf_text) <= token_budget:
+        return [pdf_text]
+
+    sections = split_sections(pages)
+    scores = score_sections(sections, property_definitions)
+    ranked = sorted(range(len(sections)), key=lambda i: -scores[i])
+    max_chars = token_budget * CHARS_PER_TOKEN
+
+    batches: List[str] = []
+    remaining = ranked
+    while remaining:
+        chosen: List[int] = []
+        left_over: List[int] = []
+        used = 0
+        for i in remaining:
+            size = len(sections[i]) + 2
+            if used + size <= max_chars:
+                chosen.append(i)
+                used += size
+            elif not chosen:
+                # Too big for any batch: keep its start
+                sections[i] = sections[i][: max_chars - 2]
+                chosen.append(i)
+                used = max_chars
+            else:
+                left_over.append(i)
+        batches.append("\n\n".join(sections[i] for i in sorted(chosen)))
+        remaining = left_over
+    return batches
@@ -0,0 +1,469 @@
+import json
+import asyncio
+import sqlite3
+from pathlib import Path
+from typing import List, Any, Callable, Dict, Iterator, Tuple
+
+from app.services.file_storage import DATA_DIR, LocalVersions
+
+# Collections stored in SQLite: table name -> (legacy JSON file, indexed columns).
+# Indexed columns are copied out of the record on every write so they can be
+# queried without touching the JSON payload.
+TABLES: Dict[str, Tuple[str, Dict[str, str]]] = {
+    "tanks": ("tanks.json", {"name": "name"}),
+    "movements": (
+        "movements.json",
+        {
+            "source_tank_id": "sourceTankId",
+            "destination_tank_id": "destinationTankId",
+            "scheduled_date": "scheduledDate",
+            "date": "date",
+        },
+    ),
+    "properties": ("properties.json", {"name": "name"}),
+    "users": ("users.json", {}),
+    "tank_events": ("tank-events.json", {"tank_id": "tankId", "timestamp": "timestamp"}),
+    "tank_snapshots": ("tank-snapshots.json", {"tank_id": "tankId", "timestamp": "timestamp"}),
+    "import_jobs": ("import-jobs.json", {}),
+}
+
+# Range-queryable indexes: table -> index name -> (key columns, sort column,
+# sparse), mirroring the SortedIndex definitions of the JSON backend
+RANGE_INDEXES: Dict[str, Dict[str, Tuple[Tuple[str, ...], str, bool]]] = {
+    "movements": {
+        "scheduledDate": ((), "scheduled_date", False),
+        "tank": (("source_tank_id", "destination_tank_id"), "scheduled_date", False),
+        "tankDate": (("source_tank_id", "destination_tank_id"), "date", True),
+    },
+    "tank_events": {"tank": (("tank_id",), "timestamp", False)},
+    "tank_snapshots": {"tank": (("tank_id",), "timestamp", False)},
+}
+
+INDEXES = [
+    "CREATE INDEX IF NOT EXISTS idx_movements_source ON movements (source_tank_id, scheduled_date)",
+    "CREATE INDEX IF NOT EXISTS idx_movements_destination ON movements (destination_tank_id, scheduled_date)",
+    "CREATE INDEX IF NOT EXISTS idx_movements_scheduled ON movements (scheduled_date)",
+    "CREATE INDEX IF NOT EXISTS idx_movements_source_date ON movements (source_tank_id, date)",
+    "CREATE INDEX IF NOT EXISTS idx_movements_destination_date ON movements (destination_tank_id, date)",
+    "CREATE INDEX IF NOT EXISTS idx_tank_events_tank ON tank_events (tank_id, timestamp)",
+    "CREATE INDEX IF NOT EXISTS idx_tank_snapshots_tank ON tank_snapshots (tank_id, timestamp)",
+    "CREATE INDEX IF NOT EXISTS idx_audit_entity_id ON audit_log (entity_id, timestamp, id)",
+    "CREATE INDEX IF NOT EXISTS idx_audit_entity_type ON audit_log (entity_type, timestamp, id)",
+    "CREATE INDEX IF NOT EXISTS idx_audit_timestamp ON audit_log (timestamp, id)",
+    "CREATE INDEX IF NOT EXISTS idx_audit_user ON audit_log (user_id, timestamp, id)",
+]
+
+AUDIT_COLUMNS = {
+    "entity_type": "entityType",
+    "entity_id": "entityId",
+    "user_id": "userId",
+    "timestamp": "timestamp",
+}
+
+
+class SqliteDatabase:
+    """Shared SQLite connection in WAL mode, created and migrated on first use."""
+
+    def __init__(self, path: Path):
+        self.path = path
+        self._conn: sqlite3.Connection | None = None
+        # table -> versions produced by commits made through this connection
+        self.local_versions: Dict[str, LocalVersions] = {}
+        # (table, version) bumps of the open transaction, kept once it commits
+        self._pending_versions: List[Tuple[str, int]] = []
+
+    @property
+    def conn(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(
+                str(self.path), timeout=10, isolation_level=None, check_same_thread=False
+            )
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn = conn
+            self._create_schema()
+            self._migrate_from_json()
+        return self._conn
+
+    def _create_schema(self) -> None:
+        conn = self._conn
+        for table, (_, columns) in TABLES.items():
+            extra = "".join(f", {col} TEXT" for col in columns)
+            conn.execute(
+                f"CREATE TABLE IF NOT EXISTS {table} ("
+                "seq INTEGER PRIMARY KEY AUTOINCREMENT, "
+                f"id TEXT NOT NULL UNIQUE, data TEXT NOT NULL{extra})"
+            )
+        extra = "".join(f", {col} TEXT" for col in AUDIT_COLUMNS)
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS audit_log ("
+            "seq INTEGER PRIMARY KEY AUTOINCREMENT, "
+            f"id TEXT NOT NULL, data TEXT NOT NULL{extra})"
+        )
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value INTEGER NOT NULL)"
+        )
+        for statement in INDEXES:
+            conn.execute(statement)
+
+    def _migrate_from_json(self) -> None:
+        """One-shot import of the existing data/*.json files."""
+        # Imported lazily to avoid a circular import at module load time
+        from app.services.file_storage import AuditLogStorage
+
+        conn = self._conn
+        with self.transaction():
+            for table, (filename, columns) in TABLES.items():
+                if self._is_migrated(table):
+                    continue
+                try:
+                    records = json.loads((DATA_DIR / filename).read_text(encoding="utf-8"))
+                except (FileNotFoundError, json.JSONDecodeError) as e:
+                    print(f"Skipping migration of {filename}: {e}")
+                    records = []
+                for record in records:
+                    upsert_row(conn, table, columns, record)
+                self._mark_migrated(table)
+
+            if not self._is_migrated("audit_log"):
+                legacy = AuditLogStorage("audit-log", legacy_filename="audit-log.json")
+                for entry in legacy.iter_entries():
+                    insert_audit_row(conn, entry)
+                self._mark_migrated("audit_log")
+
+    def _is_migrated(self, table: str) -> bool:
+        row = self._conn.execute(
+            "SELECT value FROM meta WHERE key = ?", (f"migrated:{table}",)
+        ).fetchone()
+        return row is not None
+
+    def _mark_migrated(self, table: str) -> None:
+        self._conn.execute(
+            "INSERT OR REPLACE INTO meta (key, value) VALUES (?, 1)", (f"migrated:{table}",)
+        )
+
+    def transaction(self) -> "_Transaction":
+        return _Transaction(self)
+
+    def version(self, table: str) -> int:
+        row = self.conn.execute(
+            "SELECT value FROM meta WHERE key = ?", (f"version:{table}",)
+        ).fetchone()
+        return row[0] if row else 0
+
+    def commit_unit_of_work(self, uow: Any) -> None:
+        """Resolve a unit of work and apply its changes and audit entries in one transaction."""
+        with self.transaction() as conn:
+
+            def current(storage: Any, record_id: str) -> Dict[str, Any] | None:
+                row = conn.execute(
+                    f"SELECT data FROM {storage.table} WHERE id = ?", (record_id,)
+                ).fetchone()
+                return json.loads(row[0]) if row else None
+
+            changes, audit_entries = uow.resolve(current)
+            for storage, records in changes.items():
+                for record_id, record in records.items():
+                    if record is None:
+                        conn.execute(f"DELETE FROM {storage.table} WHERE id = ?", (record_id,))
+                    else:
+                        upsert_row(conn, storage.table, storage.columns, record)
+                self.bump_version(storage.table)
+            for entry in audit_entries:
+                insert_audit_row(conn, entry)
+            if audit_entries:
+                self.bump_version("audit_log")
+
+    def bump_version(self, table: str) -> None:
+        self.conn.execute(
+            "INSERT INTO meta (key, value) VALUES (?, 1) "
+            "ON CONFLICT(key) DO UPDATE SET value = value + 1",
+            (f"version:{table}",),
+        )
+        self._pending_versions.append((table, self.version(table)))
+
+    def _end_transaction(self, committed: bool) -> None:
+        if committed:
+            for table, version in self._pending_versions:
+                self.local_versions.setdefault(table, LocalVersions()).add(version)
+        self._pending_versions = []
+
+
+class _Transaction:
+    """BEGIN IMMEDIATE ... COMMIT/ROLLBACK around a block of statements."""
+
+    def __init__(self, db: SqliteDatabase):
+        self.db = db
+        self.conn = db.conn
+
+    def __enter__(self) -> sqlite3.Connection:
+        self.conn.execute("BEGIN IMMEDIATE")
+        return self.conn
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.conn.execute("COMMIT" if exc_type is None else "ROLLBACK")
+        self.db._end_transaction(exc_type is None)
+
+
+def _dumps(record: Any) -> str:
+    return json.dumps(record, default=str, separators=(",", ":"))
+
+
+def upsert_row(
+    conn: sqlite3.Connection, table: str, columns: Dict[str, str], record: Dict[str, Any]
+) -> None:
+    """Insert or replace one record, keeping its original position on update."""
+    names = ["id", "data", *columns]
+    values = [record["id"], _dumps(record), *(record.get(f) for f in columns.values())]
+    updates = ", ".join(f"{n} = excluded.{n}" for n in names[1:])
+    conn.execute(
+        f"INSERT INTO {table} ({', '.join(names)}) "
+        f"VALUES ({', '.join('?' for _ in names)}) "
+        f"ON CONFLICT(id) DO UPDATE SET {updates}",
+        values,
+    )
+
+
+def insert_audit_row(conn: sqlite3.Connection, entry: Dict[str, Any]) -> None:
+    names = ["id", "data", *AUDIT_COLUMNS]
+    values = [entry.get("id"), _dumps(entry), *(entry.get(f) for f in AUDIT_COLUMNS.values())]
+    conn.execute(
+        f"INSERT INTO audit_log ({', '.join(names)}) "
+        f"VALUES ({', '.join('?' for _ in names)})",
+        values,
+    )
+
+
+class SqliteStorage:
+    """SQLite-backed storage with the same interface as JsonStorage."""
+
+    def __init__(self, db: SqliteDatabase, table: str):
+        self.db = db
+        self.table = table
+        self.columns = TABLES[table][1]
+        self._lock = asyncio.Lock()
+
+    @property
+    def version(self) -> int:
+        return self.db.version(self.table)
+
+    async def current_version(self) -> int:
+        return self.version
+
+    @property
+    def local_versions(self) -> LocalVersions:
+        """Versions produced by writes made in this process."""
+        return self.db.local_versions.setdefault(self.table, LocalVersions())
+
+    async def read(self, default: List[Any] | None = None) -> List[Any]:
+        """Read all records in insertion order."""
+        rows = self.db.conn.execute(f"SELECT data FROM {self.table} ORDER BY seq").fetchall()
+        if not rows and default is not None:
+            return default
+        return [json.loads(row[0]) for row in rows]
+
+    async def snapshot(self, default: List[Any] | None = None) -> List[Any]:
+        """Read all records - rows are decoded fresh, so this is the same as read()."""
+        return await self.read(default)
+
+    async def write(self, data: List[Any]) -> None:
+        """Replace the whole collection."""
+        async with self._lock:
+            with self.db.transaction() as conn:
+                conn.execute(f"DELETE FROM {self.table}")
+                for record in data:
+                    upsert_row(conn, self.table, self.columns, record)
+                self.db.bump_version(self.table)
+
+    async def get_by_id(self, record_id: str) -> Dict[str, Any] | None:
+        """Get the record with the given id, or None."""
+        row = self.db.conn.execute(
+            f"SELECT data FROM {self.table} WHERE id = ?", (record_id,)
+        ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    async def upsert(self, record: Dict[str, Any]) -> None:
+        """Insert the record, or replace the existing one with the same id."""
+        async with self._lock:
+            with self.db.transaction() as conn:
+                upsert_row(conn, self.table, self.columns, record)
+                self.db.bump_version(self.table)
+
+    async def range_query(
+        self,
+        index: str,
+        key: Any = None,
+        start: str | None = None,
+        end: str | None = None,
+        descending: bool = False,
+        after: Tuple[str, str] | None = None,
+    ) -> Iterator[Dict[str, Any]]:
+        """Lazily iterate records of an index group with start <= sort value < end.
+
+        ``after`` resumes an ascending scan after a (sort value, id) position.
+        """
+        key_columns, sort_column, sparse = RANGE_INDEXES[self.table][index]
+        clauses: List[str] = [f"{sort_column} <> ''"] if sparse else []
+        params: List[Any] = []
+        if key_columns:
+            clauses.append("(" + " OR ".join(f"{col} = ?" for col in key_columns) + ")")
+            params.extend(key for _ in key_columns)
+        if start is not None:
+            clauses.append(f"{sort_column} >= ?")
+            params.append(start)
+        if end is not None:
+            clauses.append(f"{sort_column} < ?")
+            params.append(end)
+        if after is not None:
+            clauses.append(f"({sort_column}, id) > (?, ?)")
+            params.extend(after)
+        where = f"WHERE {' AND '.join(clauses)} " if clauses else ""
+        order = "DESC" if descending else "ASC"
+        cursor = self.db.conn.execute(
+            f"SELECT data FROM {self.table} {where}ORDER BY {sort_column} {order}, id {order}",
+            params,
+        )
+        return (json.loads(row[0]) for row in cursor)
+
+    async def update_by_id(
+        self, record_id: str, updater: Callable[[Dict[str, Any]], Dict[str, Any]]
+    ) -> Dict[str, Any] | None:
+        """Replace a record with ``updater(record)``, returning the new record (or None if missing)."""
+        async with self._lock:
+            with self.db.transaction() as conn:
+                row = conn.execute(
+                    f"SELECT data FROM {self.table} WHERE id = ?", (record_id,)
+                ).fetchone()
+                if row is None:
+                    return None
+                updated = updater(json.loads(row[0]))
+                upsert_row(conn, self.table, self.columns, updated)
+                self.db.bump_version(self.table)
+                return updated
+
+    async def delete_by_id(self, record_id: str) -> Dict[str, Any] | None:
+        """Delete the record with the given id, returning it (or None if missing)."""
+        async with self._lock:
+            with self.db.transaction() as conn:
+                row = conn.execute(
+                    f"SELECT data FROM {self.table} WHERE id = ?", (record_id,)
+                ).fetchone()
+                if row is None:
+                    return None
+                conn.execute(f"DELETE FROM {self.table} WHERE id = ?", (record_id,))
+                self.db.bump_version(self.table)
+                return json.loads(row[0])
+
+
+class SqliteAuditLogStorage:
+    """Append-only audit log in the audit_log table."""
+
+    def __init__(self, db: SqliteDatabase):
+        self.db = db
+
+    async def read(self, default: List[Any] | None = None) -> List[Any]:
+        """Read all entries in append order."""
+        rows = self.db.conn.execute("SELECT data FROM audit_log ORDER BY seq").fetchall()
+        if not rows and default is not None:
+            return default
+        return [json.loads(row[0]) for row in rows]
+
+    @staticmethod
+    def _filters(
+        entity_type: str | None,
+        entity_id: str | None,
+        user_id: str | None,
+        start: str | None,
+        end: str | None,
+    ) -> Tuple[List[str], List[Any]]:
+        clauses: List[str] = []
+        params: List[Any] = []
+        for column, value in (
+            ("entity_type", entity_type),
+            ("entity_id", entity_id),
+            ("user_id", user_id),
+        ):
+            if value:
+                clauses.append(f"{column} = ?")
+                params.append(value)
+        if start:
+            clauses.append("timestamp >= ?")
+            params.append(start)
+        if end:
+            clauses.append("timestamp < ?")
+            params.append(end)
+        return clauses, params
+
+    async def query(
+        self,
+        entity_type: str | None = None,
+        entity_id: str | None = None,
+        user_id: str | None = None,
+        start: str | None = None,
+        end: str | None = None,
+        before: Tuple[str, str] | None = None,
+        offset: int = 0,
+        limit: int = 50,
+    ) -> Tuple[List[Dict[str, Any]], int, Tuple[str, str] | None]:
+        """Newest-first entries matching the filters - see AuditLogStorage.query."""
+        clauses, params = self._filters(entity_type, entity_id, user_id, start, end)
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        conn = self.db.conn
+        total = conn.execute(f"SELECT COUNT(*) FROM audit_log {where}", params).fetchone()[0]
+
+        if before:
+            clauses.append("(timestamp, id) < (?, ?)")
+            params.extend(before)
+            where = f"WHERE {' AND '.join(clauses)}"
+        rows = conn.execute(
+            f"SELECT data, timestamp, id FROM audit_log {where} "
+            "ORDER BY timestamp DESC, id DESC LIMIT ? OFFSET ?",
+            [*params, limit + 1, offset],
+        ).fetchall()
+
+        page = rows[:limit]
+        next_cursor = (page[-1][1], page[-1][2]) if len(rows) > limit else None
+        return [json.loads(row[0]) for row in page], total, next_cursor
+
+    async def scan(
+        self,
+        entity_type: str | None = None,
+        entity_id: str | None = None,
+        user_id: str | None = None,
+        start: str | None = None,
+        end: str | None = None,
+        after: Tuple[str, str] | None = None,
+        limit: int = 500,
+    ) -> List[Dict[str, Any]]:
+        """Oldest-first entries matching the filters - see AuditLogStorage.scan."""
+        clauses, params = self._filters(entity_type, entity_id, user_id, start, end)
+        if after:
+            clauses.append("(timestamp, id) > (?, ?)")
+            params.extend(after)
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        rows = self.db.conn.execute(
+            f"SELECT data FROM audit_log {where} ORDER BY timestamp, id LIMIT ?",
+            [*params, limit],
+        ).fetchall()
+        return [json.loads(row[0]) for row in rows]
+
+    async def end_position(self) -> str:
+        """Position of the end of the log - see AuditLogStorage.end_position."""
+        seq = self.db.conn.execute("SELECT COALESCE(MAX(seq), 0) FROM audit_log").fetchone()[0]
+        return f"{seq:012d}"
+
+    async def tail(
+        self, after: str, limit: int = 500
+    ) -> Tuple[List[Tuple[str, Dict[str, Any]]], str]:
+        """Entries appended after a position - see AuditLogStorage.tail.
+
+        Positions are the rows' seq, assigned on insert; writers take turns,
+        so it follows commit order across workers.
+        """
+        rows = self.db.conn.execute(
+            "SELECT seq, data FROM audit_log WHERE seq > ? ORDER BY seq LIMIT ?",
+            [int(after), limit],
+        ).fetchall()
+        found = [(f"{seq:012d}", json.loads(data)) for seq, data in rows]
+        return found, found[-1][0] if found else after
@@ -1,4 +1,6 @@
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Tuple
+
+import numpy as np
 
 from app.models.common import PropertyValue
 
@@ -9,65 +11,122 @@ def get_effective_volume(movement: Dict[str, Any]) -> float:
     return actual if actual is not None else movement["expectedVolume"]
 
 
-def calculate_blended_properties(
+# A tank's or movement's properties as two arrays over PropertyColumns:
+# values (NaN where there is no value) and which properties are listed
+PropertyVector = Tuple[np.ndarray, np.ndarray]
+
+
+class PropertyColumns:
+    """Assigns each property id a fixed column in property vectors.
+
+    Vectors built by the same instance line up column for column; a vector
+    built before a property got its column is padded when blended.
+    """
+
+    def __init__(self):
+        self.ids: List[str] = []
+        self._index: Dict[str, int] = {}
+        self._sorted: List[int] | None = None
+
+    def column(self, property_id: str) -> int:
+        column = self._index.get(property_id)
+        if column is None:
+            column = self._index[property_id] = len(self.ids)
+            self.ids.append(property_id)
+            self._sorted = None
+        return column
+
+    def vector(self, properties: List[Dict[str, Any]]) -> PropertyVector:
+        """Vector of ``{"propertyId", "value"}`` records."""
+        columns = [self.column(p["propertyId"]) for p in properties]
+        values = [np.nan] * len(self.ids)
+        listed = [False] * len(self.ids)
+        for column, p in zip(columns, properties):
+            values[column] = np.nan if p["value"] is None else p["value"]
+            listed[column] = True
+        return np.array(values, dtype=float), np.array(listed, dtype=bool)
+
+    def properties(self, vector: PropertyVector) -> List[Dict[str, Any]]:
+        """``{"propertyId", "value"}`` records of a vector, ordered by property id."""
+        if self._sorted is None:
+            self._sorted = sorted(range(len(self.ids)), key=self.ids.__getitem__)
+        values, listed = vector
+        values = values.tolist()
+        return [
+            {"propertyId": self.ids[c], "value": None if values[c] != values[c] else values[c]}
+            for c in self._sorted
+            if c < len(listed) and listed[c]
+        ]
+
+
+def _fit(vector: PropertyVector, width: int) -> PropertyVector:
+    values, listed = vector
+    if len(values) == width:
+        return vector
+    pad = width - len(values)
+    return np.pad(values, (0, pad), constant_values=np.nan), np.pad(listed, (0, pad))
+
+
+def blend_property_vectors(
     tank_volume: float,
-    tank_properties: List[PropertyValue],
+    tank_properties: PropertyVector,
     added_volume: float,
-    added_properties: List[PropertyValue],
-) -> List[PropertyValue]:
-    """Calculate volume-weighted average properties when blending oils."""
+    added_properties: PropertyVector,
+) -> PropertyVector:
+    """Volume-weighted blend of two property vectors, rounded to 3 decimals.
+
+    A value counts only if its side has volume; a property no side has a
+    counting value for stays listed without a value.
+    """
     total_volume = tank_volume + added_volume
 
     if total_volume == 0:
-        return added_properties if added_properties else tank_properties
-
-    # Create maps for quick lookup
-    tank_props_map: Dict[str, float | None] = {
-        p.propertyId: p.value for p in tank_properties
-    }
-    added_props_map: Dict[str, float | None] = {
-        p.propertyId: p.value for p in added_properties
-    }
-
-    # Get all unique property IDs
-    all_property_ids = set(tank_props_map.keys()) | set(added_props_map.keys())
-
-    blended_properties: List[PropertyValue] = []
-
-    for prop_id in all_property_ids:
-        tank_value = tank_props_map.get(prop_id)
-        added_value = added_props_map.get(prop_id)
-
-        blended_value: float | None = None
-
-        if tank_value is not None and added_value is not None:
-            # Both have values - weighted average
-            blended_value = (
-                tank_volume * tank_value + added_volume * added_value
-            ) / total_volume
-        elif tank_value is not None and tank_volume > 0:
-            # Only tank has value
-            blended_value = (tank_volume * tank_value) / total_volume
-        elif added_value is not None and added_volume > 0:
-            # Only added has value
-            blended_value = (added_volume * added_value) / total_volume
-
-        blended_properties.append(
-            PropertyValue(
-                propertyId=prop_id,
-                value=round(blended_value, 3) if blended_value is not None else None,
-            )
+        return added_properties if added_properties[1].any() else tank_properties
+
+    width = max(len(tank_properties[0]), len(added_properties[0]))
+    tank_values, tank_listed = _fit(tank_properties, width)
+    added_values, added_listed = _fit(added_properties, width)
+
+    # NaN marks a value that doesn't count: missing, or from a side with no volume
+    if tank_volume <= 0:
+        blended = added_volume * added_values
+    elif added_volume <= 0:
+        blended = tank_volume * tank_values
+    else:
+        tank_part = tank_volume * tank_values
+        added_part = added_volume * added_values
+        blended = np.where(
+            np.isnan(tank_part),
+            added_part,
+            np.where(np.isnan(added_part), tank_part, tank_part + added_part),
         )
+    return np.round(blended / total_volume, 3), tank_listed | added_listed
+
 
-    return blended_properties
+def calculate_blended_properties(
+    tank_volume: float,
+    tank_properties: List[PropertyValue],
+    added_volume: float,
+    added_properties: List[PropertyValue],
+) -> List[PropertyValue]:
+    """Calculate volume-weighted average properties when blending oils."""
+    columns = PropertyColumns()
+    blended = blend_property_vectors(
+        tank_volume,
+        columns.vector([p.model_dump() for p in tank_properties]),
+        added_volume,
+        columns.vector([p.model_dump() for p in added_properties]),
+    )
+    return [PropertyValue(**p) for p in columns.properties(blended)]
 
 
 def calculate_projected_state(
     tank: Dict[str, Any], scheduled_movements: List[Dict[str, Any]]
 ) -> Dict[str, Any]:
     """Calculate projected tank state based on scheduled movements."""
+    columns = PropertyColumns()
     projected_volume = tank["currentVolume"]
-    projected_properties = [PropertyValue(**p) for p in tank["properties"]]
+    projected_properties = columns.vector(tank["properties"])
 
     # Sort movements by scheduled date
     sorted_movements = sorted(scheduled_movements, key=lambda m: m["scheduledDate"])
@@ -75,11 +134,13 @@ def calculate_projected_state(
     for movement in sorted_movements:
         volume = get_effective_volume(movement)
         movement_type = movement["type"]
-        movement_props = [PropertyValue(**p) for p in movement.get("properties", [])]
 
         if movement_type == "receive" and movement.get("destinationTankId") == tank["id"]:
-            projected_properties = calculate_blended_properties(
-                projected_volume, projected_properties, volume, movement_props
+            projected_properties = blend_property_vectors(
+                projected_volume,
+                projected_properties,
+                volume,
+                columns.vector(movement.get("properties", [])),
             )
             projected_volume += volume
 
@@ -90,14 +151,17 @@ def calculate_projected_state(
             if movement.get("sourceTankId") == tank["id"]:
                 projected_volume = max(0, projected_volume - volume)
             elif movement.get("destinationTankId") == tank["id"]:
-                projected_properties = calculate_blended_properties(
-                    projected_volume, projected_properties, volume, movement_props
+                projected_properties = blend_property_vectors(
+                    projected_volume,
+                    projected_properties,
+                    volume,
+                    columns.vector(movement.get("properties", [])),
                 )
                 projected_volume += volume
 
     return {
         "volume": round(projected_volume, 3),
-        "properties": projected_properties,
+        "properties": [PropertyValue(**p) for p in columns.properties(projected_properties)],
     }
 
 
@@ -0,0 +1,532 @@
+"""Event-sourced tank state.
+
+A tank's volume and properties are derived from its ledger: "set" events
+(tank created, volume/properties edited, reset from a measurement) and the
+completed movements touching the tank, ordered by (timestamp, id). Stored
+tank records hold the replayed state at the end of the ledger, and periodic
+snapshots let a rebuild or an as-of query replay only the tail after the
+nearest checkpoint.
+
+Tanks that existed before the ledger get an "opening" set event holding
+their state at the time it is first needed, before any other set event.
+History before a tank's first set event can't be replayed: a completed
+movement dated before an opening is folded into it, one dated before the
+tank was created has no effect, and corrections to such movements leave
+the tank as is.
+"""
+import uuid
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from app.models.common import AuditAction, AuditEntityType
+from app.services.file_storage import (
+    movements_storage,
+    tanks_storage,
+    tank_events_storage,
+    tank_snapshots_storage,
+)
+from app.services.tank_calculations import (
+    PropertyColumns,
+    blend_property_vectors,
+    get_effective_volume,
+)
+from app.services.unit_of_work import StaleStateError, UnitOfWork, transaction
+
+# Persist a checkpoint every SNAPSHOT_INTERVAL replayed events per tank
+SNAPSHOT_INTERVAL = 50
+
+# Sorts after any timestamp sharing its prefix
+END_OF = "\uffff"
+
+Position = Tuple[str, str]
+State = Dict[str, Any]
+
+
+def get_utc_now() -> str:
+    """Get current UTC time in ISO format."""
+    return datetime.now(timezone.utc).isoformat().replace("+00:00", "Z")
+
+
+def movement_position(movement: Dict[str, Any]) -> Position:
+    """Ledger position of a completed movement."""
+    return (movement["date"], movement["id"])
+
+
+def event_position(event: Dict[str, Any]) -> Position:
+    """Ledger position of a set event or snapshot."""
+    return (event["timestamp"], event["id"])
+
+
+def movement_tank_ids(movement: Dict[str, Any]) -> List[str]:
+    """Tanks whose ledger contains a movement."""
+    return [t for t in (movement.get("sourceTankId"), movement.get("destinationTankId")) if t]
+
+
+def build_set_event(
+    tank_id: str, kind: str, timestamp: str, volume: float, properties: List[Dict[str, Any]]
+) -> Dict[str, Any]:
+    """A ledger event setting a tank's volume and properties outright."""
+    return {
+        "id": f"tev-{uuid.uuid4()}",
+        "tankId": tank_id,
+        "kind": kind,
+        "timestamp": timestamp,
+        "volume": volume,
+        "properties": properties,
+    }
+
+
+class Staged:
+    """Ledger changes staged in a unit of work that isn't committed yet.
+
+    ``movements`` maps movement id -> its completed version, or None for one
+    leaving the ledger (deleted or no longer completed); ``events`` holds
+    staged set events by id. Replays read the ledger through them.
+    """
+
+    def __init__(self, movements: Iterable[Dict[str, Any]] = ()):
+        self.movements: Dict[str, Optional[Dict[str, Any]]] = {m["id"]: m for m in movements}
+        self.events: Dict[str, Dict[str, Any]] = {}
+
+    def tank_movements(
+        self, tank_id: str, stored: Iterable[Dict[str, Any]]
+    ) -> Iterable[Dict[str, Any]]:
+        """Stored completed movements of a tank with the staged ones in their place."""
+        if not self.movements:
+            return stored
+        return [m for m in stored if m["id"] not in self.movements] + [
+            m for m in self.movements.values() if m is not None and tank_id in movement_tank_ids(m)
+        ]
+
+    def tank_events(
+        self, tank_id: str, stored: Iterable[Dict[str, Any]]
+    ) -> Iterable[Dict[str, Any]]:
+        """Stored set events of a tank with the staged ones in their place."""
+        if not self.events:
+            return stored
+        return [e for e in stored if e["id"] not in self.events] + [
+            e for e in self.events.values() if e["tankId"] == tank_id
+        ]
+
+
+async def _events(
+    tank_id: str, after: Optional[Position], before: Optional[Position], staged: Staged
+) -> List[Tuple[Position, Dict[str, Any]]]:
+    """Ledger entries of a tank with after < position < before, in order."""
+    start = after[0] if after else None
+    end = before[0] + "\0" if before else None
+    set_events = staged.tank_events(
+        tank_id, await tank_events_storage.range_query("tank", tank_id, start=start, end=end)
+    )
+    movements = staged.tank_movements(
+        tank_id, await movements_storage.range_query("tankDate", tank_id, start=start, end=end)
+    )
+    entries = [(event_position(e), e) for e in set_events] + [
+        (movement_position(m), m) for m in movements
+    ]
+    entries.sort(key=lambda entry: entry[0])
+    return [
+        (position, entry)
+        for position, entry in entries
+        if (after is None or position > after) and (before is None or position < before)
+    ]
+
+
+async def _first_event(tank_id: str) -> Optional[Dict[str, Any]]:
+    return next(iter(await tank_events_storage.range_query("tank", tank_id)), None)
+
+
+class _Replay:
+    """Replays tank ledgers, reusing snapshots and collecting new ones.
+
+    ``stale`` maps tank id -> position from which existing snapshots must
+    not be trusted (they are being invalidated by the caller), and
+    ``staged`` the ledger changes not committed yet. While
+    replaying, properties are kept as vectors over one set of columns, so
+    blends don't build property records; states handed out use records.
+    """
+
+    def __init__(
+        self, stale: Optional[Dict[str, Position]] = None, staged: Optional[Staged] = None
+    ):
+        self.stale = stale or {}
+        self.staged = staged or Staged()
+        self.snapshots: Dict[str, Dict[str, Any]] = {}
+        self.columns = PropertyColumns()
+        self._memo: Dict[Tuple[str, Optional[Position]], Optional[State]] = {}
+
+    async def _snapshot_before(
+        self, tank_id: str, before: Optional[Position]
+    ) -> Optional[Dict[str, Any]]:
+        end = before[0] + "\0" if before else None
+        stale = self.stale.get(tank_id)
+        for snapshot in await tank_snapshots_storage.range_query(
+            "tank", tank_id, end=end, descending=True
+        ):
+            position = tuple(snapshot["position"])
+            if (before is None or position < before) and (stale is None or position < stale):
+                return snapshot
+        return None
+
+    def _vector_state(self, record: Dict[str, Any]) -> State:
+        return {"volume": record["volume"], "properties": self.columns.vector(record["properties"])}
+
+    def _record_state(self, state: Optional[State]) -> Optional[State]:
+        if state is None:
+            return None
+        return {**state, "properties": self.columns.properties(state["properties"])}
+
+    async def state_before(self, tank_id: str, before: Optional[Position]) -> Optional[State]:
+        """State after every ledger entry positioned before ``before`` (None = all).
+
+        Returns None when the tank has no set event in that range.
+        """
+        return self._record_state(await self._state_before(tank_id, before))
+
+    async def _state_before(self, tank_id: str, before: Optional[Position]) -> Optional[State]:
+        key = (tank_id, before)
+        if key not in self._memo:
+            self._memo[key] = await self._replay(tank_id, before)
+        return self._memo[key]
+
+    async def _replay(self, tank_id: str, before: Optional[Position]) -> Optional[State]:
+        snapshot = await self._snapshot_before(tank_id, before)
+        state: Optional[State] = None
+        after: Optional[Position] = None
+        if snapshot is not None:
+            after = tuple(snapshot["position"])
+            state = {**self._vector_state(snapshot), "position": after}
+
+        replayed = 0
+        for position, entry in await _events(tank_id, after, before, self.staged):
+            if "tankId" in entry:
+                state = self._vector_state(entry)
+            elif state is not None:
+                state = await self._apply(state, entry, tank_id)
+            if state is None:
+                continue
+            state["position"] = position
+            replayed += 1
+            if replayed % SNAPSHOT_INTERVAL == 0:
+                self._record_snapshot(tank_id, state)
+        return state
+
+    async def apply_movement(
+        self, state: State, movement: Dict[str, Any], tank_id: str
+    ) -> State:
+        """Effect of a completed movement on one tank, as apply_movement_to_tanks does it."""
+        return self._record_state(await self._apply(self._vector_state(state), movement, tank_id))
+
+    async def _apply(self, state: State, movement: Dict[str, Any], tank_id: str) -> State:
+        volume = get_effective_volume(movement)
+        movement_type = movement["type"]
+        is_source = movement.get("sourceTankId") == tank_id
+
+        if movement_type in ("ship", "transfer") and is_source:
+            return {"volume": max(0, state["volume"] - volume), "properties": state["properties"]}
+        if movement_type == "receive":
+            properties = self.columns.vector(movement.get("properties", []))
+        elif movement_type == "transfer":
+            if movement.get("properties"):
+                properties = self.columns.vector(movement["properties"])
+            else:
+                # Transfers without measured properties carry the source's blend
+                source = await self._state_before(
+                    movement["sourceTankId"], movement_position(movement)
+                )
+                if source is None:
+                    source_tank = await tanks_storage.get_by_id(movement["sourceTankId"])
+                    properties = self.columns.vector(source_tank["properties"] if source_tank else [])
+                else:
+                    properties = source["properties"]
+        else:
+            return state
+        return {
+            "volume": state["volume"] + volume,
+            "properties": blend_property_vectors(
+                state["volume"], state["properties"], volume, properties
+            ),
+        }
+
+    def _record_snapshot(self, tank_id: str, state: State) -> None:
+        position = state["position"]
+        snapshot_id = f"snap-{tank_id}-{position[0]}-{position[1]}"
+        self.snapshots[snapshot_id] = {
+            "id": snapshot_id,
+            "tankId": tank_id,
+            "timestamp": position[0],
+            "position": list(position),
+            "volume": state["volume"],
+            "properties": self.columns.properties(state["properties"]),
+        }
+
+
+async def set_event_timestamp(tank_id: str, now: str) -> str:
+    """Timestamp for a set event recording a tank's current state.
+
+    Completed movements dated in the future are already part of that state,
+    so the event goes after them.
+    """
+    latest = next(
+        iter(await movements_storage.range_query("tankDate", tank_id, descending=True)), None
+    )
+    return max(now, latest["date"]) if latest else now
+
+
+def opening_event_id(tank_id: str) -> str:
+    """Id of the event opening the ledger of a tank that predates it."""
+    return f"open-{tank_id}"
+
+
+async def ensure_ledger(tank_ids: Iterable[str]) -> None:
+    """Give tanks that predate the ledger an opening event from their current state.
+
+    The event is created at commit time, from the tank as it is then and
+    only if it doesn't exist yet, under a fixed id; concurrent calls for
+    the same tank open its ledger once.
+    """
+    now = get_utc_now()
+    async with transaction() as uow:
+        for tank_id in dict.fromkeys(tank_ids):
+            if await _first_event(tank_id) is not None:
+                continue
+            timestamp = await set_event_timestamp(tank_id, now)
+            # The tank as it is when the event is created; resolved in
+            # staging order, so it is read first
+            current: Dict[str, Any] = {}
+
+            def read_tank(tank: Optional[Dict[str, Any]], current: Dict[str, Any] = current):
+                current["tank"] = tank
+                return tank
+
+            def open_ledger(
+                event: Optional[Dict[str, Any]],
+                tank_id: str = tank_id,
+                timestamp: str = timestamp,
+                current: Dict[str, Any] = current,
+            ) -> Optional[Dict[str, Any]]:
+                tank = current["tank"]
+                if event is not None or tank is None:
+                    return event
+                return {
+                    **build_set_event(
+                        tank_id, "opening", timestamp, tank["currentVolume"], tank["properties"]
+                    ),
+                    "id": opening_event_id(tank_id),
+                }
+
+            uow.update(tanks_storage, tank_id, read_tank)
+            uow.update(tank_events_storage, opening_event_id(tank_id), open_ledger)
+
+
+async def is_at_ledger_end(movement: Dict[str, Any]) -> bool:
+    """Whether a completed movement sorts after everything already in its tanks' ledgers.
+
+    Such a movement can be applied to the stored tank state directly;
+    anything else needs a rebuild.
+    """
+    position = movement_position(movement)
+    for tank_id in movement_tank_ids(movement):
+        last_event = next(
+            iter(await tank_events_storage.range_query("tank", tank_id, descending=True)), None
+        )
+        if last_event is not None and event_position(last_event) > position:
+            return False
+        last_movement = next(
+            iter(await movements_storage.range_query("tankDate", tank_id, descending=True)),
+            None,
+        )
+        if (
+            last_movement is not None
+            and last_movement["id"] != movement["id"]
+            and movement_position(last_movement) > position
+        ):
+            return False
+    return True
+
+
+def _property_map(properties: List[Dict[str, Any]]) -> Dict[str, Any]:
+    return {p["propertyId"]: p["value"] for p in properties}
+
+
+async def _with_dependents(changed: Dict[str, Position], staged: Staged) -> Dict[str, Position]:
+    """Add tanks whose history depends on a changed one through property-less transfers."""
+    affected: Dict[str, Position] = {}
+    pending = list(changed.items())
+    while pending:
+        tank_id, position = pending.pop()
+        if tank_id in affected and affected[tank_id] <= position:
+            continue
+        affected[tank_id] = position
+        for movement in staged.tank_movements(
+            tank_id, await movements_storage.range_query("tankDate", tank_id, start=position[0])
+        ):
+            if (
+                movement["type"] == "transfer"
+                and movement.get("sourceTankId") == tank_id
+                and movement.get("destinationTankId")
+                and not movement.get("properties")
+                and movement_position(movement) >= position
+            ):
+                pending.append((movement["destinationTankId"], movement_position(movement)))
+    return affected
+
+
+async def rebuild_tanks(
+    changed: Dict[str, Position], uow: UnitOfWork, staged: Staged
+) -> List[str]:
+    """Replay tanks whose ledger changed at or after the given positions.
+
+    Stages, in ``uow``, dropping the snapshots from those positions on and
+    replacing the stored tank records by the replayed state, with an audit
+    entry for each tank whose state changed. Returns the rebuilt tank ids.
+    The commit fails with StaleStateError if another one changed a tank
+    after it was replayed; stage the work with ``run_transaction``.
+    """
+    affected = await _with_dependents(changed, staged)
+    replay = _Replay(stale=affected, staged=staged)
+    now = get_utc_now()
+    # Read before their ledgers: a commit landing during the replay changes
+    # a tank after this, so the replayed state is never checked against a
+    # tank that already includes entries the replay missed
+    expected = {tank_id: await uow.get_by_id(tanks_storage, tank_id) for tank_id in affected}
+
+    for tank_id, position in affected.items():
+        for snapshot in await tank_snapshots_storage.range_query(
+            "tank", tank_id, start=position[0]
+        ):
+            if tuple(snapshot["position"]) >= position:
+                uow.delete(tank_snapshots_storage, snapshot["id"])
+
+        state = await replay.state_before(tank_id, None)
+        if state is None:
+            continue
+
+        def apply_state(
+            tank: Optional[Dict[str, Any]],
+            state: State = state,
+            expected: Optional[Dict[str, Any]] = expected[tank_id],
+            tank_id: str = tank_id,
+        ):
+            if tank != expected:
+                raise StaleStateError(f"Tank {tank_id} changed while its ledger was replayed")
+            if tank is None:
+                return None
+            if tank["currentVolume"] != state["volume"] or _property_map(
+                tank["properties"]
+            ) != _property_map(state["properties"]):
+                tank["currentVolume"] = state["volume"]
+                tank["properties"] = state["properties"]
+                tank["updatedAt"] = now
+            return tank
+
+        def log_rebuild(
+            old: Optional[Dict[str, Any]], new: Optional[Dict[str, Any]], tank_id: str = tank_id
+        ):
+            if old is not None and old != new:
+                uow.log_audit(
+                    AuditAction.update,
+                    AuditEntityType.tank,
+                    tank_id,
+                    "system",
+                    old,
+                    new,
+                    "Rebuilt from the tank's ledger",
+                )
+
+        uow.update(tanks_storage, tank_id, apply_state, log_rebuild)
+
+    for snapshot in replay.snapshots.values():
+        uow.upsert(tank_snapshots_storage, snapshot)
+
+    return list(affected)
+
+
+async def reconcile_movements(
+    changes: List[Tuple[Optional[Dict[str, Any]], Optional[Dict[str, Any]]]],
+    uow: UnitOfWork,
+    staged_movements: Iterable[Dict[str, Any]] = (),
+) -> List[str]:
+    """Bring tank state in line after completed movements were added out of
+    order, corrected or deleted, with a single rebuild.
+
+    ``changes`` holds (old, new) pairs of the completed versions of each
+    movement, None where it wasn't completed. The changes are staged in
+    ``uow`` but not committed yet, and the rebuild is staged there too, so
+    the movements and their tanks commit together. ``staged_movements`` are
+    other completed movements already staged in it. Returns the ids of
+    tanks whose state was rebuilt.
+    """
+    staged = Staged(staged_movements)
+    for old, new in changes:
+        staged.movements[(new or old)["id"]] = new
+    replay = _Replay(staged=staged)
+    changed: Dict[str, Position] = {}
+    openings: Dict[str, Optional[Dict[str, Any]]] = {}
+    # Opening events as read, before any movement was folded into them
+    read: Dict[str, Dict[str, Any]] = {}
+    folded: Dict[str, Dict[str, Any]] = {}
+
+    async def note(movement: Dict[str, Any], fold: bool) -> None:
+        position = movement_position(movement)
+        for tank_id in movement_tank_ids(movement):
+            if tank_id not in openings:
+                openings[tank_id] = await _first_event(tank_id)
+                if openings[tank_id] is not None:
+                    read[tank_id] = openings[tank_id]
+            opening = openings[tank_id]
+            if opening is None:
+                continue
+            if position >= event_position(opening):
+                changed[tank_id] = min(changed.get(tank_id, position), position)
+            elif fold and opening["kind"] == "opening":
+                # Predates the ledger: fold the movement into the opening state
+                state = await replay.apply_movement(
+                    {"volume": opening["volume"], "properties": opening["properties"]},
+                    movement,
+                    tank_id,
+                )
+                opening = {**opening, "volume": state["volume"], "properties": state["properties"]}
+                openings[tank_id] = folded[tank_id] = opening
+                changed[tank_id] = event_position(opening)
+
+    for old, new in changes:
+        if old is not None:
+            await note(old, fold=False)
+        if new is not None:
+            await note(new, fold=old is None)
+
+    for tank_id, opening in folded.items():
+
+        def fold(
+            event: Optional[Dict[str, Any]],
+            expected: Dict[str, Any] = read[tank_id],
+            opening: Dict[str, Any] = opening,
+        ) -> Dict[str, Any]:
+            if event != expected:
+                raise StaleStateError(f"Ledger opening {opening['id']} changed concurrently")
+            return opening
+
+        uow.update(tank_events_storage, opening["id"], fold)
+        staged.events[opening["id"]] = opening
+    if changed:
+        return await rebuild_tanks(changed, uow, staged)
+    return []
+
+
+async def tank_state_as_of(tank_id: str, as_of: str) -> Optional[State]:
+    """Replayed state of a tank including every ledger entry at or before ``as_of``.
+
+    Returns None when the ledger has no state for the tank at that time.
+    """
+    await ensure_ledger([tank_id])
+    replay = _Replay()
+    state = await replay.state_before(tank_id, (as_of + END_OF, ""))
+    if replay.snapshots:
+        try:
+            async with transaction() as uow:
+                for snapshot in replay.snapshots.values():
+                    uow.upsert(tank_snapshots_storage, snapshot)
+        except Exception as e:
+            print(f"Failed to save tank snapshots: {e}")
+    return state
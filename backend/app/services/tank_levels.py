@@ -0,0 +1,125 @@
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Tuple
+
+import numpy as np
+
+from app.services.file_storage import movements_storage
+from app.services.tank_calculations import get_volume_change
+
+
+def _epoch_ms(timestamp: str) -> float:
+    """Milliseconds since the epoch for an ISO date or timestamp (UTC if naive)."""
+    parsed = datetime.fromisoformat(timestamp.replace("Z", "+00:00"))
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.timestamp() * 1000
+
+
+def lttb(x: np.ndarray, y: np.ndarray, threshold: int) -> np.ndarray:
+    """Indices of the points kept by Largest-Triangle-Three-Buckets downsampling.
+
+    Keeps the first and last points, then from each of ``threshold - 2``
+    buckets the point forming the largest triangle with the previously kept
+    point and the average of the next bucket.
+    """
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+
+    edges = np.linspace(1, n - 1, threshold - 1).astype(int)
+    kept = np.empty(threshold, dtype=np.intp)
+    kept[0] = 0
+    a = 0
+    for i in range(threshold - 2):
+        start, end = edges[i], edges[i + 1]
+        next_end = edges[i + 2] if i + 2 < len(edges) else n
+        avg_x = x[end:next_end].mean()
+        avg_y = y[end:next_end].mean()
+        area = np.abs(
+            (x[a] - avg_x) * (y[start:end] - y[a]) - (x[a] - x[start:end]) * (avg_y - y[a])
+        )
+        a = start + int(np.argmax(area))
+        kept[i + 1] = a
+    kept[-1] = n - 1
+    return kept
+
+
+class _LevelSeries:
+    """A tank's volume after each movement that changes it.
+
+    Completed movements (by date) lead up to the current volume; scheduled
+    ones (by scheduledDate) project forward from it. Volumes are prefix sums
+    of ``get_volume_change``, shown floored at zero like the level chart.
+    """
+
+    def __init__(self, tank: Dict[str, Any], movements: List[Dict[str, Any]]):
+        completed: List[Tuple[str, float]] = []
+        scheduled: List[Tuple[str, float]] = []
+        for movement in movements:
+            change = get_volume_change(movement, tank["id"])
+            if not change:
+                continue
+            if movement.get("date") is not None:
+                completed.append((movement["date"], change))
+            else:
+                scheduled.append((movement["scheduledDate"], change))
+        completed.sort(key=lambda point: point[0])
+
+        current = tank["currentVolume"]
+        history = np.cumsum([change for _, change in completed], dtype=float)
+        projection = np.cumsum([change for _, change in scheduled], dtype=float)
+        if len(history):
+            history += current - history[-1]
+        projection += current
+
+        self.timestamps = [t for t, _ in completed] + [t for t, _ in scheduled]
+        self.volumes = np.maximum(np.concatenate((history, projection)), 0)
+        self.projected = np.arange(len(self.timestamps)) >= len(completed)
+
+        # Overdue scheduled movements still plot after the last completed one
+        times = np.array([_epoch_ms(t) for t in self.timestamps], dtype=float)
+        if len(completed) and len(scheduled):
+            times[len(completed) :] = np.maximum(times[len(completed) :], times[len(completed) - 1])
+        self.times = np.maximum.accumulate(times) if len(times) else times
+
+
+# tank id -> ((movements version, current volume), series)
+_series_cache: Dict[str, Tuple[Tuple[int, float], _LevelSeries]] = {}
+
+
+async def _level_series(tank: Dict[str, Any]) -> _LevelSeries:
+    """The tank's level series, rebuilt only when movements or its volume changed."""
+    key = (await movements_storage.current_version(), tank["currentVolume"])
+    cached = _series_cache.get(tank["id"])
+    if cached is not None and cached[0] == key:
+        return cached[1]
+
+    movements = await movements_storage.range_query("tank", tank["id"])
+    series = _LevelSeries(tank, list(movements))
+    _series_cache[tank["id"]] = (key, series)
+    return series
+
+
+async def get_tank_levels(
+    tank: Dict[str, Any], start: str | None, end: str | None, points: int
+) -> Dict[str, Any]:
+    """Level series points with start <= time < end, downsampled to ``points``.
+
+    Raises ValueError for an unparseable ``start`` or ``end``.
+    """
+    series = await _level_series(tank)
+    lo = int(np.searchsorted(series.times, _epoch_ms(start))) if start else 0
+    hi = int(np.searchsorted(series.times, _epoch_ms(end))) if end else len(series.times)
+    hi = max(lo, hi)
+
+    indices = lo + lttb(series.times[lo:hi], series.volumes[lo:hi], points)
+    volumes = series.volumes[indices].round(3).tolist()
+    projected = series.projected[indices].tolist()
+    return {
+        "tankId": tank["id"],
+        "total": hi - lo,
+        "points": [
+            {"timestamp": series.timestamps[i], "volume": v, "projected": p}
+            for i, v, p in zip(indices.tolist(), volumes, projected)
+        ],
+    }
@@ -0,0 +1,197 @@
+import asyncio
+import random
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional, Tuple, TypeVar
+
+from app.models.common import AuditAction, AuditEntityType
+from app.services.audit_service import build_audit_entry
+from app.services.change_feed import change_feed
+from app.services.file_storage import copy_json, commit_changes
+
+Record = Dict[str, Any]
+Updater = Callable[[Optional[Record]], Optional[Record]]
+Changes = Dict[Any, Dict[str, Optional[Record]]]
+T = TypeVar("T")
+
+# Times a unit of work is staged before giving up on a conflict, and the
+# base of the randomized, doubling wait (seconds) before staging it again
+TRANSACTION_ATTEMPTS = 8
+TRANSACTION_BACKOFF = 0.005
+
+
+class StaleStateError(Exception):
+    """Raised by an updater whose change was planned from a record that
+    another commit has changed since; the unit of work is not committed."""
+
+
+class _Update:
+    """A staged change computed from the record's state at commit time."""
+
+    def __init__(
+        self,
+        updater: Updater,
+        on_applied: Optional[Callable[[Optional[Record], Optional[Record]], None]],
+    ):
+        self.updater = updater
+        self.on_applied = on_applied
+
+
+class UnitOfWork:
+    """Stages record changes across storages and commits them together.
+
+    Reads through the unit of work see its own staged changes. Nothing is
+    written until ``commit()``, which applies every staged upsert, delete,
+    update and audit entry in a single atomic write per backend.
+    """
+
+    def __init__(self):
+        self._ops: List[Tuple[Any, str, Any]] = []
+        self._audit_entries: List[Record] = []
+        self.results: Changes = {}
+        # (storage, id) -> record with the staged changes read so far applied
+        self._working: Dict[Tuple[Any, str], Optional[Record]] = {}
+        # (storage, id) -> updates staged since its working copy was brought up to date
+        self._unapplied: Dict[Tuple[Any, str], List[_Update]] = {}
+
+    @property
+    def storages(self) -> List[Any]:
+        """Storages touched by staged changes, in first-use order."""
+        return list(dict.fromkeys(storage for storage, _, _ in self._ops))
+
+    async def get_by_id(self, storage: Any, record_id: str) -> Record | None:
+        """Get a copy of a record, including changes staged in this unit of work.
+
+        The record is kept as a working copy that later reads bring up to
+        date with only the updates staged since, so each updater runs once
+        here however often the record is read.
+        """
+        key = (storage, record_id)
+        if key in self._working:
+            record = self._working[key]
+        else:
+            record = await storage.get_by_id(record_id)
+        updates = self._unapplied.get(key, [])
+        for update in updates:
+            record = update.updater(copy_json(record))
+        self._working[key] = record
+        self._unapplied[key] = []
+        return copy_json(record)
+
+    def upsert(self, storage: Any, record: Record) -> None:
+        """Stage an insert or replace of a record."""
+        record = copy_json(record)
+        self._ops.append((storage, record["id"], record))
+        self._working[(storage, record["id"])] = copy_json(record)
+        self._unapplied[(storage, record["id"])] = []
+
+    def delete(self, storage: Any, record_id: str) -> None:
+        """Stage the deletion of a record."""
+        self._ops.append((storage, record_id, None))
+        self._working[(storage, record_id)] = None
+        self._unapplied[(storage, record_id)] = []
+
+    def update(
+        self,
+        storage: Any,
+        record_id: str,
+        updater: Updater,
+        on_applied: Optional[Callable[[Optional[Record], Optional[Record]], None]] = None,
+    ) -> None:
+        """Stage a change computed from the record as it is at commit time.
+
+        ``updater`` gets a copy of the current record (or None) and returns
+        the new record (or None to delete); exceptions it raises fail only
+        this unit of work. ``on_applied(old, new)`` runs right after, e.g. to
+        stage an audit entry describing the actual change.
+        """
+        update = _Update(updater, on_applied)
+        self._ops.append((storage, record_id, update))
+        self._unapplied.setdefault((storage, record_id), []).append(update)
+
+    def log_audit(
+        self,
+        action: AuditAction,
+        entity_type: AuditEntityType,
+        entity_id: str,
+        user_id: str,
+        old_data: Any,
+        new_data: Any,
+        description: Optional[str] = None,
+    ) -> None:
+        """Stage an audit entry to be written with the rest of the changes."""
+        self._audit_entries.append(
+            build_audit_entry(
+                action, entity_type, entity_id, user_id, old_data, new_data, description
+            )
+        )
+
+    def resolve(
+        self, current: Callable[[Any, str], Optional[Record]]
+    ) -> Tuple[Changes, List[Record]]:
+        """Turn staged operations into final records, given a current-state lookup.
+
+        Called by the storage backend while it holds the write locks.
+        """
+        changes: Changes = {}
+        for storage, record_id, op in self._ops:
+            resolved = changes.setdefault(storage, {})
+            if isinstance(op, _Update):
+                old = copy_json(
+                    resolved[record_id] if record_id in resolved else current(storage, record_id)
+                )
+                new = op.updater(copy_json(old))
+                resolved[record_id] = new
+                if op.on_applied is not None:
+                    op.on_applied(old, new)
+            else:
+                resolved[record_id] = op
+        self.results = changes
+        return changes, list(self._audit_entries)
+
+    def result(self, storage: Any, record_id: str) -> Record | None:
+        """Committed state of a record changed by this unit of work."""
+        return copy_json(self.results.get(storage, {}).get(record_id))
+
+    async def commit(self) -> None:
+        """Write all staged changes at once."""
+        if not self._ops and not self._audit_entries:
+            return
+        await commit_changes(self)
+        if self._audit_entries:
+            change_feed.notify()
+        self._ops = []
+        self._audit_entries = []
+        self._working = {}
+        self._unapplied = {}
+
+
+@asynccontextmanager
+async def transaction() -> AsyncIterator[UnitOfWork]:
+    """Run a block in a unit of work, committing only if the block succeeds."""
+    uow = UnitOfWork()
+    yield uow
+    await uow.commit()
+
+
+async def run_transaction(
+    stage: Callable[[UnitOfWork], Awaitable[T]], attempts: int = TRANSACTION_ATTEMPTS
+) -> Tuple[T, UnitOfWork]:
+    """Stage a unit of work with ``stage`` and commit it.
+
+    When the commit fails with StaleStateError, everything is staged again
+    in a fresh unit of work, from the records as they are now, after a
+    random wait so that conflicting requests don't collide again. Returns
+    what ``stage`` returned and the committed unit of work.
+    """
+    for attempt in range(attempts):
+        uow = UnitOfWork()
+        value = await stage(uow)
+        try:
+            await uow.commit()
+        except StaleStateError:
+            if attempt == attempts - 1:
+                raise
+            await asyncio.sleep(random.uniform(0, TRANSACTION_BACKOFF * 2**attempt))
+        else:
+            return value, uow
+    raise ValueError("attempts must be at least 1")
@@ -0,0 +1,53 @@
+import os
+import shutil
+import tempfile
+import uuid
+from pathlib import Path
+
+import httpx
+import pytest
+
+# Run against a scratch copy of the data, set up before the app is imported
+_data_dir = Path(tempfile.mkdtemp(prefix="tank-management-test-"))
+shutil.copytree(
+    Path(__file__).parent.parent.parent / "data",
+    _data_dir,
+    dirs_exist_ok=True,
+    ignore=shutil.ignore_patterns("extraction-cache", "*.lock", "*.db*"),
+)
+os.environ["DATA_DIR"] = str(_data_dir)
+
+
+@pytest.fixture
+def anyio_backend():
+    return "asyncio"
+
+
+@pytest.fixture
+async def client():
+    from app.main import app
+
+    async with httpx.AsyncClient(
+        transport=httpx.ASGITransport(app=app), base_url="http://test"
+    ) as client:
+        yield client
+
+
+@pytest.fixture
+async def make_tank(client):
+    """Create a tank holding the given volume and properties."""
+
+    async def make(volume: float, properties=()):
+        response = await client.post(
+            "/tanks",
+            json={
+                "name": f"Test tank {uuid.uuid4()}",
+                "location": "Test",
+                "currentVolume": volume,
+                "properties": list(properties),
+            },
+        )
+        assert response.status_code == 201, response.text
+        return response.json()
+
+    return make
@@ -0,0 +1,126 @@
+import json
+import random
+import uuid
+
+import pytest
+
+from app.routers import audit_log
+from app.services.file_storage import AuditLogStorage
+from app.services.sqlite_storage import SqliteAuditLogStorage, SqliteDatabase, insert_audit_row
+
+pytestmark = pytest.mark.anyio
+
+LIMIT = 7
+
+
+def make_entries():
+    rng = random.Random(8)
+    entries = [
+        {
+            "id": f"audit-{uuid.UUID(int=rng.getrandbits(128))}",
+            "action": "update",
+            "entityType": rng.choice(["tank", "movement", "property"]),
+            "entityId": rng.choice(["tank-001", "tank-002", "mov-001"]),
+            "userId": rng.choice(["system", "alice", "bob"]),
+            "timestamp": f"2024-01-01T00:{i // 60:02d}:{i % 60:02d}Z",
+            "changes": {"old": {}, "new": {}},
+            "description": None,
+        }
+        for i in range(80)
+    ]
+    # Entries are appended roughly, not exactly, in timestamp order
+    for i in range(0, len(entries) - 1, 3):
+        entries[i], entries[i + 1] = entries[i + 1], entries[i]
+    return entries
+
+
+ENTRIES = make_entries()
+
+
+@pytest.fixture(params=["json", "sqlite"])
+def storage(request, tmp_path, monkeypatch):
+    if request.param == "json":
+        storage = AuditLogStorage(f"audit-log-test-{uuid.uuid4()}")
+        storage.dirpath.mkdir(parents=True)
+        (storage.dirpath / "000001.jsonl").write_text(
+            "".join(json.dumps(entry) + "\n" for entry in ENTRIES), encoding="utf-8"
+        )
+    else:
+        database = SqliteDatabase(tmp_path / "audit.db")
+        with database.transaction() as conn:
+            conn.execute("DELETE FROM audit_log")
+            for entry in ENTRIES:
+                insert_audit_row(conn, entry)
+        storage = SqliteAuditLogStorage(database)
+    monkeypatch.setattr(audit_log, "audit_storage", storage)
+    return storage
+
+
+def old_page(entity_type=None, entity_id=None, page=1, limit=LIMIT):
+    """The response the endpoint gave before it had cursors or an index."""
+    entries = [
+        e
+        for e in ENTRIES
+        if (not entity_type or e["entityType"] == entity_type)
+        and (not entity_id or e["entityId"] == entity_id)
+    ]
+    entries.sort(key=lambda e: e.get("timestamp", ""), reverse=True)
+    total = len(entries)
+    total_pages = (total + limit - 1) // limit if total > 0 else 1
+    return [e["id"] for e in entries[(page - 1) * limit : page * limit]], {
+        "page": page,
+        "limit": limit,
+        "total": total,
+        "totalPages": total_pages,
+        "hasNextPage": page < total_pages,
+        "hasPrevPage": page > 1,
+    }
+
+
+def matching(**filters):
+    """Ids of entries matching the filters, newest first."""
+    return [
+        e["id"]
+        for e in sorted(ENTRIES, key=lambda e: (e["timestamp"], e["id"]), reverse=True)
+        if all(e[field] == value for field, value in filters.items())
+    ]
+
+
+@pytest.mark.parametrize(
+    "filters",
+    [{}, {"entityType": "tank"}, {"entityType": "movement", "entityId": "tank-001"}],
+)
+async def test_pages_match_the_old_pagination(client, storage, filters):
+    expected_total = old_page(filters.get("entityType"), filters.get("entityId"))[1]
+    for page in range(1, expected_total["totalPages"] + 2):
+        body = (
+            await client.get("/audit-log", params={**filters, "page": page, "limit": LIMIT})
+        ).json()
+
+        ids, pagination = old_page(filters.get("entityType"), filters.get("entityId"), page)
+        assert [e["id"] for e in body["data"]] == ids
+        assert {k: body["pagination"][k] for k in pagination} == pagination
+
+
+@pytest.mark.parametrize(
+    "filters",
+    [
+        {"entityType": "tank", "userId": "alice"},
+        {"entityId": "tank-002", "userId": "bob"},
+        {"entityType": "property", "entityId": "mov-001", "userId": "system"},
+        {"userId": "alice"},
+    ],
+)
+async def test_cursor_pages_through_combined_filters(client, storage, filters):
+    ids = []
+    params = {**filters, "limit": LIMIT}
+    while True:
+        body = (await client.get("/audit-log", params=params)).json()
+        ids += [e["id"] for e in body["data"]]
+        assert body["pagination"]["total"] == len(matching(**filters))
+        if body["pagination"]["nextCursor"] is None:
+            break
+        params = {**filters, "limit": LIMIT, "cursor": body["pagination"]["nextCursor"]}
+
+    assert ids == matching(**filters)
+    assert ids
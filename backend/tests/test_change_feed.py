@@ -0,0 +1,59 @@
+import asyncio
+
+import pytest
+
+from app.services import change_feed as change_feed_module
+from app.services.change_feed import change_feed
+
+pytestmark = pytest.mark.anyio
+
+
+async def next_change(changes, entity_id):
+    """The next change to ``entity_id``, skipping keepalives and other records."""
+    while True:
+        change = await asyncio.wait_for(changes.__anext__(), 5)
+        if change is not None and change["entityId"] == entity_id:
+            return change
+
+
+async def test_changes_committed_by_another_worker_are_streamed(
+    client, make_tank, monkeypatch
+):
+    # Commits in another worker don't wake this one's tail; polling finds them
+    monkeypatch.setattr(change_feed, "notify", lambda: None)
+    monkeypatch.setattr(change_feed_module, "POLL_SECONDS", 0.05)
+    changes = change_feed.subscribe(None, keepalive=0.1)
+    assert await changes.__anext__() is None
+
+    try:
+        tank = await make_tank(10)
+        change = await next_change(changes, tank["id"])
+    finally:
+        await changes.aclose()
+
+    assert change["action"] == "create"
+    assert change["entityType"] == "tank"
+    assert change["record"]["currentVolume"] == 10
+
+
+async def test_reconnecting_subscriber_catches_up_in_commit_order(client, make_tank):
+    changes = change_feed.subscribe(None, keepalive=0.1)
+    assert await changes.__anext__() is None
+    try:
+        first = await make_tank(1)
+        last_seen = (await next_change(changes, first["id"]))["version"]
+    finally:
+        await changes.aclose()
+
+    missed = [await make_tank(volume) for volume in (2, 3)]
+
+    changes = change_feed.subscribe(last_seen, keepalive=0.1)
+    try:
+        caught_up = [await changes.__anext__() for _ in missed]
+        live = await make_tank(4)
+        change = await next_change(changes, live["id"])
+    finally:
+        await changes.aclose()
+
+    assert [c["entityId"] for c in caught_up] == [t["id"] for t in missed]
+    assert last_seen < caught_up[0]["version"] < caught_up[1]["version"] < change["version"]
@@ -0,0 +1,74 @@
+import asyncio
+
+import pytest
+
+from app.services.extraction_cache import ExtractionCache
+
+pytestmark = pytest.mark.anyio
+
+PDF = b"%PDF-1.4 report"
+DEFINITIONS = [{"id": "prop-1", "name": "Sulfur Content", "unit": "%"}]
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return ExtractionCache(tmp_path, max_bytes=1024 * 1024, max_entries=100)
+
+
+async def test_concurrent_requests_share_one_extraction(cache):
+    calls = 0
+    release = asyncio.Event()
+
+    async def extract(pdf_bytes, definitions):
+        nonlocal calls
+        calls += 1
+        await release.wait()
+        return {"volume": 10.0, "properties": []}
+
+    first = asyncio.create_task(cache.get_or_extract(PDF, DEFINITIONS, extract))
+    second = asyncio.create_task(cache.get_or_extract(PDF, DEFINITIONS, extract))
+    await asyncio.sleep(0.05)
+    release.set()
+
+    assert await first == await second == {"volume": 10.0, "properties": []}
+    assert calls == 1
+
+
+async def test_waiter_takes_over_when_the_first_request_is_cancelled(cache):
+    calls = 0
+    started = asyncio.Event()
+
+    async def extract(pdf_bytes, definitions):
+        nonlocal calls
+        calls += 1
+        if calls == 1:
+            started.set()
+            await asyncio.Event().wait()  # Until cancelled
+        return {"volume": 20.0, "properties": []}
+
+    first = asyncio.create_task(cache.get_or_extract(PDF, DEFINITIONS, extract))
+    await started.wait()
+    waiter = asyncio.create_task(cache.get_or_extract(PDF, DEFINITIONS, extract))
+    await asyncio.sleep(0.05)
+    first.cancel()
+
+    assert await waiter == {"volume": 20.0, "properties": []}
+    assert first.cancelled()
+    assert calls == 2
+
+
+async def test_waiters_get_the_extraction_error(cache):
+    release = asyncio.Event()
+
+    async def extract(pdf_bytes, definitions):
+        await release.wait()
+        raise RuntimeError("Could not read PDF")
+
+    first = asyncio.create_task(cache.get_or_extract(PDF, DEFINITIONS, extract))
+    second = asyncio.create_task(cache.get_or_extract(PDF, DEFINITIONS, extract))
+    await asyncio.sleep(0.05)
+    release.set()
+
+    for task in (first, second):
+        with pytest.raises(RuntimeError):
+            await task
@@ -0,0 +1,235 @@
+import asyncio
+from datetime import datetime, timezone
+
+import pytest
+
+pytestmark = pytest.mark.anyio
+
+
+def now() -> str:
+    return datetime.now(timezone.utc).isoformat().replace("+00:00", "Z")
+
+
+async def get_tank(client, tank_id):
+    return (await client.get(f"/tanks/{tank_id}")).json()
+
+
+async def test_concurrent_receives_all_reach_the_tank(client, make_tank):
+    tank = await make_tank(125.5, [{"propertyId": "prop-001", "value": 10.0}])
+
+    responses = await asyncio.gather(
+        *[
+            client.post(
+                "/movements",
+                json={
+                    "type": "receive",
+                    "destinationTankId": tank["id"],
+                    "expectedVolume": 10,
+                    "date": now(),
+                    "properties": [{"propertyId": "prop-001", "value": 20.0}],
+                },
+            )
+            for _ in range(5)
+        ]
+    )
+
+    assert [r.status_code for r in responses] == [201] * 5
+    tank = await get_tank(client, tank["id"])
+    assert tank["currentVolume"] == pytest.approx(175.5)
+    assert tank["properties"][0]["value"] == pytest.approx((125.5 * 10 + 50 * 20) / 175.5, abs=0.01)
+
+
+async def test_concurrent_transfers_move_every_volume(client, make_tank):
+    source = await make_tank(100, [{"propertyId": "prop-002", "value": 2.0}])
+    destination = await make_tank(0)
+
+    responses = await asyncio.gather(
+        *[
+            client.post(
+                "/movements",
+                json={
+                    "type": "transfer",
+                    "sourceTankId": source["id"],
+                    "destinationTankId": destination["id"],
+                    "expectedVolume": 10,
+                    "date": now(),
+                },
+            )
+            for _ in range(4)
+        ]
+    )
+
+    assert [r.status_code for r in responses] == [201] * 4
+    assert (await get_tank(client, source["id"]))["currentVolume"] == pytest.approx(60)
+    destination = await get_tank(client, destination["id"])
+    assert destination["currentVolume"] == pytest.approx(40)
+    assert destination["properties"] == [{"propertyId": "prop-002", "value": 2.0}]
+
+
+async def test_concurrent_ships_cannot_overdraw_the_source(client, make_tank):
+    tank = await make_tank(89.3)
+
+    responses = await asyncio.gather(
+        *[
+            client.post(
+                "/movements",
+                json={
+                    "type": "ship",
+                    "sourceTankId": tank["id"],
+                    "expectedVolume": 50,
+                    "date": now(),
+                },
+            )
+            for _ in range(3)
+        ]
+    )
+
+    assert sorted(r.status_code for r in responses) == [201, 400, 400]
+    rejected = next(r for r in responses if r.status_code == 400).json()["detail"]
+    assert rejected["details"][0]["field"] == "expectedVolume"
+    assert (await get_tank(client, tank["id"]))["currentVolume"] == pytest.approx(39.3)
+    movements = (await client.get("/movements", params={"tankId": tank["id"]})).json()
+    assert len(movements) == 1
+
+
+async def test_concurrent_patches_of_different_fields_both_apply(client, make_tank):
+    tank = await make_tank(10)
+    movement = (
+        await client.post(
+            "/movements",
+            json={"type": "receive", "destinationTankId": tank["id"], "expectedVolume": 5},
+        )
+    ).json()
+
+    responses = await asyncio.gather(
+        client.patch(f"/movements/{movement['id']}", json={"carrier": "Truck 7"}),
+        client.patch(f"/movements/{movement['id']}", json={"notes": "Late arrival"}),
+    )
+
+    assert [r.status_code for r in responses] == [200, 200]
+    movement = (await client.get(f"/movements/{movement['id']}")).json()
+    assert (movement["carrier"], movement["notes"]) == ("Truck 7", "Late arrival")
+
+
+async def test_backdated_movement_commits_with_its_rebuild(client, make_tank, monkeypatch):
+    from app.services import tank_ledger
+
+    tank = await make_tank(100)
+    receive = {"type": "receive", "destinationTankId": tank["id"]}
+    await client.post("/movements", json={**receive, "expectedVolume": 10, "date": "2099-01-01"})
+
+    response = await client.post(
+        "/movements", json={**receive, "expectedVolume": 5, "date": "2098-01-01"}
+    )
+    assert response.status_code == 201
+    assert (await get_tank(client, tank["id"]))["currentVolume"] == pytest.approx(115)
+
+    async def failing_rebuild(*args, **kwargs):
+        raise RuntimeError("rebuild failed")
+
+    monkeypatch.setattr(tank_ledger, "rebuild_tanks", failing_rebuild)
+    with pytest.raises(RuntimeError):
+        await client.post("/movements", json={**receive, "expectedVolume": 7, "date": "2097-01-01"})
+
+    movements = (await client.get("/movements", params={"tankId": tank["id"]})).json()
+    assert len(movements) == 2
+    assert (await get_tank(client, tank["id"]))["currentVolume"] == pytest.approx(115)
+
+
+async def test_rebuild_logs_the_tanks_it_changes(client, make_tank):
+    tank = await make_tank(100)
+    movement = (
+        await client.post(
+            "/movements",
+            json={
+                "type": "receive",
+                "destinationTankId": tank["id"],
+                "expectedVolume": 10,
+                "date": "2099-01-01",
+            },
+        )
+    ).json()
+
+    assert (await client.delete(f"/movements/{movement['id']}")).status_code == 200
+    assert (await get_tank(client, tank["id"]))["currentVolume"] == pytest.approx(100)
+
+    entries = (
+        await client.get("/audit-log", params={"entityType": "tank", "entityId": tank["id"]})
+    ).json()["data"]
+    rebuilt = [e for e in entries if e["action"] == "update"]
+    assert len(rebuilt) == 1
+    assert rebuilt[0]["changes"]["old"]["currentVolume"] == pytest.approx(110)
+    assert rebuilt[0]["changes"]["new"]["currentVolume"] == pytest.approx(100)
+
+
+async def test_concurrent_movements_open_a_seeded_tanks_ledger_once(client):
+    from app.services.file_storage import tank_events_storage
+
+    responses = await asyncio.gather(
+        *[
+            client.post(
+                "/movements",
+                json={
+                    "type": "receive",
+                    "destinationTankId": "tank-002",
+                    "expectedVolume": 10,
+                    "date": now(),
+                },
+            )
+            for _ in range(3)
+        ]
+    )
+
+    assert [r.status_code for r in responses] == [201, 201, 201]
+    assert (await get_tank(client, "tank-002"))["currentVolume"] == pytest.approx(119.3)
+    events = await tank_events_storage.range_query("tank", "tank-002")
+    assert [e["kind"] for e in events] == ["opening"]
+
+
+async def test_rebuild_keeps_a_concurrent_in_order_movement(client, make_tank):
+    tank = await make_tank(100)
+    backdated = now()
+    await client.post(
+        "/movements",
+        json={"type": "receive", "destinationTankId": tank["id"], "expectedVolume": 1, "date": now()},
+    )
+
+    responses = await asyncio.gather(
+        *[
+            client.post(
+                "/movements",
+                json={
+                    "type": "receive",
+                    "destinationTankId": tank["id"],
+                    "expectedVolume": volume,
+                    "date": date,
+                },
+            )
+            for _ in range(5)
+            for volume, date in ((10, backdated), (1000, now()))
+        ]
+    )
+
+    assert [r.status_code for r in responses] == [201] * 10
+    assert (await get_tank(client, tank["id"]))["currentVolume"] == pytest.approx(5151)
+
+
+async def test_backdated_movement_does_not_change_a_reset_tank(client):
+    from app.services.file_storage import tank_events_storage
+
+    reset = await client.post("/tanks/tank-001/reset", json={"volume": 500, "properties": []})
+    assert reset.status_code == 200
+    response = await client.post(
+        "/movements",
+        json={
+            "type": "receive",
+            "destinationTankId": "tank-001",
+            "expectedVolume": 10,
+            "date": "2020-01-01T00:00:00Z",
+        },
+    )
+
+    assert response.status_code == 201
+    assert (await get_tank(client, "tank-001"))["currentVolume"] == pytest.approx(500)
+    events = await tank_events_storage.range_query("tank", "tank-001")
+    assert [(e["kind"], e["volume"]) for e in events] == [("opening", 135.5), ("reset", 500)]
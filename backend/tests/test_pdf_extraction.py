@@ -0,0 +1,62 @@
+import pytest
+
+from app.services import pdf_extraction
+from app.services.rule_extraction import rule_extractor
+
+pytestmark = pytest.mark.anyio
+
+DEFINITIONS = [{"id": "prop-1", "name": "Sulfur Content", "unit": "%"}]
+
+
+async def test_failed_llm_call_counts_as_a_call_and_a_failure(monkeypatch):
+    partial = {"volume": None, "properties": []}
+    monkeypatch.setattr(
+        pdf_extraction,
+        "parse_and_match",
+        lambda pdf_bytes, definitions: ("Report", ["Report"], partial, 0.0, False),
+    )
+
+    async def failing_llm(prompt):
+        raise RuntimeError("LLM unavailable")
+
+    monkeypatch.setattr(pdf_extraction, "_extract_with_llm", failing_llm)
+    before = pdf_extraction.extraction_stats.snapshot()
+
+    result = await pdf_extraction.extract_data_from_pdf(b"%PDF", DEFINITIONS)
+
+    after = pdf_extraction.extraction_stats.snapshot()
+    assert result["extractor"] == "rules"
+    assert after["extractions"] == before["extractions"] + 1
+    assert after["rulesHits"] == before["rulesHits"]
+    assert after["llmCalls"] == before["llmCalls"] + 1
+    assert after["llmFailures"] == before["llmFailures"] + 1
+
+
+async def test_confident_rules_answer_without_the_llm(monkeypatch):
+    found = {"volume": 10.0, "properties": [{"name": "Sulfur Content", "value": 2.1, "unit": "%"}]}
+    monkeypatch.setattr(
+        pdf_extraction,
+        "parse_and_match",
+        lambda pdf_bytes, definitions: ("Report", ["Report"], found, 1.0, True),
+    )
+
+    async def unexpected_llm(prompt):
+        raise AssertionError("LLM called")
+
+    monkeypatch.setattr(pdf_extraction, "_extract_with_llm", unexpected_llm)
+    before = pdf_extraction.extraction_stats.snapshot()
+
+    result = await pdf_extraction.extract_data_from_pdf(b"%PDF", DEFINITIONS)
+
+    after = pdf_extraction.extraction_stats.snapshot()
+    assert result["extractor"] == "rules"
+    assert after["rulesHits"] == before["rulesHits"] + 1
+    assert after["llmCalls"] == before["llmCalls"]
+
+
+def test_rule_extractor_is_reused_until_the_definitions_change():
+    extractor = rule_extractor(DEFINITIONS)
+    assert rule_extractor([dict(d) for d in DEFINITIONS]) is extractor
+
+    with_alias = [{**DEFINITIONS[0], "aliases": ["Sulphur"]}]
+    assert rule_extractor(with_alias) is not extractor
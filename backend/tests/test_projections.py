@@ -0,0 +1,121 @@
+import json
+import random
+import sqlite3
+from datetime import date, timedelta
+
+import pytest
+
+from app.services import file_storage
+from app.services.projections import project_fleet
+from app.services.tank_calculations import calculate_projected_state
+
+START = date(2026, 1, 1)
+HORIZON = 10
+
+
+def random_fleet(rng: random.Random):
+    tanks = [
+        {
+            "id": f"tank-{i}",
+            "currentVolume": rng.choice([0.0, 0.3, 1.7, 10.1]),
+            "properties": [
+                {"propertyId": f"p{j}", "value": rng.choice([None, rng.uniform(0, 10)])}
+                for j in range(rng.randint(0, 3))
+            ],
+        }
+        for i in range(4)
+    ]
+    ids = [t["id"] for t in tanks]
+    movements = []
+    for k in range(rng.randint(1, 12)):
+        movement_type = rng.choice(["receive", "ship", "transfer"])
+        movements.append(
+            {
+                "id": f"mov-{k}",
+                "type": movement_type,
+                "scheduledDate": f"{START + timedelta(days=rng.randint(0, HORIZON - 1))}T08:00:00Z",
+                "expectedVolume": rng.choice([0.1, 0.2, 0.3, 0.7, 1.7, 5.0]),
+                "actualVolume": None,
+                "sourceTankId": rng.choice(ids) if movement_type != "receive" else None,
+                "destinationTankId": rng.choice(ids) if movement_type != "ship" else None,
+                "properties": [
+                    {"propertyId": f"p{j}", "value": rng.choice([None, rng.uniform(0, 10)])}
+                    for j in rng.sample(range(4), rng.randint(0, 2))
+                ],
+            }
+        )
+    movements.sort(key=lambda m: m["scheduledDate"])
+    return tanks, movements
+
+
+def touching(tank, movements):
+    return [m for m in movements if tank["id"] in (m["sourceTankId"], m["destinationTankId"])]
+
+
+def property_map(properties):
+    return {p["propertyId"]: p["value"] for p in properties}
+
+
+def test_project_fleet_matches_projecting_each_tank_alone():
+    rng = random.Random(1)
+    for _ in range(500):
+        tanks, movements = random_fleet(rng)
+        fleet = project_fleet(tanks, movements, START, HORIZON)["tanks"]
+
+        for tank, projected in zip(tanks, fleet):
+            alone = project_fleet([tank], touching(tank, movements), START, HORIZON)["tanks"][0]
+            assert projected["volume"] == alone["volume"]
+            assert projected["dailyVolumes"] == alone["dailyVolumes"]
+            assert property_map(projected["properties"]) == property_map(alone["properties"])
+
+            expected = calculate_projected_state(tank, touching(tank, movements))
+            assert projected["volume"] == pytest.approx(expected["volume"], abs=1e-6)
+            expected_properties = {p.propertyId: p.value for p in expected["properties"]}
+            properties = property_map(projected["properties"])
+            assert properties.keys() == expected_properties.keys()
+            for property_id, value in expected_properties.items():
+                if value is None:
+                    assert properties[property_id] is None
+                else:
+                    assert properties[property_id] == pytest.approx(value, abs=0.01)
+
+
+def write_as_another_worker(movement):
+    """Store a movement the way a write from another process would."""
+    storage = file_storage.movements_storage
+    if file_storage.STORAGE_BACKEND == "sqlite":
+        conn = sqlite3.connect(str(storage.db.path), isolation_level=None)
+        conn.execute("BEGIN IMMEDIATE")
+        conn.execute(
+            "UPDATE movements SET data = ? WHERE id = ?", (json.dumps(movement), movement["id"])
+        )
+        conn.execute("UPDATE meta SET value = value + 1 WHERE key = 'version:movements'")
+        conn.execute("COMMIT")
+        conn.close()
+    else:
+        records = json.loads(storage.filepath.read_text(encoding="utf-8"))
+        records = [movement if r["id"] == movement["id"] else r for r in records]
+        storage.filepath.write_text(json.dumps(records, indent=2), encoding="utf-8")
+
+
+@pytest.mark.anyio
+async def test_cached_projections_see_other_workers_changes(client, make_tank):
+    tank, other = await make_tank(50), await make_tank(50)
+    movement = (
+        await client.post(
+            "/movements",
+            json={"type": "receive", "destinationTankId": tank["id"], "expectedVolume": 10},
+        )
+    ).json()
+
+    def projected_volume(body):
+        return next(t["volume"] for t in body["tanks"] if t["tankId"] == tank["id"])
+
+    assert projected_volume((await client.get("/tanks/projections")).json()) == pytest.approx(60)
+
+    write_as_another_worker({**movement, "expectedVolume": 30})
+    # A local write in the same interval doesn't hide the other worker's
+    renamed = await client.patch(f"/tanks/{other['id']}", json={"name": f"{other['name']} B"})
+    assert renamed.status_code == 200
+
+    assert projected_volume((await client.get("/tanks/projections")).json()) == pytest.approx(80)
@@ -0,0 +1,21 @@
+import asyncio
+import uuid
+
+import pytest
+
+pytestmark = pytest.mark.anyio
+
+
+async def test_concurrent_patches_of_different_fields_both_apply(client):
+    prop = (await client.post("/properties", json={"name": f"Density {uuid.uuid4()}"})).json()
+
+    responses = await asyncio.gather(
+        client.patch(f"/properties/{prop['id']}", json={"unit": "kg/m3"}),
+        client.patch(f"/properties/{prop['id']}", json={"aliases": ["Dens"]}),
+    )
+
+    assert [r.status_code for r in responses] == [200, 200]
+    prop = next(
+        p for p in (await client.get("/properties")).json() if p["id"] == prop["id"]
+    )
+    assert (prop["unit"], prop["aliases"]) == ("kg/m3", ["Dens"])
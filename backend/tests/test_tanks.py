@@ -0,0 +1,46 @@
+import pytest
+
+pytestmark = pytest.mark.anyio
+
+
+async def test_tank_list_is_revalidated_until_a_tank_changes(client, make_tank):
+    tank = await make_tank(50)
+    first = await client.get("/tanks")
+    etag = first.headers["etag"]
+    assert first.status_code == 200
+
+    unchanged = await client.get("/tanks", headers={"If-None-Match": etag})
+    assert unchanged.status_code == 304
+    assert unchanged.headers["etag"] == etag
+    assert unchanged.content == b""
+
+    patched = await client.patch(f"/tanks/{tank['id']}", json={"name": f"{tank['name']} B"})
+    assert patched.status_code == 200
+
+    changed = await client.get("/tanks", headers={"If-None-Match": etag})
+    assert changed.status_code == 200
+    assert changed.headers["etag"] != etag
+    names = {t["id"]: t["name"] for t in changed.json()}
+    assert names[tank["id"]] == f"{tank['name']} B"
+
+
+async def test_as_of_read_served_from_a_snapshot(client, make_tank):
+    tank = await make_tank(0)
+    for i in range(49):
+        response = await client.post(
+            "/movements",
+            json={
+                "type": "receive",
+                "destinationTankId": tank["id"],
+                "expectedVolume": 1,
+                "date": f"2030-01-01T00:00:{i:02d}Z",
+            },
+        )
+        assert response.status_code == 201
+
+    # The first read replays the ledger and saves a snapshot the second starts from
+    for _ in range(2):
+        response = await client.get(f"/tanks/{tank['id']}", params={"asOf": "2031-01-01"})
+        assert response.status_code == 200
+        assert response.json()["currentVolume"] == pytest.approx(49)
+        assert response.json()["updatedAt"] == "2030-01-01T00:00:48Z"
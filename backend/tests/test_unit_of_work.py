@@ -0,0 +1,49 @@
+import pytest
+
+from app.services.unit_of_work import UnitOfWork
+
+pytestmark = pytest.mark.anyio
+
+
+class MemoryStorage:
+    def __init__(self, records):
+        self.records = {r["id"]: r for r in records}
+
+    async def get_by_id(self, record_id):
+        record = self.records.get(record_id)
+        return dict(record) if record is not None else None
+
+
+async def test_staged_updates_run_once_however_often_the_record_is_read():
+    storage = MemoryStorage([{"id": "tank-1", "volume": 0}])
+    uow = UnitOfWork()
+    runs = 0
+
+    def add_one(record):
+        nonlocal runs
+        runs += 1
+        record["volume"] += 1
+        return record
+
+    for expected in range(1, 51):
+        uow.update(storage, "tank-1", add_one)
+        assert (await uow.get_by_id(storage, "tank-1"))["volume"] == expected
+
+    assert runs == 50
+
+
+async def test_reads_see_upserts_deletes_and_later_updates():
+    storage = MemoryStorage([{"id": "tank-1", "volume": 5}])
+    uow = UnitOfWork()
+
+    uow.upsert(storage, {"id": "tank-1", "volume": 10})
+    uow.update(storage, "tank-1", lambda record: {**record, "volume": record["volume"] * 2})
+    record = await uow.get_by_id(storage, "tank-1")
+    assert record["volume"] == 20
+
+    record["volume"] = 0  # Callers get copies
+    assert (await uow.get_by_id(storage, "tank-1"))["volume"] == 20
+
+    uow.delete(storage, "tank-1")
+    assert await uow.get_by_id(storage, "tank-1") is None
+    assert await uow.get_by_id(storage, "tank-2") is None
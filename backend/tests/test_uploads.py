@@ -0,0 +1,66 @@
+import os
+import stat
+
+import pytest
+
+from app.routers import pdf
+
+pytestmark = pytest.mark.anyio
+
+BOUNDARY = "test-boundary"
+PDF = b"%PDF-1.4\n" + b"0" * 3000 + b"\n%%EOF\n"
+
+
+def form(content: bytes, content_type: str = "application/pdf") -> bytes:
+    return (
+        f"--{BOUNDARY}\r\n"
+        'Content-Disposition: form-data; name="file"; filename="report.pdf"\r\n'
+        f"Content-Type: {content_type}\r\n\r\n"
+    ).encode() + content + f"\r\n--{BOUNDARY}--\r\n".encode()
+
+
+HEADERS = {"Content-Type": f"multipart/form-data; boundary={BOUNDARY}"}
+
+
+@pytest.fixture
+def uploads_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(pdf, "UPLOADS_DIR", tmp_path)
+    return tmp_path
+
+
+async def test_upload_is_stored_once_by_content(client, uploads_dir):
+    first = await client.post("/upload-pdf", files={"file": ("a.pdf", PDF, "application/pdf")})
+    second = await client.post("/upload-pdf", files={"file": ("b.pdf", PDF, "application/pdf")})
+
+    assert first.status_code == second.status_code == 200
+    assert first.json() == second.json()
+    (stored,) = uploads_dir.iterdir()
+    assert stored.read_bytes() == PDF
+    assert stat.S_IMODE(os.stat(stored).st_mode) == 0o644
+
+
+async def test_oversized_upload_is_refused_before_it_is_all_sent(client, uploads_dir):
+    sent = 0
+
+    async def body():
+        nonlocal sent
+        chunk = b"0" * (1024 * 1024)
+        parts = [form(b"").split(b"\r\n\r\n")[0] + b"\r\n\r\n"] + [chunk] * 100
+        for part in parts:
+            sent += len(part)
+            yield part
+
+    response = await client.post("/upload-pdf", content=body(), headers=HEADERS)
+
+    assert response.status_code == 400
+    assert sent < 20 * 1024 * 1024
+    assert list(uploads_dir.iterdir()) == []
+
+
+async def test_upload_of_another_type_is_refused(client, uploads_dir):
+    response = await client.post(
+        "/upload-pdf", content=form(b"hello", "text/plain"), headers=HEADERS
+    )
+
+    assert response.status_code == 400
+    assert list(uploads_dir.iterdir()) == []
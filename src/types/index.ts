@@ -3,6 +3,7 @@ export interface PropertyDefinition {
   id: string;
   name: string;           // e.g., "API", "Sulfur"
   unit: string;           // e.g., "degrees", "%", "ppm"
+  aliases?: string[];     // other names lab reports use, e.g., "Sulphur"
   createdAt: string;
 }
 